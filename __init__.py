@@ -11,10 +11,12 @@ migrate = Migrate()
 def create_app(config_name='default'):
     """Application factory function."""
     from app.config import config
+    from app.services.json_encoding import FastJSONProvider
     
     # Create Flask app
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.json = FastJSONProvider(app)
     
     # Initialize extensions with app
     db.init_app(app)
@@ -36,4 +38,9 @@ def create_app(config_name='default'):
     app.register_blueprint(vm_bp, url_prefix='/vm')
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Latency and error metrics served at /metrics
+    if app.config['METRICS_ENABLED']:
+        from app.services.instrumentation import instrument_app
+        instrument_app(app)
+    
     return app
@@ -1,13 +1,57 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context, url_for
 from flask_login import login_required, current_user
 from app.services.proxmox_service import ProxmoxService
-from app.models.models import VM, ScalingEvent
+from app.services.task_service import task_tracker
+from app.services.provisioning_service import ProvisioningService, software_key
+from app.services.warm_pool_service import warm_pool
+from app.services.metrics_stream import metrics_broadcaster
+from app.services.scaling_history_service import ScalingHistoryService
+from app.services.inventory_service import inventory_status, vm_changes, vm_to_listing
+from app.services.scaling_policy import INTEGER_POLICY_FIELDS, POLICY_FIELDS, policy_settings, policy_settings_error
+from app.services.json_encoding import ndjson
+from app.models.models import VM, ScalingEvent, ScalingPolicy, Task, VMTemplate
 from app import db
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timezone
+import hashlib
+import json
 import logging
+import queue
 
 logger = logging.getLogger(__name__)
 api_bp = Blueprint('api', __name__)
 proxmox_service = ProxmoxService()
+provisioning_service = ProvisioningService(proxmox_service)
+scaling_history_service = ScalingHistoryService()
+
+# VM config keys a bulk 'config' item may change; all take positive integers
+BULK_CONFIG_PARAMS = ('cores', 'memory')
+
+def _task_response(task, **extra):
+    """Build a 202 Accepted response pointing at a task."""
+    body = {
+        'success': True,
+        'task': _task_to_dict(task),
+        'task_url': url_for('api.get_task', task_id=task.id)
+    }
+    body.update(extra)
+    return jsonify(body), 202
+
+def _task_to_dict(task):
+    """Serialize a Task row."""
+    return {
+        'id': task.id,
+        'upid': task.upid,
+        'node': task.node,
+        'vmid': task.vmid,
+        'action': task.action,
+        'status': task.status,
+        'exit_status': task.exit_status,
+        'done': task.done,
+        'created_at': task.created_at.isoformat() if task.created_at else None,
+        'finished_at': task.finished_at.isoformat() if task.finished_at else None
+    }
 
 @api_bp.route('/nodes', methods=['GET'])
 @login_required
@@ -19,10 +63,206 @@ def get_nodes():
 @api_bp.route('/vms', methods=['GET'])
 @login_required
 def get_vms():
-    """Get all VMs."""
+    """Get all VMs.
+
+    Served from the reconciled VM table while it is fresher than
+    INVENTORY_MAX_STALENESS, otherwise (or with source=live) from Proxmox.
+    Database listings carry their inventory version; pass it back as
+    since=<version> to get only the VMs changed or removed since (full is
+    false). Their ETag covers the version and the node, since, fields and
+    format parameters, so If-None-Match gives a 304 only for the same query.
+
+    fields=a,b,c limits each VM to those keys (vmid is always included).
+    format=ndjson streams one VM per line instead of a single document;
+    removals are sent as {"vmid": ..., "removed": true} lines, per-node
+    errors as {"node": ..., "error": ...} lines, and the listing metadata
+    in X-Inventory-* headers.
+    """
     node = request.args.get('node')
-    vms = proxmox_service.get_vms(node)
-    return jsonify({'vms': vms})
+    fields = _parse_fields(request.args.get('fields'))
+    stream = request.args.get('format') == 'ndjson'
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'since must be an inventory version'}), 400
+    
+    source = request.args.get('source', current_app.config['INVENTORY_LISTING_SOURCE'])
+    if source == 'db':
+        inventory = inventory_status()
+        if inventory['fresh']:
+            changes = vm_changes(since, node) if since is not None else None
+            if stream:
+                response = _ndjson_response(_inventory_entries(node, changes, fields), {
+                    'X-Inventory-Source': 'db',
+                    'X-Inventory-Version': str(inventory['version']),
+                    'X-Inventory-Full': 'false' if changes is not None else 'true'
+                })
+            else:
+                response = jsonify(_inventory_listing(node, changes, fields, inventory))
+            response.set_etag(_inventory_etag(inventory['version'], node, since, fields, stream), weak=True)
+            return response.make_conditional(request)
+    
+    vms, errors = proxmox_service.fetch_vms(node)
+    if stream:
+        def entries():
+            for vm in vms:
+                yield _project(vm, fields)
+            for error_node, message in errors.items():
+                yield {'node': error_node, 'error': message}
+        
+        return _ndjson_response(entries(), {'X-Inventory-Source': 'live', 'X-Inventory-Full': 'true'})
+    
+    response = {'vms': [_project(vm, fields) for vm in vms], 'source': 'live', 'full': True}
+    if errors:
+        response['errors'] = errors
+    return jsonify(response)
+
+def _parse_fields(value):
+    """Parse a comma-separated fields projection; None means every field."""
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    return ['vmid'] + [field for field in fields if field != 'vmid']
+
+def _project(entry, fields):
+    """Keep only the projected keys of a VM listing entry."""
+    if fields is None:
+        return entry
+    return {field: entry[field] for field in fields if field in entry}
+
+def _ndjson_response(entries, headers=None):
+    """Stream entries as newline-delimited JSON."""
+    chunk = current_app.config['VM_LISTING_STREAM_CHUNK']
+    return Response(stream_with_context(ndjson(entries, chunk)), mimetype='application/x-ndjson',
+                    headers=headers)
+
+def _inventory_etag(version, node, since, fields, stream):
+    """ETag of a database listing: the inventory version plus everything that shapes the body."""
+    shape = json.dumps([node, since, fields, 'ndjson' if stream else 'json'])
+    return f"{version}-{hashlib.sha1(shape.encode()).hexdigest()[:16]}"
+
+def _inventory_query(node):
+    """Query the VMs of a full database listing."""
+    query = VM.query.filter(VM.status != 'missing').order_by(VM.proxmox_node, VM.proxmox_id)
+    if node:
+        query = query.filter_by(proxmox_node=node)
+    return query
+
+def _inventory_entries(node, changes, fields):
+    """Yield the entries of a database listing without loading every VM at once."""
+    if changes is not None:
+        changed, removed = changes
+        for vmid in removed:
+            yield {'vmid': vmid, 'removed': True}
+        for entry in changed:
+            yield _project(entry, fields)
+        return
+    
+    for vm in _inventory_query(node).yield_per(current_app.config['VM_LISTING_STREAM_CHUNK']):
+        yield _project(vm_to_listing(vm), fields)
+
+def _inventory_listing(node, changes, fields, inventory):
+    """Build a database VM listing: the changes since a version, or every VM."""
+    listing = {'source': 'db', 'version': inventory['version'], 'inventory': inventory}
+    if changes is not None:
+        changed, removed = changes
+        listing['removed'] = list(removed)
+        listing['vms'] = [_project(entry, fields) for entry in changed]
+        listing['full'] = False
+        return listing
+    
+    listing['vms'] = [_project(vm_to_listing(vm), fields) for vm in _inventory_query(node)]
+    listing['full'] = True
+    return listing
+
+def _is_int(value):
+    # bool is a subclass of int, but true/false is never a valid count or ID
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _validate_bulk_item(item):
+    """Return an error message for an invalid bulk item, or None."""
+    if not isinstance(item, dict):
+        return 'must be an object'
+    if not item.get('node') or not isinstance(item['node'], str) or not _is_int(item.get('vmid')):
+        return 'node and integer vmid are required'
+    if item.get('action') not in ('start', 'stop', 'delete', 'config'):
+        return 'action must be start, stop, delete or config'
+    if item['action'] != 'config':
+        return None
+    
+    params = item.get('params')
+    if not params or not isinstance(params, dict):
+        return 'params are required for config'
+    unknown = set(params) - set(BULK_CONFIG_PARAMS)
+    if unknown:
+        return f"unsupported params: {', '.join(sorted(unknown))}"
+    for key, value in params.items():
+        if not _is_int(value) or value < 1:
+            return f'{key} must be a positive integer'
+    return None
+
+@api_bp.route('/vms/bulk', methods=['POST'])
+@login_required
+def bulk_vm_actions():
+    """Start, stop, delete or reconfigure many VMs in one request."""
+    data = request.json
+    items = data.get('items') if isinstance(data, dict) else None
+    if not items:
+        return jsonify({'error': 'No items provided'}), 400
+    if not isinstance(items, list):
+        return jsonify({'error': 'items must be a list'}), 400
+    
+    max_items = current_app.config['BULK_MAX_ITEMS']
+    if len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} items are allowed'}), 400
+    
+    for index, item in enumerate(items):
+        error = _validate_bulk_item(item)
+        if error:
+            return jsonify({'error': f'Item {index}: {error}'}), 400
+    
+    outcomes = proxmox_service.run_bulk_actions(items)
+    
+    # Apply every VM row change in a single transaction
+    vms = VM.query.filter(VM.proxmox_id.in_({item['vmid'] for item in items})).all()
+    vms_by_key = {(vm.proxmox_node, vm.proxmox_id): vm for vm in vms}
+    
+    results = []
+    tasks = []
+    for index, (item, outcome) in enumerate(zip(items, outcomes)):
+        result = {'index': index, 'node': item['node'], 'vmid': item['vmid'],
+                  'action': item['action'], 'success': bool(outcome)}
+        results.append(result)
+        if not outcome:
+            result['error'] = f"Failed to {item['action']} VM"
+            continue
+        
+        vm = vms_by_key.get((item['node'], item['vmid']))
+        if item['action'] == 'config':
+            if vm:
+                if 'cores' in item['params']:
+                    vm.cpu_cores = item['params']['cores']
+                if 'memory' in item['params']:
+                    vm.memory_mb = item['params']['memory']
+        else:
+            task = task_tracker.create_task(item['node'], outcome, item['action'], vm=vm,
+                                            vmid=item['vmid'], user_id=current_user.id)
+            tasks.append((result, task))
+    
+    db.session.commit()
+    task_tracker.watch(*[task for _, task in tasks])
+    for result, task in tasks:
+        result['task_id'] = task.id
+        result['task_url'] = url_for('api.get_task', task_id=task.id)
+    
+    succeeded = sum(1 for result in results if result['success'])
+    return jsonify({
+        'success': succeeded == len(results),
+        'summary': {'total': len(results), 'succeeded': succeeded, 'failed': len(results) - succeeded},
+        'results': results
+    }), 202 if tasks else 200
 
 @api_bp.route('/vms/<int:vmid>', methods=['GET'])
 @login_required
@@ -50,8 +290,39 @@ def create_vm():
     if not node:
         return jsonify({'error': 'Node is required'}), 400
     
+    # Hand out a pre-built VM from the warm pool when one is available
+    if data.get('warm_pool', True):
+        vm = warm_pool.claim(
+            data.get('ostype', 'win10'),
+            data.get('software', []),
+            current_user.id,
+            data.get('name', f'vm-{current_user.username}'),
+            node=node,
+            cores=data.get('cores'),
+            memory=data.get('memory'),
+            description=data.get('description')
+        )
+        if vm:
+            vm.auto_scaling_enabled = data.get('auto_scaling_enabled', False)
+            db.session.commit()
+            return jsonify({
+                'success': True,
+                'warm_pool': True,
+                'vm': {
+                    'id': vm.id,
+                    'proxmox_id': vm.proxmox_id,
+                    'name': vm.name,
+                    'node': vm.proxmox_node
+                }
+            }), 201
+    
+    vmid = proxmox_service.get_next_vmid()
+    if not vmid:
+        return jsonify({'error': 'Failed to allocate a VM ID'}), 500
+    
     # Prepare VM creation parameters
     params = {
+        'vmid': vmid,
         'name': data.get('name', f'vm-{current_user.username}'),
         'memory': data.get('memory', 1024),  # MB
         'cores': data.get('cores', 1),
@@ -66,14 +337,17 @@ def create_vm():
     if 'description' in data:
         params['description'] = data['description']
     
-    # Create VM in Proxmox
-    result = proxmox_service.create_vm(node, params)
+    software = data.get('software', [])
+    
+    # Clone a matching template if one is registered, otherwise create from scratch
+    provisioning = data.get('provisioning', current_app.config['PROVISIONING_MODE'])
+    if provisioning not in ('template', 'scratch'):
+        return jsonify({'error': 'Provisioning must be template or scratch'}), 400
+    
+    result = provisioning_service.provision(node, params, software, provisioning)
     if not result:
         return jsonify({'error': 'Failed to create VM'}), 500
     
-    # Get the VM ID from the result
-    vmid = result.get('data')
-    
     # Create VM record in database
     vm = VM(
         name=params['name'],
@@ -88,26 +362,27 @@ def create_vm():
     )
     
     # Add software information if provided
-    software = data.get('software', [])
     if software:
         vm.software_installed = ','.join(software)
     
     # Enable auto-scaling if requested
     vm.auto_scaling_enabled = data.get('auto_scaling_enabled', False)
     
-    # Save to database
+    # Save to database; the row stays 'creating' until the Proxmox task finishes
     db.session.add(vm)
+    db.session.flush()
+    task = task_tracker.create_task(result['node'], result['upid'], result['action'], vm=vm,
+                                    user_id=current_user.id, payload={'config': result['config']})
     db.session.commit()
+    task_tracker.watch(task)
     
-    return jsonify({
-        'success': True,
-        'vm': {
-            'id': vm.id,
-            'proxmox_id': vm.proxmox_id,
-            'name': vm.name,
-            'node': vm.proxmox_node
-        }
-    }), 201
+    return _task_response(task, vm={
+        'id': vm.id,
+        'proxmox_id': vm.proxmox_id,
+        'name': vm.name,
+        'node': vm.proxmox_node,
+        'template_id': result['template'].id if result['template'] else None
+    })
 
 @api_bp.route('/vms/<int:vmid>/start', methods=['POST'])
 @login_required
@@ -117,17 +392,17 @@ def start_vm(vmid):
     if not node:
         return jsonify({'error': 'Node is required'}), 400
     
-    success = proxmox_service.start_vm(node, vmid)
-    if not success:
+    upid = proxmox_service.start_vm(node, vmid)
+    if not upid:
         return jsonify({'error': 'Failed to start VM'}), 500
     
-    # Update VM status in database
+    # The VM row is updated once the task finishes
     vm = VM.query.filter_by(proxmox_id=vmid, proxmox_node=node).first()
-    if vm:
-        vm.status = 'running'
-        db.session.commit()
+    task = task_tracker.create_task(node, upid, 'start', vm=vm, vmid=vmid, user_id=current_user.id)
+    db.session.commit()
+    task_tracker.watch(task)
     
-    return jsonify({'success': True})
+    return _task_response(task)
 
 @api_bp.route('/vms/<int:vmid>/stop', methods=['POST'])
 @login_required
@@ -137,17 +412,17 @@ def stop_vm(vmid):
     if not node:
         return jsonify({'error': 'Node is required'}), 400
     
-    success = proxmox_service.stop_vm(node, vmid)
-    if not success:
+    upid = proxmox_service.stop_vm(node, vmid)
+    if not upid:
         return jsonify({'error': 'Failed to stop VM'}), 500
     
-    # Update VM status in database
+    # The VM row is updated once the task finishes
     vm = VM.query.filter_by(proxmox_id=vmid, proxmox_node=node).first()
-    if vm:
-        vm.status = 'stopped'
-        db.session.commit()
+    task = task_tracker.create_task(node, upid, 'stop', vm=vm, vmid=vmid, user_id=current_user.id)
+    db.session.commit()
+    task_tracker.watch(task)
     
-    return jsonify({'success': True})
+    return _task_response(task)
 
 @api_bp.route('/vms/<int:vmid>', methods=['DELETE'])
 @login_required
@@ -157,17 +432,33 @@ def delete_vm(vmid):
     if not node:
         return jsonify({'error': 'Node is required'}), 400
     
-    success = proxmox_service.delete_vm(node, vmid)
-    if not success:
+    upid = proxmox_service.delete_vm(node, vmid)
+    if not upid:
         return jsonify({'error': 'Failed to delete VM'}), 500
     
-    # Delete VM from database
+    # The VM row is removed once the task finishes
     vm = VM.query.filter_by(proxmox_id=vmid, proxmox_node=node).first()
-    if vm:
-        db.session.delete(vm)
-        db.session.commit()
+    task = task_tracker.create_task(node, upid, 'delete', vm=vm, vmid=vmid, user_id=current_user.id)
+    db.session.commit()
+    task_tracker.watch(task)
     
-    return jsonify({'success': True})
+    return _task_response(task)
+
+@api_bp.route('/tasks/<int:task_id>', methods=['GET'])
+@login_required
+def get_task(task_id):
+    """Get the status of a Proxmox lifecycle task."""
+    task = Task.query.get(task_id)
+    if not task:
+        return jsonify({'error': 'Task not found'}), 404
+    
+    # Poll directly if no worker has checked the task recently (e.g. it was restarted)
+    stale_after = current_app.config['TASK_STALE_AFTER']
+    last_polled = task.last_polled_at or task.created_at
+    if not task.done and (datetime.utcnow() - last_polled).total_seconds() > stale_after:
+        task_tracker.refresh(task)
+    
+    return jsonify({'task': _task_to_dict(task)})
 
 @api_bp.route('/vms/<int:vmid>/resources', methods=['GET'])
 @login_required
@@ -183,6 +474,55 @@ def get_vm_resources(vmid):
     
     return jsonify({'resources': resources})
 
+@api_bp.route('/vms/stream', methods=['GET'])
+@login_required
+def stream_vm_metrics():
+    """Stream live resource usage for a set of VMs as Server-Sent Events.
+    
+    The vms parameter is a comma-separated list of vmid or node:vmid entries.
+    """
+    vmids = set()
+    nodes = set()
+    all_have_nodes = True
+    for entry in filter(None, request.args.get('vms', '').split(',')):
+        node, _, vmid = entry.rpartition(':')
+        if not vmid.isdigit():
+            return jsonify({'error': f'Invalid VM {entry}'}), 400
+        vmids.add(int(vmid))
+        if node:
+            nodes.add(node)
+        else:
+            all_have_nodes = False
+    
+    if not vmids:
+        return jsonify({'error': 'vms parameter is required'}), 400
+    max_vms = current_app.config['METRICS_STREAM_MAX_VMS']
+    if len(vmids) > max_vms:
+        return jsonify({'error': f'At most {max_vms} VMs can be streamed at once'}), 400
+    
+    # Only narrow the poll to nodes if every VM came with one
+    if not all_have_nodes:
+        nodes = set()
+    
+    subscription = metrics_broadcaster.subscribe(vmids, nodes)
+    keepalive = current_app.config['METRICS_STREAM_KEEPALIVE']
+    
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    payload = subscription.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'event: metrics\ndata: {json.dumps(payload)}\n\n'
+        finally:
+            metrics_broadcaster.unsubscribe(subscription)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @api_bp.route('/vms/<int:vmid>/config', methods=['GET'])
 @login_required
 def get_vm_config(vmid):
@@ -224,6 +564,227 @@ def update_vm_config(vmid):
     
     return jsonify({'success': True})
 
+@api_bp.route('/proxmox/cache', methods=['GET'])
+@login_required
+def get_proxmox_cache_stats():
+    """Get hit/miss statistics for the Proxmox read cache."""
+    return jsonify({'cache': proxmox_service.cache_stats()})
+
+@api_bp.route('/templates', methods=['GET'])
+@login_required
+def get_templates():
+    """Get templates registered for clone-based provisioning."""
+    templates = VMTemplate.query.order_by(VMTemplate.os_type, VMTemplate.software).all()
+    return jsonify({'templates': [_template_to_dict(t) for t in templates]})
+
+@api_bp.route('/templates', methods=['POST'])
+@login_required
+def register_template():
+    """Register an existing Proxmox template for an OS type and software combination."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Administrator access required'}), 403
+    
+    data = request.json
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    node = data.get('node')
+    vmid = data.get('vmid')
+    os_type = data.get('os_type')
+    if not node or not isinstance(vmid, int) or not os_type:
+        return jsonify({'error': 'node, integer vmid and os_type are required'}), 400
+    
+    software = data.get('software', [])
+    unknown = set(software) - set(current_app.config['SOFTWARE_OPTIONS'])
+    if unknown:
+        return jsonify({'error': f"Unknown software options: {', '.join(sorted(unknown))}"}), 400
+    
+    config = proxmox_service.get_vm_config(node, vmid)
+    if not config:
+        return jsonify({'error': 'VM not found'}), 404
+    if not config.get('template'):
+        return jsonify({'error': 'VM is not a Proxmox template'}), 400
+    
+    template = VMTemplate(
+        name=data.get('name', config.get('name', f'template-{vmid}')),
+        proxmox_id=vmid,
+        proxmox_node=node,
+        os_type=os_type,
+        software=software_key(software),
+        linked_clone=data.get('linked_clone', True)
+    )
+    db.session.add(template)
+    db.session.commit()
+    
+    return jsonify({'success': True, 'template': _template_to_dict(template)}), 201
+
+@api_bp.route('/templates/<int:template_id>', methods=['DELETE'])
+@login_required
+def unregister_template(template_id):
+    """Stop using a template for provisioning (the Proxmox template is kept)."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Administrator access required'}), 403
+    
+    template = VMTemplate.query.get(template_id)
+    if not template:
+        return jsonify({'error': 'Template not found'}), 404
+    
+    db.session.delete(template)
+    db.session.commit()
+    return jsonify({'success': True})
+
+def _template_to_dict(template):
+    """Serialize a VMTemplate row."""
+    return {
+        'id': template.id,
+        'name': template.name,
+        'vmid': template.proxmox_id,
+        'node': template.proxmox_node,
+        'os_type': template.os_type,
+        'software': template.software.split(',') if template.software else [],
+        'linked_clone': template.linked_clone
+    }
+
+@api_bp.route('/scaling-policies', methods=['GET'])
+@login_required
+def get_scaling_policies():
+    """Get auto-scaling policies."""
+    policies = ScalingPolicy.query.order_by(ScalingPolicy.name).all()
+    counts = _policy_vm_counts(policies)
+    return jsonify({'scaling_policies': [_policy_to_dict(p, counts) for p in policies]})
+
+@api_bp.route('/scaling-policies', methods=['POST'])
+@login_required
+def create_scaling_policy():
+    """Create an auto-scaling policy; name it 'default' to change the policy of unassigned VMs."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Administrator access required'}), 403
+    
+    data = request.json
+    if not data or not data.get('name'):
+        return jsonify({'error': 'name is required'}), 400
+    if ScalingPolicy.query.filter_by(name=data['name']).first():
+        return jsonify({'error': 'A policy with this name already exists'}), 409
+    
+    policy = ScalingPolicy()
+    error = _apply_policy_fields(policy, data)
+    if error:
+        return jsonify({'error': error}), 400
+    db.session.add(policy)
+    if not _commit_policy():
+        return jsonify({'error': 'A policy with this name already exists'}), 409
+    
+    return jsonify({'success': True, 'scaling_policy': _policy_to_dict(policy, {})}), 201
+
+@api_bp.route('/scaling-policies/<int:policy_id>', methods=['PUT'])
+@login_required
+def update_scaling_policy(policy_id):
+    """Update an auto-scaling policy; fields set to null fall back to the defaults."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Administrator access required'}), 403
+    
+    policy = ScalingPolicy.query.get(policy_id)
+    if not policy:
+        return jsonify({'error': 'Policy not found'}), 404
+    
+    data = request.json or {}
+    if data.get('name') and ScalingPolicy.query.filter(
+            ScalingPolicy.name == data['name'], ScalingPolicy.id != policy.id).first():
+        return jsonify({'error': 'A policy with this name already exists'}), 409
+    
+    error = _apply_policy_fields(policy, data)
+    if error:
+        return jsonify({'error': error}), 400
+    if not _commit_policy():
+        return jsonify({'error': 'A policy with this name already exists'}), 409
+    
+    return jsonify({'success': True, 'scaling_policy': _policy_to_dict(policy, _policy_vm_counts([policy]))})
+
+@api_bp.route('/scaling-policies/<int:policy_id>', methods=['DELETE'])
+@login_required
+def delete_scaling_policy(policy_id):
+    """Delete an auto-scaling policy; its VMs fall back to the default policy."""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Administrator access required'}), 403
+    
+    policy = ScalingPolicy.query.get(policy_id)
+    if not policy:
+        return jsonify({'error': 'Policy not found'}), 404
+    
+    VM.query.filter_by(scaling_policy_id=policy.id).update({'scaling_policy_id': None}, synchronize_session=False)
+    db.session.delete(policy)
+    db.session.commit()
+    return jsonify({'success': True})
+
+@api_bp.route('/vms/<int:vmid>/scaling-policy', methods=['PUT'])
+@login_required
+def assign_scaling_policy(vmid):
+    """Assign a scaling policy to a VM, or clear it with a null policy_id."""
+    vm = VM.query.filter_by(proxmox_id=vmid).first()
+    if not vm:
+        return jsonify({'error': 'VM not found'}), 404
+    if vm.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    policy_id = (request.json or {}).get('policy_id')
+    if policy_id is not None and not ScalingPolicy.query.get(policy_id):
+        return jsonify({'error': 'Policy not found'}), 404
+    
+    vm.scaling_policy_id = policy_id
+    db.session.commit()
+    return jsonify({'success': True})
+
+def _apply_policy_fields(policy, data):
+    """Copy policy fields from request data; returns an error message or None.
+
+    The policy is checked as it will be resolved, with null fields falling
+    back to the defaults, so a partial update cannot leave it inconsistent.
+    """
+    if 'name' in data:
+        if not data['name'] or not isinstance(data['name'], str):
+            return 'name must be a non-empty string'
+        policy.name = data['name']
+    for field in POLICY_FIELDS:
+        if field not in data:
+            continue
+        value = data[field]
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            return f'{field} must be a number or null'
+        if value is not None and field in INTEGER_POLICY_FIELDS and not isinstance(value, int):
+            return f'{field} must be an integer or null'
+        setattr(policy, field, value)
+    return policy_settings_error(policy_settings(policy, current_app.config))
+
+def _commit_policy():
+    """Commit a created or renamed policy; returns False if its name is already taken."""
+    try:
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # Another request took the name between the check and the commit
+        db.session.rollback()
+        return False
+
+def _policy_vm_counts(policies):
+    """Return {policy id: number of VMs assigned} for policies in one grouped query."""
+    ids = [policy.id for policy in policies]
+    if not ids:
+        return {}
+    return dict(db.session.query(VM.scaling_policy_id, func.count(VM.id))
+                .filter(VM.scaling_policy_id.in_(ids)).group_by(VM.scaling_policy_id).all())
+
+def _policy_to_dict(policy, vm_counts):
+    """Serialize a ScalingPolicy row; vm_counts comes from _policy_vm_counts()."""
+    data = {field: getattr(policy, field) for field in POLICY_FIELDS}
+    data.update(id=policy.id, name=policy.name, vms=vm_counts.get(policy.id, 0))
+    return data
+
+@api_bp.route('/warm-pool', methods=['GET'])
+@login_required
+def get_warm_pool_stats():
+    """Get warm pool sizes and hit/miss counts."""
+    return jsonify({'warm_pool': warm_pool.stats()})
+
 @api_bp.route('/software', methods=['GET'])
 @login_required
 def get_software_options():
@@ -234,13 +795,78 @@ def get_software_options():
 @api_bp.route('/vms/<int:vmid>/scaling_events', methods=['GET'])
 @login_required
 def get_scaling_events(vmid):
-    """Get scaling events for a VM."""
+    """Get scaling events for a VM, newest first.
+    
+    Supports cursor/limit pagination, since/until ISO-8601 filters and
+    format=ndjson to stream the full matching history.
+    """
     vm = VM.query.filter_by(proxmox_id=vmid).first()
     if not vm:
         return jsonify({'error': 'VM not found'}), 404
     
-    events = ScalingEvent.query.filter_by(vm_id=vm.id).order_by(ScalingEvent.timestamp.desc()).all()
-    events_data = [{
+    try:
+        since = _parse_timestamp(request.args.get('since'))
+        until = _parse_timestamp(request.args.get('until'))
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO-8601 timestamps'}), 400
+    
+    if request.args.get('format') == 'ndjson':
+        events = scaling_history_service.iter_events(vm.id, since, until)
+        return _ndjson_response(_scaling_event_to_dict(event) for event in events)
+    
+    max_page_size = current_app.config['SCALING_EVENTS_MAX_PAGE_SIZE']
+    limit = min(request.args.get('limit', 100, type=int), max_page_size)
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    
+    try:
+        events, next_cursor = scaling_history_service.get_page(
+            vm.id, limit, request.args.get('cursor'), since, until)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'scaling_events': [_scaling_event_to_dict(event) for event in events],
+        'next_cursor': next_cursor
+    })
+
+@api_bp.route('/vms/<int:vmid>/scaling_history', methods=['GET'])
+@login_required
+def get_scaling_history(vmid):
+    """Get hourly or daily scaling aggregates for a VM, including rolled-up history."""
+    vm = VM.query.filter_by(proxmox_id=vmid).first()
+    if not vm:
+        return jsonify({'error': 'VM not found'}), 404
+    
+    try:
+        since = _parse_timestamp(request.args.get('since'))
+        until = _parse_timestamp(request.args.get('until'))
+        summary = scaling_history_service.get_summary(vm.id, since, until, request.args.get('period'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    for bucket in summary:
+        bucket['bucket_start'] = bucket['bucket_start'].isoformat()
+    return jsonify({'scaling_history': summary})
+
+def _parse_timestamp(value):
+    """Parse an optional ISO-8601 timestamp query parameter into naive UTC, like the DateTime columns.
+
+    Timestamps with an offset (e.g. 'Z' or '+02:00') are converted to UTC;
+    naive ones are taken as UTC already.
+    """
+    if not value:
+        return None
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'  # fromisoformat only accepts 'Z' from Python 3.11
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+def _scaling_event_to_dict(event):
+    """Serialize a ScalingEvent row."""
+    return {
         'id': event.id,
         'event_type': event.event_type,
         'cpu_usage': event.cpu_usage,
@@ -248,7 +874,8 @@ def get_scaling_events(vmid):
         'new_cpu_cores': event.new_cpu_cores,
         'old_memory_mb': event.old_memory_mb,
         'new_memory_mb': event.new_memory_mb,
+        'migrated_from': event.migrated_from,
+        'migrated_to': event.migrated_to,
+        'task_id': event.task_id,
         'timestamp': event.timestamp.isoformat()
-    } for event in events]
-    
-    return jsonify({'scaling_events': events_data})
+    }
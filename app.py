@@ -1,5 +1,9 @@
 from app import create_app
 from app.services.auto_scaling_service import AutoScalingService
+from app.services.warm_pool_service import warm_pool
+from app.services.scaling_retention_service import scaling_retention
+from app.services.inventory_service import inventory_reconciler
+import atexit
 import os
 
 # Create the application instance
@@ -8,15 +12,31 @@ app = create_app(os.getenv('FLASK_CONFIG', 'default'))
 # Initialize auto-scaling service
 auto_scaling_service = AutoScalingService()
 
-@app.before_first_request
-def start_auto_scaling():
-    """Start the auto-scaling service when the application starts."""
-    auto_scaling_service.start()
+# Background services, stopped in reverse order
+BACKGROUND_SERVICES = (auto_scaling_service, warm_pool, scaling_retention, inventory_reconciler)
 
-@app.teardown_appcontext
-def stop_auto_scaling(exception=None):
-    """Stop the auto-scaling service when the application stops."""
-    auto_scaling_service.stop()
+def start_background_services():
+    """Start the auto-scaling, warm pool, retention and inventory services in this process.
+
+    Each gunicorn worker imports this module and starts its own services;
+    the coordinator leases decide which worker does the work. Start the
+    app without --preload so the threads are not created in the master.
+    """
+    with app.app_context():
+        for service in BACKGROUND_SERVICES:
+            service.start(app)
+
+def stop_background_services():
+    """Stop the background services when the process exits."""
+    for service in reversed(BACKGROUND_SERVICES):
+        service.stop()
+
+# Started once per process at import, not per request: app contexts are torn
+# down after every request and inside the service loops themselves
+if app.config['BACKGROUND_SERVICES_ENABLED']:
+    start_background_services()
+    atexit.register(stop_background_services)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # The reloader would import this module again in a second process
+    app.run(host='0.0.0.0', port=5000, debug=True, use_reloader=False)
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import aiohttp
+from flask import current_app
+from app.services.proxmox_service import (
+    _normalize_node_resource,
+    _normalize_vm_resource,
+    _resources_from_status
+)
+
+logger = logging.getLogger(__name__)
+
+class AsyncProxmoxService:
+    """Asyncio variant of ProxmoxService backed by a pooled aiohttp session.
+
+    Methods mirror ProxmoxService and follow the same conventions: failures
+    are logged and reported as None, [] or False instead of raising. The
+    session is bound to the event loop that calls connect(), so an instance
+    must only be used from that loop.
+    """
+
+    def __init__(self, config=None):
+        """Initialize the client; config defaults to current_app.config on connect."""
+        self.config = config
+        self.session = None
+        self.base_url = None
+        self.connected = False
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self):
+        """Open a pooled HTTP session using API token authentication."""
+        if self.connected:
+            return True
+
+        try:
+            config = self.config if self.config is not None else current_app.config
+            host = config['PROXMOX_HOST']
+            if ':' not in host:
+                host = f'{host}:8006'
+            self.base_url = f'https://{host}/api2/json'
+
+            token = f"{config['PROXMOX_USER']}!{config['PROXMOX_TOKEN_NAME']}={config['PROXMOX_TOKEN_VALUE']}"
+            pool_size = config.get('PROXMOX_ASYNC_POOL_SIZE', 100)
+            connector = aiohttp.TCPConnector(
+                limit=pool_size,
+                limit_per_host=pool_size,
+                keepalive_timeout=config.get('PROXMOX_KEEPALIVE_TIMEOUT', 60),
+                # Same certificate check as the synchronous client
+                ssl=bool(config.get('PROXMOX_VERIFY_SSL', False))
+            )
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=config.get('PROXMOX_CONNECT_TIMEOUT', 5),
+                sock_read=config.get('PROXMOX_READ_TIMEOUT', 30)
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={'Authorization': f'PVEAPIToken={token}'}
+            )
+            self.connected = True
+            logger.info(f"Opened async Proxmox session to {host}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to Proxmox API: {str(e)}")
+            self.connected = False
+            return False
+
+    async def close(self):
+        """Close the HTTP session and its pooled connections."""
+        if self.session is not None:
+            await self.session.close()
+        self.session = None
+        self.connected = False
+
+    async def _request(self, method, path, **params):
+        """Send a request and return the 'data' member of the response."""
+        if not self.connected and not await self.connect():
+            raise ConnectionError("Not connected to Proxmox API")
+
+        kwargs = {'params': params} if method in ('GET', 'DELETE') else {'data': params}
+        async with self.session.request(method, f'{self.base_url}/{path}', **kwargs) as response:
+            response.raise_for_status()
+            body = await response.json()
+            return body.get('data')
+
+    async def get_cluster_resources(self, resource_type=None):
+        """Get VMs, nodes and storage for the whole cluster in one request."""
+        try:
+            params = {'type': resource_type} if resource_type else {}
+            return await self._request('GET', 'cluster/resources', **params)
+        except Exception as e:
+            logger.error(f"Failed to get cluster resources: {str(e)}")
+            return None
+
+    async def get_nodes(self):
+        """Get list of Proxmox nodes."""
+        resources = await self.get_cluster_resources('node')
+        if resources is not None:
+            return [_normalize_node_resource(r) for r in resources if r.get('type') == 'node']
+
+        try:
+            return await self._request('GET', 'nodes')
+        except Exception as e:
+            logger.error(f"Failed to get nodes: {str(e)}")
+            return []
+
+    async def get_vms(self, node=None):
+        """Get list of VMs, optionally filtered by node."""
+        if not node:
+            resources = await self.get_cluster_resources('vm')
+            if resources is not None:
+                return [_normalize_vm_resource(r) for r in resources if r.get('type') == 'qemu']
+
+        nodes = [node] if node else sorted(n['node'] for n in await self.get_nodes())
+        results = await asyncio.gather(
+            *(self._request('GET', f'nodes/{n}/qemu') for n in nodes),
+            return_exceptions=True
+        )
+
+        vms = []
+        for node_name, node_vms in zip(nodes, results):
+            if isinstance(node_vms, Exception):
+                logger.error(f"Failed to get VMs on node {node_name}: {str(node_vms)}")
+                continue
+            for vm in node_vms:
+                vm['node'] = node_name
+            vms.extend(sorted(node_vms, key=lambda vm: int(vm.get('vmid', 0))))
+        return vms
+
+    async def get_vm(self, node, vmid):
+        """Get VM details by node and ID."""
+        status = await self.get_vm_status(node, vmid)
+        if not status:
+            return None
+
+        vm = dict(status)
+        vm['node'] = node
+        vm['vmid'] = vmid
+        return vm
+
+    async def create_vm(self, node, params):
+        """Create a new VM on the specified node and return the task UPID."""
+        try:
+            return await self._request('POST', f'nodes/{node}/qemu', **params)
+        except Exception as e:
+            logger.error(f"Failed to create VM on node {node}: {str(e)}")
+            return None
+
+    async def start_vm(self, node, vmid):
+        """Start a VM.
+
+        Returns the task UPID (or True if Proxmox did not return one), False on failure.
+        """
+        try:
+            upid = await self._request('POST', f'nodes/{node}/qemu/{vmid}/status/start')
+            return upid or True
+        except Exception as e:
+            logger.error(f"Failed to start VM {vmid} on node {node}: {str(e)}")
+            return False
+
+    async def stop_vm(self, node, vmid):
+        """Stop a VM.
+
+        Returns the task UPID (or True if Proxmox did not return one), False on failure.
+        """
+        try:
+            upid = await self._request('POST', f'nodes/{node}/qemu/{vmid}/status/stop')
+            return upid or True
+        except Exception as e:
+            logger.error(f"Failed to stop VM {vmid} on node {node}: {str(e)}")
+            return False
+
+    async def delete_vm(self, node, vmid):
+        """Delete a VM.
+
+        Returns the task UPID (or True if Proxmox did not return one), False on failure.
+        """
+        try:
+            upid = await self._request('DELETE', f'nodes/{node}/qemu/{vmid}')
+            return upid or True
+        except Exception as e:
+            logger.error(f"Failed to delete VM {vmid} on node {node}: {str(e)}")
+            return False
+
+    async def get_vm_config(self, node, vmid):
+        """Get VM configuration."""
+        try:
+            return await self._request('GET', f'nodes/{node}/qemu/{vmid}/config')
+        except Exception as e:
+            logger.error(f"Failed to get VM {vmid} config on node {node}: {str(e)}")
+            return None
+
+    async def update_vm_config(self, node, vmid, params):
+        """Update VM configuration."""
+        try:
+            await self._request('PUT', f'nodes/{node}/qemu/{vmid}/config', **params)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update VM {vmid} config on node {node}: {str(e)}")
+            return False
+
+    async def get_vm_status(self, node, vmid):
+        """Get VM status."""
+        try:
+            return await self._request('GET', f'nodes/{node}/qemu/{vmid}/status/current')
+        except Exception as e:
+            logger.error(f"Failed to get VM {vmid} status on node {node}: {str(e)}")
+            return None
+
+    async def get_vm_resources(self, node, vmid):
+        """Get VM resource usage."""
+        status = await self.get_vm_status(node, vmid)
+        if not status:
+            return None
+        return _resources_from_status(status)
+
+    async def get_vm_rrddata(self, node, vmid, timeframe='hour', cf='AVERAGE'):
+        """Get RRD time-series data for a VM."""
+        try:
+            return await self._request('GET', f'nodes/{node}/qemu/{vmid}/rrddata', timeframe=timeframe, cf=cf)
+        except Exception as e:
+            logger.error(f"Failed to get VM {vmid} RRD data on node {node}: {str(e)}")
+            return []
+
+    async def poll_vm_resources(self, vms, concurrency=None):
+        """Poll status/current for many (node, vmid) pairs concurrently.
+
+        At most `concurrency` requests are in flight at once. Returns a dict
+        keyed by vmid in the same shape as ProxmoxService.get_vm_metrics;
+        VMs whose poll failed are left out.
+        """
+        if concurrency is None:
+            config = self.config if self.config is not None else current_app.config
+            concurrency = config.get('PROXMOX_ASYNC_CONCURRENCY', 200)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def poll(node, vmid):
+            async with semaphore:
+                status = await self.get_vm_status(node, vmid)
+            if not status:
+                return None
+            resources = _resources_from_status(status)
+            resources['node'] = node
+            resources['status'] = status.get('status')
+            return resources
+
+        vms = list(vms)
+        results = await asyncio.gather(*(poll(node, vmid) for node, vmid in vms))
+        return {int(vmid): resources for (node, vmid), resources in zip(vms, results) if resources}
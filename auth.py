@@ -1,15 +1,105 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
-from flask_login import login_user, logout_user, login_required, current_user
+from flask import Blueprint, current_app, render_template, redirect, session, url_for, flash, request
+from flask_login import UserMixin, login_user, logout_user, login_required, current_user
 from app.models.models import User
+from app.services.ttl_cache import TTLCache
 from app import db, login_manager
+import threading
+import time
 import pyotp
 
 auth_bp = Blueprint('auth', __name__)
 
+# Session key holding the principal in AUTH_SESSION_PRINCIPAL mode
+PRINCIPAL_SESSION_KEY = '_principal'
+
+# Principals loaded by this process, keyed by user id
+_principal_cache = None
+_principal_cache_lock = threading.Lock()
+
+
+class Principal(UserMixin):
+    """The user fields request handlers need, detached from any database session.
+    
+    Handlers that change the user load the User row with db.session.get().
+    """
+    
+    def __init__(self, id, username, email, is_admin):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.is_admin = bool(is_admin)
+    
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.is_admin)
+    
+    def to_dict(self):
+        return {'id': self.id, 'username': self.username, 'email': self.email, 'is_admin': self.is_admin}
+
+
+def get_principal_cache():
+    """Return the process-wide principal cache, creating it on first use."""
+    global _principal_cache
+    if _principal_cache is None:
+        with _principal_cache_lock:
+            if _principal_cache is None:
+                _principal_cache = TTLCache(current_app.config.get('AUTH_PRINCIPAL_CACHE_MAX_SIZE', 1024))
+    return _principal_cache
+
+def _store_session_principal(principal):
+    """Carry the principal in the signed session cookie."""
+    session[PRINCIPAL_SESSION_KEY] = dict(principal.to_dict(), at=time.time())
+
+def _session_principal(user_id):
+    """Return the principal stored in the session if it belongs to user_id and is recent enough."""
+    data = session.get(PRINCIPAL_SESSION_KEY)
+    if not data or str(data.get('id')) != user_id:
+        return None
+    if time.time() - data.get('at', 0) > current_app.config['AUTH_SESSION_PRINCIPAL_MAX_AGE']:
+        return None
+    return Principal(data['id'], data['username'], data['email'], data['is_admin'])
+
+def refresh_principal(user):
+    """Drop this process's cached principal after the user's row changed.
+    
+    Other worker processes keep theirs until AUTH_PRINCIPAL_CACHE_TTL expires.
+    """
+    get_principal_cache().invalidate(str(user.id))
+    if current_app.config['AUTH_SESSION_PRINCIPAL'] and current_user.get_id() == str(user.id):
+        _store_session_principal(Principal.from_user(user))
+    current = current_user._get_current_object()
+    if isinstance(current, Principal) and current.id == user.id:
+        current.email, current.is_admin = user.email, bool(user.is_admin)
+
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID."""
-    return User.query.get(int(user_id))
+    """Load the principal for a user ID.
+    
+    In AUTH_SESSION_PRINCIPAL mode it is read from the signed session;
+    otherwise it is served from a per-process cache for up to
+    AUTH_PRINCIPAL_CACHE_TTL seconds (0 loads the User row every request).
+    """
+    config = current_app.config
+    if config['AUTH_SESSION_PRINCIPAL']:
+        principal = _session_principal(user_id)
+        if principal is not None:
+            return principal
+    
+    ttl = config['AUTH_PRINCIPAL_CACHE_TTL']
+    if ttl <= 0 and not config['AUTH_SESSION_PRINCIPAL']:
+        return db.session.get(User, int(user_id))
+    
+    cache = get_principal_cache()
+    principal = cache.get(user_id)
+    if principal is None:
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        cache.set(user_id, principal, ttl)
+    if config['AUTH_SESSION_PRINCIPAL']:
+        _store_session_principal(principal)
+    return principal
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -32,6 +122,8 @@ def login():
                     return render_template('auth/login.html', mfa_required=True, username=username)
             
             login_user(user)
+            if current_app.config['AUTH_SESSION_PRINCIPAL']:
+                _store_session_principal(Principal.from_user(user))
             next_page = request.args.get('next')
             return redirect(next_page or url_for('main.index'))
         else:
@@ -44,6 +136,7 @@ def login():
 def logout():
     """User logout."""
     logout_user()
+    session.pop(PRINCIPAL_SESSION_KEY, None)
     flash('You have been logged out.', 'info')
     return redirect(url_for('auth.login'))
 
@@ -113,27 +206,30 @@ def setup_mfa(user_id):
 def profile():
     """User profile."""
     if request.method == 'POST':
+        user = db.session.get(User, current_user.id)
         email = request.form.get('email')
         current_password = request.form.get('current_password')
         new_password = request.form.get('new_password')
         confirm_password = request.form.get('confirm_password')
         
-        if email and email != current_user.email:
+        if email and email != user.email:
             if User.query.filter_by(email=email).first():
                 flash('Email already registered.', 'danger')
             else:
-                current_user.email = email
+                user.email = email
                 db.session.commit()
+                refresh_principal(user)
                 flash('Email updated.', 'success')
         
         if current_password and new_password:
-            if not current_user.verify_password(current_password):
+            if not user.verify_password(current_password):
                 flash('Current password is incorrect.', 'danger')
             elif new_password != confirm_password:
                 flash('New passwords do not match.', 'danger')
             else:
-                current_user.password = new_password
+                user.password = new_password
                 db.session.commit()
+                refresh_principal(user)
                 flash('Password updated.', 'success')
     
     return render_template('auth/profile.html')
@@ -144,10 +240,12 @@ def reset_mfa():
     """Reset MFA for a user."""
     if request.method == 'POST':
         password = request.form.get('password')
+        user = db.session.get(User, current_user.id)
         
-        if current_user.verify_password(password):
-            current_user.mfa_secret = pyotp.random_base32()
+        if user.verify_password(password):
+            user.mfa_secret = pyotp.random_base32()
             db.session.commit()
+            refresh_principal(user)
             flash('MFA reset. Please set up your new MFA device.', 'success')
             return redirect(url_for('auth.setup_mfa', user_id=current_user.id))
         else:
@@ -1,28 +1,91 @@
+import math
 import time
+import asyncio
 import logging
 import threading
+from datetime import datetime
 from flask import current_app
+from sqlalchemy import insert, update
 from app import db
-from app.models.models import VM, ScalingEvent
+from app.models.models import VM, ScalingEvent, stamp_vm_versions
 from app.services.proxmox_service import ProxmoxService
+from app.services.async_proxmox_service import AsyncProxmoxService
+from app.services.metrics_store import CPUSampleStore
+from app.services.scaling_coordinator import create_coordinator
+from app.services.scaling_scheduler import CheckScheduler
+from app.services.scaling_engine import create_engine
+from app.services.node_capacity import NodeCapacityIndex
+from app.services.scaling_policy import PolicyTable
+from app.services.task_service import task_tracker
+from app.services.instrumentation import (
+    SCALER_CYCLE_SECONDS, SCALER_OVERRUN_SECONDS, SCALER_VMS_CHECKED, SCALER_VMS_RESIZED
+)
 
 logger = logging.getLogger(__name__)
 
 class AutoScalingService:
-    """Service for auto-scaling VMs based on CPU usage."""
+    """Service for auto-scaling VMs based on CPU, memory, disk I/O and network usage.
+    
+    Thresholds, bounds and step sizes come from each VM's ScalingPolicy
+    (see PolicyTable), and the VMs checked together are evaluated in one
+    pass over a matrix of their metrics.
+    
+    Each VM is checked on its own schedule (see CheckScheduler): VMs close
+    to a threshold are checked every SCALING_MIN_CHECK_INTERVAL seconds and
+    stable ones back off towards SCALING_MAX_CHECK_INTERVAL. The thread
+    wakes whenever checks are due and handles at most
+    SCALING_MAX_CHECKS_PER_TICK of them at a time.
+    """
     
     def __init__(self):
         """Initialize the auto-scaling service."""
         self.proxmox_service = ProxmoxService()
         self.running = False
         self.thread = None
+        self.app = None
+        self.last_cycle = None
+        self.cpu_samples = None
+        self.coordinator = None
+        self.scheduler = None
+        self.engine = None
+        self._roster_due = 0
+        self._wake = threading.Event()
+        self.async_proxmox_service = None
+        self._loop = None
+        self.node_capacity = None
+        self.policies = None
+        self._io_counters = {}  # vm_id -> (epoch seconds, disk bytes, network bytes)
+        self._io_rates = {}  # vm_id -> (disk MB/s, network MB/s)
+        self._pending_vm_updates = []
+        self._pending_events = []
+        self._metrics_snapshot = None  # (monotonic time, metrics keyed by vmid)
     
-    def start(self):
+    def start(self, app=None):
         """Start the auto-scaling service in a background thread."""
         if self.running:
             logger.info("Auto-scaling service is already running")
             return False
         
+        # The scaling thread has no app context of its own
+        self.app = app or current_app._get_current_object()
+        config = self.app.config
+        self.coordinator = create_coordinator(config)
+        self.engine = create_engine(config)
+        self.node_capacity = NodeCapacityIndex(
+            self.proxmox_service,
+            cpu_reserve=config['SCALING_NODE_CPU_RESERVE'],
+            memory_reserve=config['SCALING_NODE_MEMORY_RESERVE'],
+            max_age=config['SCALING_NODE_CAPACITY_REFRESH']
+        )
+        self.scheduler = CheckScheduler(
+            config['SCALING_INTERVAL'],
+            config['SCALING_MIN_CHECK_INTERVAL'],
+            config['SCALING_MAX_CHECK_INTERVAL'],
+            backoff=config['SCALING_CHECK_BACKOFF'],
+            jitter=config['SCALING_CHECK_JITTER']
+        )
+        self._roster_due = 0
+        self._wake.clear()
         self.running = True
         self.thread = threading.Thread(target=self._run_scaling_loop)
         self.thread.daemon = True
@@ -37,6 +100,7 @@ class AutoScalingService:
             return False
         
         self.running = False
+        self._wake.set()
         if self.thread:
             self.thread.join(timeout=5)
         logger.info("Auto-scaling service stopped")
@@ -48,81 +112,372 @@ class AutoScalingService:
         
         while self.running:
             try:
-                with current_app.app_context():
-                    self._check_vms_for_scaling()
+                with self.app.app_context():
+                    self._run_due_checks()
             except Exception as e:
                 logger.error(f"Error in auto-scaling loop: {str(e)}")
             
-            # Sleep for a while before the next check
-            time.sleep(60)  # Check every minute
+            # Sleep until the next VM is due or the roster needs refreshing
+            now = time.monotonic()
+            next_due = self.scheduler.next_due()
+            wake_at = self._roster_due if next_due is None else min(next_due, self._roster_due)
+            self._wake.wait(max(wake_at - now, self.app.config['SCALING_MIN_TICK']))
+        
+        self._close_async_client()
+        with self.app.app_context():
+            self.coordinator.release()
     
-    def _check_vms_for_scaling(self):
-        """Check all VMs with auto-scaling enabled and scale if necessary."""
-        # Get all VMs with auto-scaling enabled
-        vms = VM.query.filter_by(auto_scaling_enabled=True).all()
+    def _run_due_checks(self):
+        """Refresh the set of VMs this worker owns if needed, then check the VMs that are due."""
+        config = current_app.config
+        now = time.monotonic()
+        if now >= self._roster_due:
+            self._refresh_roster()
+            # Renew often enough that the coordinator's lease or heartbeat never lapses
+            self._roster_due = now + min(config['SCALING_INTERVAL'], config['SCALING_LEASE_TTL'] / 3)
         
-        if not vms:
-            logger.debug("No VMs with auto-scaling enabled")
+        next_due = self.scheduler.next_due()
+        due = self.scheduler.pop_due(now, config['SCALING_MAX_CHECKS_PER_TICK'])
+        if not due:
             return
+        SCALER_OVERRUN_SECONDS.observe(max(now - next_due, 0.0))
+        
+        # Retry writes that failed last tick; VMs whose new size is still
+        # unrecorded are skipped, as their rows hold the old size
+        self._flush_scaling_writes()
+        unrecorded = {vm_update['id'] for vm_update in self._pending_vm_updates}
+        vms = [vm for vm in VM.query.filter(VM.id.in_(due), VM.auto_scaling_enabled.is_(True))
+               if vm.id not in unrecorded]
+        signals = self._check_vms_for_scaling(vms) if vms else {}
+        
+        now = time.monotonic()
+        for vm_id in due:
+            self.scheduler.reschedule(vm_id, now, signals.get(vm_id))
+    
+    def _refresh_roster(self):
+        """Schedule the auto-scaling VMs this worker owns and drop the rest."""
+        # Get all VMs with auto-scaling enabled, keeping the ones this worker owns
+        owned = self.coordinator.assign(
+            db.session.query(VM.id).filter_by(auto_scaling_enabled=True).all())
+        vm_ids = [vm.id for vm in owned]
+        
+        self.scheduler.sync(vm_ids, time.monotonic())
+        # Policy edits take effect on the next refresh
+        self.policies = PolicyTable.load(current_app.config)
+        self.engine.retain(vm_ids)
+        owned_ids = set(vm_ids)
+        for counters in (self._io_counters, self._io_rates):
+            for vm_id in [v for v in counters if v not in owned_ids]:
+                del counters[vm_id]
+        self.engine.load_history(vm_ids)
+        if self.cpu_samples is not None:
+            # Windows from VMs now owned elsewhere would be stale if they come back
+            self.cpu_samples.retain(vm_ids)
+        logger.debug(f"Auto-scaling {len(vm_ids)} VMs on this worker ({self.coordinator.status()})")
+    
+    def _check_vms_for_scaling(self, vms):
+        """Check the given VMs and scale them if necessary.
+        
+        Returns {vm_id: urgent} for VMs that produced a CPU reading, where
+        urgent is True if the VM was resized or is close to a threshold.
+        """
+        started = time.monotonic()
+        logger.debug(f"Checking {len(vms)} VMs for auto-scaling")
+        
+        # Pull CPU usage for the due VMs in one bulk request
+        metrics = self._collect_metrics(vms)
+        if metrics is None:
+            logger.warning("Could not get VM metrics, skipping auto-scaling check")
+            return {}
         
-        logger.info(f"Checking {len(vms)} VMs for auto-scaling")
+        if self.cpu_samples is None:
+            self.cpu_samples = CPUSampleStore(current_app.config['SCALING_WINDOW_SIZE'])
+        if current_app.config['SCALING_RRD_BACKFILL']:
+            self._backfill_samples(vms, metrics)
         
+        # Record this cycle's samples, then aggregate the windows of all VMs at once
+        candidates = []
         for vm in vms:
             try:
-                self._check_vm_for_scaling(vm)
+                if self._check_vm_for_scaling(vm, metrics.get(vm.proxmox_id)):
+                    candidates.append(vm)
             except Exception as e:
                 logger.error(f"Error checking VM {vm.id} for scaling: {str(e)}")
+        
+        cpu_averages = self.cpu_samples.aggregate(
+            [vm.id for vm in candidates],
+            method=current_app.config['SCALING_AGGREGATION'],
+            min_samples=current_app.config['SCALING_MIN_SAMPLES']
+        )
+        
+        # Evaluate every policy in one pass; only VMs that need a change cost a round trip
+        decisions = []
+        for vm, action, cpu_signal, cpu_usage, policy in self._evaluate_policies(candidates, cpu_averages, metrics):
+            if action and self.engine.allow(vm.id, action, cpu_signal, policy['cpu_high'], policy['cpu_low'],
+                                            cpu_usage):
+                decisions.append((vm, (action, cpu_usage), policy))
+        
+        if any(action == 'scale_up' for _, (action, _), _ in decisions):
+            # Scale-ups are placed against current node headroom
+            self.node_capacity.refresh()
+        
+        scaled = 0
+        resized_ids = set()
+        for vm, (action, cpu_usage), policy in decisions:
+            try:
+                if action == 'scale_up':
+                    resized = self._scale_up(vm, cpu_usage, policy)
+                else:
+                    resized = self._scale_down(vm, cpu_usage, policy)
+                if resized:
+                    # Samples taken at the old size no longer describe the VM
+                    self.cpu_samples.reset(vm.id)
+                    self.engine.record_resize(vm.id, action)
+                    resized_ids.add(vm.id)
+                    scaled += 1
+                    if len(self._pending_events) >= current_app.config['SCALING_COMMIT_CHUNK']:
+                        self._flush_scaling_writes()
+            except Exception as e:
+                logger.error(f"Error scaling VM {vm.id}: {str(e)}")
+        
+        self._flush_scaling_writes()
+        
+        signals = {}
+        now = time.time()
+        for vm in candidates:
+            cpu_usage = cpu_averages.get(vm.id)
+            if cpu_usage is None:
+                cpu_usage = metrics[vm.proxmox_id].get('cpu_usage', 0)
+            signal = self.engine.signal(vm.id, cpu_usage, now)
+            policy = self.policies.settings[self.policies.row_for(vm)]
+            signals[vm.id] = vm.id in resized_ids or self._near_threshold(signal, policy)
+        
+        duration = time.monotonic() - started
+        SCALER_CYCLE_SECONDS.observe(duration)
+        SCALER_VMS_CHECKED.inc(amount=len(vms))
+        SCALER_VMS_RESIZED.inc(amount=scaled)
+        self.last_cycle = {
+            'vms_checked': len(vms),
+            'vms_flagged': len(decisions),
+            'vms_scaled': scaled,
+            'vms_scheduled': len(self.scheduler),
+            'engine': self.engine.stats(),
+            'duration_seconds': duration
+        }
+        log = logger.info if decisions else logger.debug
+        log(f"Auto-scaling check finished in {duration:.2f}s: "
+            f"{len(vms)} checked, {len(decisions)} flagged, {scaled} scaled")
+        return signals
+    
+    def _near_threshold(self, cpu_usage, policy):
+        """Return True if CPU usage is within SCALING_NEAR_THRESHOLD_MARGIN of crossing a policy threshold."""
+        margin = current_app.config['SCALING_NEAR_THRESHOLD_MARGIN']
+        high = policy['cpu_high']
+        low = policy['cpu_low']
+        return high - margin <= cpu_usage <= high or low <= cpu_usage <= low + margin
+    
+    def _evaluate_policies(self, vms, cpu_averages, metrics):
+        """Evaluate the scaling policies of VMs with a full sample window.
+        
+        Builds one row of [CPU signal, memory %, disk MB/s, network MB/s]
+        per VM and hands the whole matrix to the policy table. Yields
+        (vm, action, cpu_signal, cpu_usage, policy) tuples.
+        """
+        now = time.time()
+        ready, rows, values = [], [], []
+        for vm in vms:
+            cpu_usage = cpu_averages.get(vm.id)
+            if cpu_usage is None:
+                logger.debug(f"VM {vm.id} does not have enough CPU samples yet")
+                continue
+            resources = metrics[vm.proxmox_id]
+            memory_total = resources.get('memory_total') or 0
+            memory = resources.get('memory_usage', 0) * 100 / memory_total if memory_total else math.nan
+            disk_io, network = self._io_rates.get(vm.id, (math.nan, math.nan))
+            
+            cpu_signal = self.engine.signal(vm.id, cpu_usage, now)
+            ready.append((vm, cpu_signal, cpu_usage))
+            rows.append(self.policies.row_for(vm))
+            values.append((cpu_signal, memory, disk_io, network))
+        
+        actions = self.policies.evaluate(rows, values)
+        for (vm, cpu_signal, cpu_usage), row, action in zip(ready, rows, actions):
+            yield vm, action, cpu_signal, cpu_usage, self.policies.settings[row]
+    
+    def _record_io(self, vm_id, resources):
+        """Turn a VM's cumulative disk and network counters into MB/s rates."""
+        now = time.time()
+        disk, network = resources.get('disk_io_bytes'), resources.get('network_bytes')
+        previous = self._io_counters.get(vm_id)
+        self._io_counters[vm_id] = (now, disk, network)
+        if previous is None or disk is None or network is None:
+            return
+        
+        at, previous_disk, previous_network = previous
+        elapsed = now - at
+        if elapsed <= 0 or disk < previous_disk or network < previous_network:
+            # Counters reset when the VM restarts
+            self._io_rates.pop(vm_id, None)
+            return
+        self._io_rates[vm_id] = ((disk - previous_disk) / elapsed / (1024 * 1024),
+                                 (network - previous_network) / elapsed / (1024 * 1024))
+    
+    def _collect_metrics(self, vms):
+        """Fetch resource usage for the given VMs, keyed by vmid.
+        
+        In bulk mode one snapshot of every VM serves all ticks within
+        SCALING_METRICS_MAX_AGE seconds, so checks spread over many ticks
+        still cost about one cluster-wide pull per window.
+        """
+        config = current_app.config
+        if config['SCALING_METRICS_SOURCE'] == 'async':
+            return self._collect_metrics_async(vms)
+        
+        now = time.monotonic()
+        if self._metrics_snapshot is not None:
+            fetched_at, metrics = self._metrics_snapshot
+            if now - fetched_at < config['SCALING_METRICS_MAX_AGE']:
+                return metrics
+        
+        metrics = self.proxmox_service.get_vm_metrics()
+        if metrics is not None:
+            self._metrics_snapshot = (now, metrics)
+        return metrics
+    
+    def _collect_metrics_async(self, vms):
+        """Poll each running VM's status concurrently on the async client."""
+        if self._loop is None:
+            # The loop and its pooled session live for the lifetime of the scaling thread
+            self._loop = asyncio.new_event_loop()
+            self.async_proxmox_service = AsyncProxmoxService(dict(current_app.config))
+        
+        keys = [(vm.proxmox_node, vm.proxmox_id) for vm in vms if vm.status == 'running']
+        return self._loop.run_until_complete(self.async_proxmox_service.poll_vm_resources(keys))
+    
+    def _close_async_client(self):
+        """Close the async session and event loop owned by the scaling thread."""
+        if self._loop is None:
+            return
+        
+        try:
+            self._loop.run_until_complete(self.async_proxmox_service.close())
+        finally:
+            self._loop.close()
+            self._loop = None
+            self.async_proxmox_service = None
+    
+    def _queue_scaling_write(self, vm, event_type, cpu_usage, old_cpu_cores, new_cpu_cores,
+                             old_memory_mb, new_memory_mb):
+        """Queue a VM resize and its ScalingEvent for the next batched flush."""
+        now = datetime.utcnow()
+        self._pending_vm_updates.append({
+            'id': vm.id,
+            'cpu_cores': new_cpu_cores,
+            'memory_mb': new_memory_mb,
+            'last_modified': now
+        })
+        self._pending_events.append({
+            'event_type': event_type,
+            'cpu_usage': cpu_usage,
+            'old_cpu_cores': old_cpu_cores,
+            'new_cpu_cores': new_cpu_cores,
+            'old_memory_mb': old_memory_mb,
+            'new_memory_mb': new_memory_mb,
+            'timestamp': now,
+            'vm_id': vm.id
+        })
+    
+    def _flush_scaling_writes(self):
+        """Write queued VM updates and ScalingEvents with bulk statements in one transaction."""
+        if not self._pending_events and not self._pending_vm_updates:
+            return
+        
+        vm_updates, self._pending_vm_updates = self._pending_vm_updates, []
+        events, self._pending_events = self._pending_events, []
+        try:
+            if vm_updates:
+                db.session.execute(update(VM), vm_updates)
+                # Bulk UPDATEs bypass the ORM flush that collects VM changes
+                stamp_vm_versions(db.session, [vm_update['id'] for vm_update in vm_updates])
+            if events:
+                db.session.execute(insert(ScalingEvent), events)
+            db.session.commit()
+            logger.debug(f"Flushed {len(vm_updates)} VM updates and {len(events)} scaling events")
+        except Exception as e:
+            db.session.rollback()
+            # The resizes already happened in Proxmox; keep the batch and retry it next tick
+            self._pending_vm_updates[:0] = vm_updates
+            self._pending_events[:0] = events
+            logger.error(f"Failed to record {len(events)} scaling events, will retry: {str(e)}")
+            return
     
-    def _check_vm_for_scaling(self, vm):
-        """Check a single VM for scaling needs."""
+    def _check_vm_for_scaling(self, vm, resources):
+        """Record a CPU sample for a single VM.
+        
+        Returns True if the VM is running and should be evaluated this cycle.
+        """
         # Skip VMs that are not running
         if vm.status != 'running':
             logger.debug(f"VM {vm.id} is not running, skipping auto-scaling check")
-            return
+            return False
         
-        # Get current CPU usage
-        resources = self.proxmox_service.get_vm_resources(vm.proxmox_node, vm.proxmox_id)
         if not resources:
             logger.warning(f"Could not get resources for VM {vm.id}")
-            return
+            return False
+        
+        if resources.get('status') not in (None, 'running'):
+            logger.debug(f"VM {vm.id} is {resources['status']} in Proxmox, skipping auto-scaling check")
+            return False
         
         cpu_usage = resources.get('cpu_usage', 0)
         logger.debug(f"VM {vm.id} CPU usage: {cpu_usage}%")
+        self.cpu_samples.add(vm.id, cpu_usage)
+        self.engine.observe(vm.id, cpu_usage)
+        self._record_io(vm.id, resources)
+        return True
+    
+    def _backfill_samples(self, vms, metrics):
+        """Seed the sample windows of running VMs seen for the first time from Proxmox RRD data.
         
-        # Get thresholds from config
-        cpu_threshold_high = current_app.config['CPU_THRESHOLD_HIGH']
-        cpu_threshold_low = current_app.config['CPU_THRESHOLD_LOW']
+        At most SCALING_RRD_BACKFILL_PER_TICK VMs are seeded per tick, with
+        their RRD requests run concurrently; the rest start from live samples.
+        """
+        new_vms = [vm for vm in vms if vm.id not in self.cpu_samples and vm.status == 'running'
+                   and metrics.get(vm.proxmox_id) and metrics[vm.proxmox_id].get('status') in (None, 'running')]
+        new_vms = new_vms[:current_app.config['SCALING_RRD_BACKFILL_PER_TICK']]
+        if not new_vms:
+            return
         
-        # Check if scaling is needed
-        if cpu_usage > cpu_threshold_high:
-            self._scale_up(vm, cpu_usage)
-        elif cpu_usage < cpu_threshold_low:
-            self._scale_down(vm, cpu_usage)
+        rrddata = self.proxmox_service.get_vms_rrddata([(vm.proxmox_node, vm.proxmox_id) for vm in new_vms])
+        for vm in new_vms:
+            points = rrddata.get((vm.proxmox_node, vm.proxmox_id)) or []
+            samples = [p['cpu'] * 100 for p in points if p.get('cpu') is not None]
+            # The newest RRD point overlaps with the live sample taken this cycle
+            samples = samples[-self.cpu_samples.window:-1]
+            if samples:
+                self.cpu_samples.extend(vm.id, samples)
+                logger.debug(f"Backfilled {len(samples)} CPU samples for VM {vm.id}")
     
-    def _scale_up(self, vm, cpu_usage):
-        """Scale up a VM by increasing CPU cores and memory."""
-        logger.info(f"Scaling up VM {vm.id} (CPU usage: {cpu_usage}%)")
+    def _scale_up(self, vm, cpu_usage, policy):
+        """Scale up a VM by increasing CPU cores and memory by its policy's steps.
         
-        # Get current configuration
-        config = self.proxmox_service.get_vm_config(vm.proxmox_node, vm.proxmox_id)
-        if not config:
-            logger.warning(f"Could not get config for VM {vm.id}")
-            return
+        Returns True if the VM was resized.
+        """
+        logger.info(f"Scaling up VM {vm.id} (CPU usage: {cpu_usage}%)")
         
         # Calculate new resources
         old_cpu_cores = vm.cpu_cores
         old_memory_mb = vm.memory_mb
         
-        # Increase CPU cores by 1, up to a maximum of 4
-        new_cpu_cores = min(old_cpu_cores + 1, 4)
-        
-        # Increase memory by 25%, up to a maximum of 8192 MB (8 GB)
-        new_memory_mb = min(int(old_memory_mb * 1.25), 8192)
+        # Increase CPU cores and memory by the policy's steps, up to its maximums (never shrinking)
+        new_cpu_cores = max(min(old_cpu_cores + policy['cpu_step'], policy['max_cpu_cores']), old_cpu_cores)
+        new_memory_mb = max(min(int(old_memory_mb * policy['memory_step_up']), policy['max_memory_mb']),
+                            old_memory_mb)
         
         # Only proceed if there's an actual change
         if new_cpu_cores == old_cpu_cores and new_memory_mb == old_memory_mb:
             logger.info(f"VM {vm.id} already at maximum resources, not scaling up")
-            return
+            return False
         
         # Update VM configuration in Proxmox
         params = {}
@@ -132,54 +487,45 @@ class AutoScalingService:
             params['memory'] = new_memory_mb
         
         if params:
+            if not self.node_capacity.has_headroom(vm.proxmox_node, new_cpu_cores - old_cpu_cores,
+                                                   new_memory_mb - old_memory_mb):
+                return self._migrate_and_scale_up(vm, cpu_usage, params, old_cpu_cores, new_cpu_cores,
+                                                  old_memory_mb, new_memory_mb)
+            
             success = self.proxmox_service.update_vm_config(vm.proxmox_node, vm.proxmox_id, params)
             if success:
-                # Update VM record in database
-                vm.cpu_cores = new_cpu_cores
-                vm.memory_mb = new_memory_mb
-                
-                # Create scaling event record
-                event = ScalingEvent(
-                    event_type='scale_up',
-                    cpu_usage=cpu_usage,
-                    old_cpu_cores=old_cpu_cores,
-                    new_cpu_cores=new_cpu_cores,
-                    old_memory_mb=old_memory_mb,
-                    new_memory_mb=new_memory_mb,
-                    vm_id=vm.id
-                )
-                
-                db.session.add(event)
-                db.session.commit()
+                self.node_capacity.reserve(vm.proxmox_node, new_cpu_cores - old_cpu_cores,
+                                           new_memory_mb - old_memory_mb)
+                # Queue the VM update and scaling event for the cycle's batched flush
+                self._queue_scaling_write(vm, 'scale_up', cpu_usage, old_cpu_cores, new_cpu_cores,
+                                          old_memory_mb, new_memory_mb)
                 
                 logger.info(f"VM {vm.id} scaled up: CPU {old_cpu_cores} -> {new_cpu_cores}, Memory {old_memory_mb} -> {new_memory_mb}")
+                return True
             else:
                 logger.error(f"Failed to scale up VM {vm.id}")
+        return False
     
-    def _scale_down(self, vm, cpu_usage):
-        """Scale down a VM by decreasing CPU cores and memory."""
-        logger.info(f"Scaling down VM {vm.id} (CPU usage: {cpu_usage}%)")
+    def _scale_down(self, vm, cpu_usage, policy):
+        """Scale down a VM by decreasing CPU cores and memory by its policy's steps.
         
-        # Get current configuration
-        config = self.proxmox_service.get_vm_config(vm.proxmox_node, vm.proxmox_id)
-        if not config:
-            logger.warning(f"Could not get config for VM {vm.id}")
-            return
+        Returns True if the VM was resized.
+        """
+        logger.info(f"Scaling down VM {vm.id} (CPU usage: {cpu_usage}%)")
         
         # Calculate new resources
         old_cpu_cores = vm.cpu_cores
         old_memory_mb = vm.memory_mb
         
-        # Decrease CPU cores by 1, down to a minimum of 1
-        new_cpu_cores = max(old_cpu_cores - 1, 1)
-        
-        # Decrease memory by 20%, down to a minimum of 512 MB
-        new_memory_mb = max(int(old_memory_mb * 0.8), 512)
+        # Decrease CPU cores and memory by the policy's steps, down to its minimums (never growing)
+        new_cpu_cores = min(max(old_cpu_cores - policy['cpu_step'], policy['min_cpu_cores']), old_cpu_cores)
+        new_memory_mb = min(max(int(old_memory_mb * policy['memory_step_down']), policy['min_memory_mb']),
+                            old_memory_mb)
         
         # Only proceed if there's an actual change
         if new_cpu_cores == old_cpu_cores and new_memory_mb == old_memory_mb:
             logger.info(f"VM {vm.id} already at minimum resources, not scaling down")
-            return
+            return False
         
         # Update VM configuration in Proxmox
         params = {}
@@ -191,24 +537,63 @@ class AutoScalingService:
         if params:
             success = self.proxmox_service.update_vm_config(vm.proxmox_node, vm.proxmox_id, params)
             if success:
-                # Update VM record in database
-                vm.cpu_cores = new_cpu_cores
-                vm.memory_mb = new_memory_mb
-                
-                # Create scaling event record
-                event = ScalingEvent(
-                    event_type='scale_down',
-                    cpu_usage=cpu_usage,
-                    old_cpu_cores=old_cpu_cores,
-                    new_cpu_cores=new_cpu_cores,
-                    old_memory_mb=old_memory_mb,
-                    new_memory_mb=new_memory_mb,
-                    vm_id=vm.id
-                )
-                
-                db.session.add(event)
-                db.session.commit()
+                self.node_capacity.reserve(vm.proxmox_node, new_cpu_cores - old_cpu_cores,
+                                           new_memory_mb - old_memory_mb)
+                # Queue the VM update and scaling event for the cycle's batched flush
+                self._queue_scaling_write(vm, 'scale_down', cpu_usage, old_cpu_cores, new_cpu_cores,
+                                          old_memory_mb, new_memory_mb)
                 
                 logger.info(f"VM {vm.id} scaled down: CPU {old_cpu_cores} -> {new_cpu_cores}, Memory {old_memory_mb} -> {new_memory_mb}")
+                return True
             else:
                 logger.error(f"Failed to scale down VM {vm.id}")
+        return False
+    
+    def _migrate_and_scale_up(self, vm, cpu_usage, params, old_cpu_cores, new_cpu_cores,
+                              old_memory_mb, new_memory_mb):
+        """Live-migrate a VM off its saturated node, resizing it once the migration finishes.
+        
+        Returns True if the migration was started.
+        """
+        config = current_app.config
+        source = vm.proxmox_node
+        target = self.node_capacity.pick_target(source, new_cpu_cores, new_memory_mb) \
+            if config['SCALING_MIGRATION'] else None
+        if target is None:
+            logger.warning(f"Node {source} has no headroom to scale up VM {vm.id} and no other node can take it")
+            return False
+        
+        upid = self.proxmox_service.migrate_vm(source, vm.proxmox_id, target,
+                                               with_local_disks=config['SCALING_MIGRATE_WITH_LOCAL_DISKS'])
+        if not upid:
+            logger.error(f"Failed to migrate VM {vm.id} from {source} to {target}")
+            return False
+        
+        # The task tracker applies the new size and records the scaling event
+        # once the VM is on the target node; the migration is tracked at once
+        # so a later failure in this cycle cannot leave it unwatched
+        scaling = {
+            'event_type': 'scale_up',
+            'cpu_usage': cpu_usage,
+            'old_cpu_cores': old_cpu_cores,
+            'new_cpu_cores': new_cpu_cores,
+            'old_memory_mb': old_memory_mb,
+            'new_memory_mb': new_memory_mb
+        }
+        try:
+            task = task_tracker.create_task(source, upid, 'migrate', vm=vm,
+                                            payload={'target': target, 'config': params, 'scaling': scaling})
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to record migration {upid} of VM {vm.id}: {str(e)}")
+            return False
+        task_tracker.watch(task)
+        
+        # The source node's capacity is given back by the next index refresh,
+        # once Proxmox reports the VM gone from it
+        self.node_capacity.reserve(target, new_cpu_cores, new_memory_mb)
+        
+        logger.info(f"VM {vm.id} migrating from {source} to {target} before scaling up: "
+                    f"CPU {old_cpu_cores} -> {new_cpu_cores}, Memory {old_memory_mb} -> {new_memory_mb}")
+        return True
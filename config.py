@@ -7,6 +7,12 @@ load_dotenv()
 class Config:
     """Base configuration class."""
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key-for-development-only')
+    
+    # Logged-in principal: cached per process, or carried in the signed session cookie
+    AUTH_PRINCIPAL_CACHE_TTL = float(os.environ.get('AUTH_PRINCIPAL_CACHE_TTL', '60'))  # seconds, 0 disables
+    AUTH_PRINCIPAL_CACHE_MAX_SIZE = int(os.environ.get('AUTH_PRINCIPAL_CACHE_MAX_SIZE', '1024'))
+    AUTH_SESSION_PRINCIPAL = os.environ.get('AUTH_SESSION_PRINCIPAL', 'false').lower() == 'true'
+    AUTH_SESSION_PRINCIPAL_MAX_AGE = int(os.environ.get('AUTH_SESSION_PRINCIPAL_MAX_AGE', '300'))  # seconds
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Proxmox configuration
@@ -14,16 +20,133 @@ class Config:
     PROXMOX_USER = os.environ.get('PROXMOX_USER', 'root@pam')
     PROXMOX_TOKEN_NAME = os.environ.get('PROXMOX_TOKEN_NAME', '')
     PROXMOX_TOKEN_VALUE = os.environ.get('PROXMOX_TOKEN_VALUE', '')
+    # 'cluster' lists VMs/nodes with one /cluster/resources call, 'node' queries each node
+    PROXMOX_INVENTORY_MODE = os.environ.get('PROXMOX_INVENTORY_MODE', 'cluster')
+    PROXMOX_VERIFY_SSL = os.environ.get('PROXMOX_VERIFY_SSL', 'false').lower() == 'true'
+    
+    # Shared HTTP connection pool (one per process, reused by every ProxmoxService)
+    PROXMOX_POOL_SIZE = int(os.environ.get('PROXMOX_POOL_SIZE', '32'))
+    PROXMOX_CONNECT_TIMEOUT = float(os.environ.get('PROXMOX_CONNECT_TIMEOUT', '5'))  # seconds
+    PROXMOX_READ_TIMEOUT = float(os.environ.get('PROXMOX_READ_TIMEOUT', '30'))  # seconds
+    PROXMOX_CONNECT_RETRIES = int(os.environ.get('PROXMOX_CONNECT_RETRIES', '2'))
+    PROXMOX_KEEPALIVE_TIMEOUT = float(os.environ.get('PROXMOX_KEEPALIVE_TIMEOUT', '60'))  # seconds, async client
+    
+    # Maximum number of concurrent per-node requests
+    PROXMOX_MAX_WORKERS = int(os.environ.get('PROXMOX_MAX_WORKERS', '8'))
+    # Async client (used by the scaler when SCALING_METRICS_SOURCE is 'async')
+    PROXMOX_ASYNC_POOL_SIZE = int(os.environ.get('PROXMOX_ASYNC_POOL_SIZE', '100'))
+    PROXMOX_ASYNC_CONCURRENCY = int(os.environ.get('PROXMOX_ASYNC_CONCURRENCY', '200'))
+    
+    # Proxmox read cache (TTLs in seconds, 0 disables caching for that read)
+    PROXMOX_CACHE_MAX_SIZE = int(os.environ.get('PROXMOX_CACHE_MAX_SIZE', '4096'))
+    PROXMOX_CACHE_TTL_NODES = float(os.environ.get('PROXMOX_CACHE_TTL_NODES', '30'))
+    PROXMOX_CACHE_TTL_STATUS = float(os.environ.get('PROXMOX_CACHE_TTL_STATUS', '5'))
+    PROXMOX_CACHE_TTL_CONFIG = float(os.environ.get('PROXMOX_CACHE_TTL_CONFIG', '60'))
     
     # OAuth configuration
     OAUTH_PROVIDER = os.environ.get('OAUTH_PROVIDER', 'google')
     OAUTH_CLIENT_ID = os.environ.get('OAUTH_CLIENT_ID', '')
     OAUTH_CLIENT_SECRET = os.environ.get('OAUTH_CLIENT_SECRET', '')
     
+    # Auto-scaler, warm pool, retention and inventory threads started by app.py (off for CLI commands)
+    BACKGROUND_SERVICES_ENABLED = os.environ.get('BACKGROUND_SERVICES_ENABLED', 'true').lower() == 'true'
+    
     # Auto-scaling configuration
     CPU_THRESHOLD_HIGH = float(os.environ.get('CPU_THRESHOLD_HIGH', '80.0'))  # percentage
     CPU_THRESHOLD_LOW = float(os.environ.get('CPU_THRESHOLD_LOW', '20.0'))  # percentage
     SCALING_INTERVAL = int(os.environ.get('SCALING_INTERVAL', '300'))  # seconds
+    # Per-VM check scheduling: near-threshold VMs use the minimum interval, stable VMs back off
+    SCALING_MIN_CHECK_INTERVAL = int(os.environ.get('SCALING_MIN_CHECK_INTERVAL', '30'))  # seconds
+    SCALING_MAX_CHECK_INTERVAL = int(os.environ.get('SCALING_MAX_CHECK_INTERVAL', '900'))  # seconds
+    SCALING_CHECK_BACKOFF = float(os.environ.get('SCALING_CHECK_BACKOFF', '1.5'))
+    SCALING_CHECK_JITTER = float(os.environ.get('SCALING_CHECK_JITTER', '0.1'))  # +/- fraction of each interval
+    SCALING_NEAR_THRESHOLD_MARGIN = float(os.environ.get('SCALING_NEAR_THRESHOLD_MARGIN', '10'))  # CPU % points
+    SCALING_MAX_CHECKS_PER_TICK = int(os.environ.get('SCALING_MAX_CHECKS_PER_TICK', '50'))
+    SCALING_MIN_TICK = float(os.environ.get('SCALING_MIN_TICK', '1'))  # seconds between scheduler wake-ups
+    # Decision engine: 'threshold', 'ewma', 'holt' or a dotted path to a custom engine class
+    SCALING_ENGINE = os.environ.get('SCALING_ENGINE', 'holt')
+    SCALING_COOLDOWN_UP = int(os.environ.get('SCALING_COOLDOWN_UP', '300'))  # seconds after a resize
+    SCALING_COOLDOWN_DOWN = int(os.environ.get('SCALING_COOLDOWN_DOWN', '900'))  # seconds after a resize
+    SCALING_HYSTERESIS = float(os.environ.get('SCALING_HYSTERESIS', '5'))  # extra CPU % points to reverse a resize
+    SCALING_FORECAST_ALPHA = float(os.environ.get('SCALING_FORECAST_ALPHA', '0.5'))  # level smoothing
+    SCALING_FORECAST_BETA = float(os.environ.get('SCALING_FORECAST_BETA', '0.3'))  # trend smoothing
+    SCALING_FORECAST_HORIZON = int(os.environ.get('SCALING_FORECAST_HORIZON', '300'))  # seconds ahead
+    # Node headroom: scale-ups that would leave less than this share of a node free migrate the VM first
+    SCALING_NODE_CPU_RESERVE = float(os.environ.get('SCALING_NODE_CPU_RESERVE', '0.1'))
+    SCALING_NODE_MEMORY_RESERVE = float(os.environ.get('SCALING_NODE_MEMORY_RESERVE', '0.1'))
+    SCALING_NODE_CAPACITY_REFRESH = int(os.environ.get('SCALING_NODE_CAPACITY_REFRESH', '30'))  # seconds
+    SCALING_MIGRATION = os.environ.get('SCALING_MIGRATION', 'true').lower() == 'true'
+    SCALING_MIGRATE_WITH_LOCAL_DISKS = os.environ.get('SCALING_MIGRATE_WITH_LOCAL_DISKS', 'true').lower() == 'true'
+    SCALING_WINDOW_SIZE = int(os.environ.get('SCALING_WINDOW_SIZE', '5'))  # CPU samples kept per VM
+    SCALING_MIN_SAMPLES = int(os.environ.get('SCALING_MIN_SAMPLES', '3'))  # samples needed before deciding
+    SCALING_AGGREGATION = os.environ.get('SCALING_AGGREGATION', 'mean')  # 'mean' or a percentile such as 'p90'
+    SCALING_COMMIT_CHUNK = int(os.environ.get('SCALING_COMMIT_CHUNK', '500'))  # scaling writes per transaction
+    # 'bulk' pulls /cluster/resources once per cycle, 'async' polls each VM's status concurrently
+    SCALING_METRICS_SOURCE = os.environ.get('SCALING_METRICS_SOURCE', 'bulk')
+    # Seconds one bulk metrics pull is reused across ticks; keep below SCALING_MIN_CHECK_INTERVAL
+    SCALING_METRICS_MAX_AGE = int(os.environ.get('SCALING_METRICS_MAX_AGE', '15'))
+    SCALING_RRD_BACKFILL = os.environ.get('SCALING_RRD_BACKFILL', 'true').lower() == 'true'
+    SCALING_RRD_BACKFILL_PER_TICK = int(os.environ.get('SCALING_RRD_BACKFILL_PER_TICK', '20'))  # VMs seeded per tick
+    # How scaler threads in different workers share VMs: 'lease' (one leader scales every VM),
+    # 'shard' (VMs are hashed across live workers), 'filelock' (single host, no DB) or 'none'
+    SCALING_COORDINATION = os.environ.get('SCALING_COORDINATION', 'lease')
+    SCALING_LEASE_TTL = int(os.environ.get('SCALING_LEASE_TTL', '180'))  # seconds without a heartbeat before takeover
+    SCALING_LOCK_FILE = os.environ.get('SCALING_LOCK_FILE', '/tmp/vmautomation-scaler.lock')
+    
+    # 'template' clones a registered template matching the OS and software, 'scratch' always runs qemu create
+    PROVISIONING_MODE = os.environ.get('PROVISIONING_MODE', 'template')
+    
+    # Warm pools of stopped, pre-built VMs: 'os_type:software[,software]=size' entries separated by ';'
+    # e.g. 'win10:arr_suite=2;win10:office_suite=2;win10:=1' (empty disables the pool)
+    WARM_POOL_SIZES = os.environ.get('WARM_POOL_SIZES', '')
+    WARM_POOL_NODES = [n for n in os.environ.get('WARM_POOL_NODES', '').split(',') if n]  # default: all online nodes
+    WARM_POOL_CORES = int(os.environ.get('WARM_POOL_CORES', '1'))
+    WARM_POOL_MEMORY = int(os.environ.get('WARM_POOL_MEMORY', '1024'))  # MB
+    WARM_POOL_REFILL_INTERVAL = int(os.environ.get('WARM_POOL_REFILL_INTERVAL', '60'))  # seconds
+    WARM_POOL_MAX_BUILDS = int(os.environ.get('WARM_POOL_MAX_BUILDS', '4'))  # per refill round
+    WARM_POOL_NODE_REFRESH = int(os.environ.get('WARM_POOL_NODE_REFRESH', '300'))  # seconds before the node list is re-read
+    
+    # Scaling event history pages
+    SCALING_EVENTS_PAGE_SIZE = int(os.environ.get('SCALING_EVENTS_PAGE_SIZE', '50'))
+    SCALING_EVENTS_MAX_PAGE_SIZE = int(os.environ.get('SCALING_EVENTS_MAX_PAGE_SIZE', '500'))
+    
+    # Scaling event retention: raw rows are rolled into hourly and daily aggregates
+    SCALING_EVENTS_RAW_RETENTION_HOURS = int(os.environ.get('SCALING_EVENTS_RAW_RETENTION_HOURS', '168'))
+    SCALING_ROLLUP_HOURLY_RETENTION_DAYS = int(os.environ.get('SCALING_ROLLUP_HOURLY_RETENTION_DAYS', '90'))
+    SCALING_RETENTION_INTERVAL = int(os.environ.get('SCALING_RETENTION_INTERVAL', '3600'))  # seconds
+    SCALING_RETENTION_BATCH_SIZE = int(os.environ.get('SCALING_RETENTION_BATCH_SIZE', '1000'))  # rows per transaction
+    
+    # Inventory reconciler: keeps the VM table in line with Proxmox
+    INVENTORY_SYNC_INTERVAL = int(os.environ.get('INVENTORY_SYNC_INTERVAL', '30'))  # seconds
+    INVENTORY_MAX_STALENESS = int(os.environ.get('INVENTORY_MAX_STALENESS', '90'))  # seconds before listings go live
+    INVENTORY_SYNC_CHUNK = int(os.environ.get('INVENTORY_SYNC_CHUNK', '500'))  # rows per transaction
+    INVENTORY_TOMBSTONE_RETENTION = int(os.environ.get('INVENTORY_TOMBSTONE_RETENTION', '86400'))  # seconds
+    INVENTORY_IMPORT_UNKNOWN = os.environ.get('INVENTORY_IMPORT_UNKNOWN', 'true').lower() == 'true'
+    # 'db' serves /api/vms from the VM table while it is fresh, 'live' always asks Proxmox
+    INVENTORY_LISTING_SOURCE = os.environ.get('INVENTORY_LISTING_SOURCE', 'db')
+    VM_LISTING_STREAM_CHUNK = int(os.environ.get('VM_LISTING_STREAM_CHUNK', '500'))  # VMs per NDJSON chunk
+    
+    # Prometheus metrics at /metrics (merged across gunicorn workers via PROMETHEUS_MULTIPROC_DIR)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # bearer token scrapers must send; required unless DEBUG or TESTING
+    
+    # Bulk lifecycle operations
+    BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '1000'))
+    BULK_MAX_WORKERS = int(os.environ.get('BULK_MAX_WORKERS', '16'))
+    BULK_MAX_PER_NODE = int(os.environ.get('BULK_MAX_PER_NODE', '4'))
+    
+    # Live metrics stream (Server-Sent Events)
+    METRICS_STREAM_INTERVAL = float(os.environ.get('METRICS_STREAM_INTERVAL', '5'))  # seconds between polls
+    METRICS_STREAM_KEEPALIVE = float(os.environ.get('METRICS_STREAM_KEEPALIVE', '15'))  # seconds
+    METRICS_STREAM_MAX_VMS = int(os.environ.get('METRICS_STREAM_MAX_VMS', '100'))  # per subscription
+    METRICS_STREAM_MAX_PENDING = int(os.environ.get('METRICS_STREAM_MAX_PENDING', '4'))  # queued updates per client
+    
+    # Proxmox task tracking (seconds)
+    TASK_POLL_INITIAL_INTERVAL = float(os.environ.get('TASK_POLL_INITIAL_INTERVAL', '0.5'))
+    TASK_POLL_MAX_INTERVAL = float(os.environ.get('TASK_POLL_MAX_INTERVAL', '10'))
+    TASK_POLL_BACKOFF = float(os.environ.get('TASK_POLL_BACKOFF', '1.5'))
+    TASK_STALE_AFTER = float(os.environ.get('TASK_STALE_AFTER', '30'))
+    TASK_TIMEOUT = float(os.environ.get('TASK_TIMEOUT', '3600'))
     
     # Software options
     SOFTWARE_OPTIONS = {
@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+
+# Gunicorn settings used by start_app.sh (gunicorn -c gunicorn.conf.py app.app:app)
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+
+# /api/vms/stream holds a connection open for as long as a page is open, so each
+# worker serves requests from a thread pool instead of one request at a time
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '32'))
+
+# Each worker imports app.app and starts its own background services; preloading
+# would start them in the master, whose threads do not survive the fork
+preload_app = False
+
+# Workers write Prometheus samples here and /metrics merges them; set before the
+# workers import prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'vmautomation-metrics'))
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be merged into the new counters
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
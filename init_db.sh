@@ -5,6 +5,8 @@ echo "Initializing database..."
 cd /home/ubuntu/devops_project
 source venv/bin/activate
 export FLASK_APP=app.app
+# Migrations only need the app, not the scaler and other background threads
+export BACKGROUND_SERVICES_ENABLED=false
 flask db init
 flask db migrate -m "Initial migration"
 flask db upgrade
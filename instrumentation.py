@@ -0,0 +1,179 @@
+import os
+import time
+import logging
+import functools
+import threading
+import contextvars
+from flask import g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, \
+    generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Latency buckets in seconds, from fast DB queries to slow Proxmox tasks
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# SQL statement types tracked separately; anything else is counted as 'other'
+DB_OPERATIONS = frozenset(('select', 'insert', 'update', 'delete'))
+
+
+def render():
+    """Return the Prometheus text exposition of every metric and its content type.
+
+    With PROMETHEUS_MULTIPROC_DIR set (as gunicorn.conf.py does), every
+    worker writes its samples there and the scrape merges all workers, so
+    counters do not depend on which worker answers.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# Served at /metrics; in multiprocess mode each worker writes to PROMETHEUS_MULTIPROC_DIR
+PROXMOX_CALL_SECONDS = Histogram(
+    'vmautomation_proxmox_call_duration_seconds', 'Duration of ProxmoxService method calls.', ('method',),
+    buckets=DEFAULT_BUCKETS)
+PROXMOX_CALL_ERRORS = Counter(
+    'vmautomation_proxmox_call_errors_total', 'ProxmoxService method calls that raised or logged an error.',
+    ('method',))
+HTTP_REQUEST_SECONDS = Histogram(
+    'vmautomation_http_request_duration_seconds', 'Time to build the response of each route.',
+    ('blueprint', 'endpoint', 'method', 'status'), buckets=DEFAULT_BUCKETS)
+DB_QUERY_SECONDS = Histogram(
+    'vmautomation_db_query_duration_seconds', 'Duration of database statements.', ('operation',),
+    buckets=DEFAULT_BUCKETS)
+DB_QUERY_ERRORS = Counter(
+    'vmautomation_db_query_errors_total', 'Database statements that failed.', ('operation',))
+SCALER_CYCLE_SECONDS = Histogram(
+    'vmautomation_scaler_cycle_duration_seconds', 'Duration of auto-scaling check cycles.', buckets=DEFAULT_BUCKETS)
+SCALER_OVERRUN_SECONDS = Histogram(
+    'vmautomation_scaler_overrun_seconds', 'How late the most overdue VM check of a cycle started.',
+    buckets=DEFAULT_BUCKETS)
+SCALER_VMS_CHECKED = Counter(
+    'vmautomation_scaler_vms_checked_total', 'VMs checked by the auto-scaler.')
+SCALER_VMS_RESIZED = Counter(
+    'vmautomation_scaler_vms_resized_total', 'VMs resized by the auto-scaler.')
+
+# Innermost ProxmoxService call in progress. A context variable rather than a
+# thread-local, so work that _fan_out runs in pool threads reports to its caller
+_current_call = contextvars.ContextVar('proxmox_call', default=None)
+_installed = False
+_install_lock = threading.Lock()
+
+
+class _Call:
+    """Error flag of one ProxmoxService call in progress."""
+
+    __slots__ = ('parent', 'failed')
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.failed = False
+
+    def fail(self):
+        """Flag this call and every call it was made from."""
+        call = self
+        while call is not None and not call.failed:
+            call.failed = True
+            call = call.parent
+
+
+class _ProxmoxErrorHandler(logging.Handler):
+    """Flag the ProxmoxService calls in progress when the service logs an error."""
+
+    def emit(self, record):
+        call = _current_call.get()
+        if call is not None:
+            call.fail()
+
+
+def _timed(method_name, fn):
+    """Wrap a ProxmoxService method to record its latency and errors."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        call = _Call(_current_call.get())
+        token = _current_call.set(call)
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            call.fail()
+            raise
+        finally:
+            _current_call.reset(token)
+            PROXMOX_CALL_SECONDS.labels(method_name).observe(time.perf_counter() - started)
+            if call.failed:
+                PROXMOX_CALL_ERRORS.labels(method_name).inc()
+    return wrapper
+
+
+def instrument_proxmox_service(service_class, service_logger):
+    """Time every public method of service_class and count the errors it raises or logs."""
+    for name, attr in list(vars(service_class).items()):
+        if not name.startswith('_') and callable(attr):
+            setattr(service_class, name, _timed(name, attr))
+    service_logger.addHandler(_ProxmoxErrorHandler(logging.ERROR))
+
+
+def _operation(statement):
+    operation = statement.lstrip()[:6].lower()
+    return operation if operation in DB_OPERATIONS else 'other'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if not started:
+        return
+    DB_QUERY_SECONDS.labels(_operation(statement)).observe(time.perf_counter() - started.pop())
+
+
+def _handle_db_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('metrics_started'):
+        conn.info['metrics_started'].pop()
+    DB_QUERY_ERRORS.labels(_operation(exception_context.statement or '')).inc()
+
+
+def _start_request_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def _observe_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.labels(request.blueprint or '', request.endpoint or 'unmatched', request.method,
+                                    str(response.status_code)).observe(time.perf_counter() - started)
+    return response
+
+
+def _observe_failed_request(exception=None):
+    # after_request is skipped when a view raises
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.labels(request.blueprint or '', request.endpoint or 'unmatched', request.method,
+                                    '500').observe(time.perf_counter() - started)
+
+
+def instrument_app(app):
+    """Record route latencies for app, plus DB and ProxmoxService timings once per process."""
+    global _installed
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+    app.teardown_request(_observe_failed_request)
+
+    with _install_lock:
+        if _installed:
+            return
+        from app.services import proxmox_service
+        instrument_proxmox_service(proxmox_service.ProxmoxService, proxmox_service.logger)
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_db_error)
+        _installed = True
@@ -0,0 +1,280 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, bindparam, func, insert, or_, update
+from app import db
+from app.models.models import VM, InventoryState, VMTombstone, next_inventory_version
+from app.services.proxmox_service import ProxmoxService
+from app.services.scaling_coordinator import DatabaseCoordinator
+from app.services.task_service import PENDING_VM_STATUS
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+# Statuses owned by an in-flight task; the reconciler leaves them alone
+TRANSITIONAL_STATUSES = frozenset(PENDING_VM_STATUS.values())
+
+# VM columns the reconciler keeps in line with Proxmox. cpu_cores is the per-socket
+# 'cores' setting, while /cluster/resources only reports maxcpu (cores x sockets)
+SYNCED_FIELDS = ('name', 'proxmox_node', 'status', 'memory_mb', 'disk_gb')
+
+
+def _snapshot_row(resource):
+    """Map a /cluster/resources qemu entry to VM column values."""
+    return {
+        'name': resource.get('name'),
+        'proxmox_node': resource.get('node'),
+        'status': resource.get('status'),
+        'memory_mb': int(resource.get('maxmem', 0) / MB),
+        'disk_gb': int(resource.get('maxdisk', 0) / GB)
+    }
+
+
+def inventory_status():
+    """Return the current inventory version and how long ago Proxmox was last reconciled."""
+    state = db.session.get(InventoryState, 1)
+    synced_at = state.synced_at if state else None
+    age = (datetime.utcnow() - synced_at).total_seconds() if synced_at else None
+    return {
+        'version': state.version if state else 0,
+        'synced_at': synced_at.isoformat() if synced_at else None,
+        'age_seconds': age,
+        'fresh': age is not None and age <= current_app.config['INVENTORY_MAX_STALENESS']
+    }
+
+
+def vm_to_listing(vm):
+    """Serialize a VM row in the shape of a Proxmox VM listing entry."""
+    return {
+        'vmid': vm.proxmox_id,
+        'name': vm.name,
+        'node': vm.proxmox_node,
+        'status': vm.status,
+        'cpus': vm.cpu_cores,
+        'maxmem': (vm.memory_mb or 0) * MB,
+        'maxdisk': (vm.disk_gb or 0) * GB,
+        'version': vm.version
+    }
+
+
+def vm_changes(since, node=None):
+    """Return (changed, removed) iterators over the VMs whose version is above since.
+
+    changed yields vm_to_listing() entries and removed the vmids to drop;
+    VMs that went missing or moved off node count as removed. Both are
+    read lazily in VM_LISTING_STREAM_CHUNK batches. Returns None if
+    tombstones newer than since were already pruned, in which case the
+    client needs a full listing.
+    """
+    state = db.session.get(InventoryState, 1)
+    if state is not None and since < (state.pruned_version or 0):
+        return None
+
+    chunk = current_app.config['VM_LISTING_STREAM_CHUNK']
+    gone = VM.status == 'missing'
+    if node:
+        gone = or_(gone, VM.proxmox_node != node)
+
+    def changed():
+        query = VM.query.filter(VM.version > since, ~gone).order_by(VM.version)
+        for vm in query.yield_per(chunk):
+            yield vm_to_listing(vm)
+
+    def removed():
+        query = db.session.query(VM.proxmox_id).filter(and_(VM.version > since, gone)).order_by(VM.version)
+        for (proxmox_id,) in query.yield_per(chunk):
+            yield proxmox_id
+        query = db.session.query(VMTombstone.proxmox_id) \
+            .filter(VMTombstone.version > since).order_by(VMTombstone.version)
+        for (proxmox_id,) in query.yield_per(chunk):
+            yield proxmox_id
+
+    return changed(), removed()
+
+
+class InventoryReconciler:
+    """Service that keeps the VM table in line with Proxmox.
+
+    Every INVENTORY_SYNC_INTERVAL seconds one worker (holding the
+    'inventory-reconciler' lease) pulls a single /cluster/resources
+    snapshot, diffs it against the VM table and writes only the rows that
+    changed, in chunks that each get a new inventory version. A row is
+    only overwritten if its version still matches the one read before the
+    snapshot was taken, so changes the app made in the meantime win. VMs that
+    disappeared from Proxmox are marked 'missing'; VMs created outside the
+    app are imported without an owner once they have been seen in two
+    consecutive snapshots.
+    """
+
+    def __init__(self):
+        """Initialize the reconciler."""
+        self.proxmox_service = ProxmoxService()
+        self.app = None
+        self.thread = None
+        self.running = False
+        self.coordinator = None
+        self.last_sync = None
+        self._unknown = set()
+        self._wake = threading.Event()
+
+    def start(self, app=None):
+        """Start reconciling in a background thread."""
+        if self.running:
+            logger.info("Inventory reconciler is already running")
+            return False
+
+        self.app = app or current_app._get_current_object()
+        self.coordinator = DatabaseCoordinator(self.app.config, lease='inventory-reconciler')
+        self.running = True
+        self.thread = threading.Thread(target=self._run_sync_loop, name='inventory-reconciler')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info("Inventory reconciler started")
+        return True
+
+    def stop(self):
+        """Stop the reconciler."""
+        if not self.running:
+            return False
+
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        with self.app.app_context():
+            self.coordinator.release()
+        logger.info("Inventory reconciler stopped")
+        return True
+
+    def _run_sync_loop(self):
+        """Reconcile every INVENTORY_SYNC_INTERVAL seconds while holding the lease."""
+        while self.running:
+            try:
+                with self.app.app_context():
+                    if self.coordinator.acquire():
+                        self.sync_once()
+            except Exception as e:
+                logger.error(f"Error reconciling inventory: {str(e)}")
+
+            self._wake.wait(self.app.config['INVENTORY_SYNC_INTERVAL'])
+            self._wake.clear()
+
+    def sync_once(self):
+        """Diff one cluster snapshot against the VM table and apply the changes.
+
+        Returns a summary dict, or None if Proxmox could not be reached.
+        """
+        config = current_app.config
+        # Read the rows before the snapshot: a row changed by the app after
+        # this point no longer matches its version and is left alone
+        columns = [getattr(VM, field) for field in SYNCED_FIELDS]
+        rows = db.session.query(VM.id, VM.proxmox_id, VM.version, *columns).all()
+        db.session.commit()
+
+        resources = self.proxmox_service.get_cluster_resources('vm')
+        if resources is None:
+            logger.warning("Could not get a cluster snapshot, skipping inventory sync")
+            return None
+
+        snapshot = {
+            int(r['vmid']): _snapshot_row(r)
+            for r in resources if r.get('type') == 'qemu' and not r.get('template')
+        }
+
+        updates = []
+        known = set()
+        for row in rows:
+            known.add(row.proxmox_id)
+            current = snapshot.get(row.proxmox_id)
+            if current is None:
+                if row.status not in TRANSITIONAL_STATUSES and row.status != 'missing':
+                    current = {'status': 'missing'}
+                else:
+                    continue
+
+            changes = {field: value for field, value in current.items()
+                       if value is not None and getattr(row, field) != value}
+            if row.status in TRANSITIONAL_STATUSES:
+                changes.pop('status', None)
+            if changes:
+                # Every update carries all synced columns so they run as one executemany
+                values = {field: getattr(row, field) for field in SYNCED_FIELDS}
+                values.update(changes, _id=row.id, _version=row.version or 0)
+                updates.append(values)
+
+        # A VM created through the app can reach Proxmox before its row is
+        # committed, so only import VMs that stay unknown for two snapshots
+        unknown = set(snapshot) - known
+        inserts = []
+        if config['INVENTORY_IMPORT_UNKNOWN']:
+            inserts = [self._import_row(vmid, snapshot[vmid]) for vmid in sorted(unknown & self._unknown)]
+        self._unknown = unknown
+
+        now = datetime.utcnow()
+        chunk = config['INVENTORY_SYNC_CHUNK']
+        table = VM.__table__
+        statement = update(table).where(
+            table.c.id == bindparam('_id'),
+            func.coalesce(table.c.version, 0) == bindparam('_version'))
+        skipped = 0
+        for start in range(0, len(updates), chunk):
+            batch = updates[start:start + chunk]
+            # Only rows whose version guard matches take the new version; the
+            # version is taken right before the commit, so the counter is locked briefly
+            version = next_inventory_version(db.session)
+            for values in batch:
+                values.update(version=version, last_modified=now)
+            applied = db.session.connection().execute(statement, batch).rowcount
+            if applied is not None and applied >= 0:
+                skipped += len(batch) - applied
+            db.session.commit()
+
+        for start in range(0, len(inserts), chunk):
+            batch = inserts[start:start + chunk]
+            # The version is taken right before the commit, so the counter is locked briefly
+            version = next_inventory_version(db.session)
+            for values in batch:
+                values.update(version=version, created_at=now, last_modified=now)
+            db.session.execute(insert(VM), batch)
+            db.session.commit()
+
+        state = db.session.get(InventoryState, 1) or InventoryState(id=1, version=0)
+        state.synced_at = now
+        db.session.add(state)
+        self._prune_tombstones(state, now - timedelta(seconds=config['INVENTORY_TOMBSTONE_RETENTION']))
+        db.session.commit()
+
+        self.last_sync = {
+            'timestamp': now.isoformat(),
+            'vms': len(snapshot),
+            'updated': len(updates) - skipped,
+            'skipped': skipped,
+            'imported': len(inserts)
+        }
+        if updates or inserts:
+            logger.info(f"Inventory sync: {len(updates) - skipped} VMs updated, "
+                        f"{skipped} skipped as changed since read, {len(inserts)} imported")
+        return self.last_sync
+
+    def _import_row(self, vmid, snapshot_row):
+        """Build the VM row for a VM created outside the app, reading its cores from the VM config."""
+        vm_config = self.proxmox_service.get_vm_config(snapshot_row['proxmox_node'], vmid)
+        # Proxmox leaves cores out of the config when it is the default of 1
+        cores = int(vm_config.get('cores', 1)) if vm_config else None
+        return dict(snapshot_row, proxmox_id=vmid, cpu_cores=cores, auto_scaling_enabled=False)
+
+    def _prune_tombstones(self, state, cutoff):
+        """Delete tombstones older than cutoff; clients behind them get a full listing."""
+        pruned = db.session.query(func.max(VMTombstone.version)) \
+            .filter(VMTombstone.deleted_at < cutoff).scalar()
+        if pruned is None:
+            return
+        VMTombstone.query.filter(VMTombstone.version <= pruned).delete(synchronize_session=False)
+        state.pruned_version = max(state.pruned_version or 0, pruned)
+
+
+# Process-wide reconciler started by the application runner
+inventory_reconciler = InventoryReconciler()
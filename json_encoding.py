@@ -0,0 +1,49 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Match Flask's defaults: sorted keys, and dates serialized by the provider's default()
+ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+
+def dumps(obj):
+    """Serialize obj to compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default, option=ORJSON_OPTIONS)
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits; let the standard encoder try
+    return json.dumps(obj, separators=(',', ':'), default=DefaultJSONProvider.default).encode()
+
+
+def ndjson(entries, batch_size=500):
+    """Encode entries as newline-delimited JSON, yielding batch_size lines per chunk."""
+    batch = []
+    for entry in entries:
+        batch.append(dumps(entry))
+        if len(batch) >= batch_size:
+            yield b'\n'.join(batch) + b'\n'
+            batch = []
+    if batch:
+        yield b'\n'.join(batch) + b'\n'
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed.
+
+    Output matches the default provider (sorted keys, same date format);
+    pretty-printed debug output and anything orjson rejects go through the
+    standard library encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get('indent'):
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+        except TypeError:
+            return super().dumps(obj, **kwargs)
@@ -38,9 +38,11 @@ document.addEventListener('DOMContentLoaded', function() {
     // VM resource usage charts
     const cpuChartCanvas = document.getElementById('cpu-chart');
     const memoryChartCanvas = document.getElementById('memory-chart');
+    let cpuChart = null;
+    let memoryChart = null;
     
     if (cpuChartCanvas && typeof Chart !== 'undefined') {
-        const cpuChart = new Chart(cpuChartCanvas, {
+        cpuChart = new Chart(cpuChartCanvas, {
             type: 'doughnut',
             data: {
                 labels: ['Used', 'Available'],
@@ -61,7 +63,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     if (memoryChartCanvas && typeof Chart !== 'undefined') {
-        const memoryChart = new Chart(memoryChartCanvas, {
+        memoryChart = new Chart(memoryChartCanvas, {
             type: 'doughnut',
             data: {
                 labels: ['Used', 'Available'],
@@ -81,10 +83,118 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Live updates for the resource charts; the VM comes from data-vmid/data-node on the
+    // chart canvases, or else from the page's VM action buttons
+    const streamSource = [cpuChartCanvas, memoryChartCanvas].find(canvas => canvas && canvas.dataset.vmid)
+        || ((cpuChart || memoryChart) && document.querySelector(
+            '.start-vm-btn[data-vmid][data-node], .stop-vm-btn[data-vmid][data-node]'));
+    if (streamSource && streamSource.dataset.vmid) {
+        subscribeToVmMetrics(streamSource.dataset.vmid, streamSource.dataset.node, cpuChart, memoryChart);
+    }
+
     // API calls for VM management
     setupVmApiCalls();
+
+    // Incremental refresh of VM listing tables
+    const vmListing = document.querySelector('tbody[data-vm-listing]');
+    if (vmListing) {
+        setupVmListingRefresh(vmListing);
+    }
 });
 
+// Keep the rows of a VM listing table current by fetching only what changed since the last version
+function setupVmListingRefresh(tbody) {
+    const interval = parseInt(tbody.dataset.refreshInterval || '15', 10) * 1000;
+    const node = tbody.dataset.node;
+    let version = tbody.dataset.version || null;
+    let etag = null;
+
+    function refresh() {
+        if (document.hidden) return;
+
+        const params = new URLSearchParams({ fields: 'name,node,status,cpus,maxmem' });
+        if (node) params.set('node', node);
+        if (version !== null) params.set('since', version);
+        const headers = etag ? { 'If-None-Match': etag } : {};
+
+        fetch(`/api/vms?${params}`, { headers: headers })
+            .then(response => {
+                if (response.status === 304) return null;
+                etag = response.headers.get('ETag');
+                return response.json();
+            })
+            .then(data => {
+                if (!data || !data.vms) return;
+                let removed = data.removed || [];
+                if (data.full && data.source === 'db') {
+                    // A full inventory listing drops every VM it no longer contains
+                    const listed = new Set(data.vms.map(vm => String(vm.vmid)));
+                    removed = Array.from(tbody.querySelectorAll('tr[data-vmid]'), row => row.dataset.vmid)
+                        .filter(vmid => !listed.has(vmid));
+                }
+                removed.forEach(vmid => {
+                    const row = tbody.querySelector(`tr[data-vmid="${vmid}"]`);
+                    if (row) row.remove();
+                });
+                data.vms.forEach(vm => patchVmRow(tbody, vm));
+                // Live listings have no version, so the next poll asks for everything again
+                version = data.source === 'db' ? data.version : null;
+            })
+            .catch(error => console.error('Error refreshing VM list:', error));
+    }
+
+    setInterval(refresh, interval);
+    document.addEventListener('visibilitychange', refresh);
+}
+
+// Update the cells of a VM's table row in place; the table only shows the user's own VMs,
+// so entries without a rendered row are ignored
+function patchVmRow(tbody, vm) {
+    const row = tbody.querySelector(`tr[data-vmid="${vm.vmid}"]`);
+    if (!row) return;
+    row.dataset.node = vm.node;
+
+    const cells = {
+        '.vm-name': vm.name || '',
+        '.vm-cpus': vm.cpus,
+        '.vm-memory': `${Math.round((vm.maxmem || 0) / 1048576)} MB`
+    };
+    Object.entries(cells).forEach(([selector, text]) => {
+        const cell = row.querySelector(selector);
+        if (cell) cell.textContent = text;
+    });
+
+    const status = row.querySelector('.vm-status');
+    if (status) {
+        status.textContent = vm.status;
+        status.className = `vm-status badge ${vm.status === 'running' ? 'bg-success' : 'bg-danger'}`;
+    }
+}
+
+// Subscribe to the shared metrics stream and refresh the resource charts
+function subscribeToVmMetrics(vmId, node, cpuChart, memoryChart) {
+    if (typeof EventSource === 'undefined') return;
+
+    const vms = node ? `${node}:${vmId}` : vmId;
+    const source = new EventSource(`/api/vms/stream?vms=${encodeURIComponent(vms)}`);
+    source.addEventListener('metrics', function(event) {
+        const resources = JSON.parse(event.data)[vmId];
+        if (!resources) return;
+
+        if (cpuChart) {
+            const cpu = Math.min(resources.cpu_usage, 100);
+            cpuChart.data.datasets[0].data = [cpu, 100 - cpu];
+            cpuChart.update();
+        }
+        if (memoryChart && resources.memory_total) {
+            const memory = Math.min(resources.memory_usage / resources.memory_total * 100, 100);
+            memoryChart.data.datasets[0].data = [memory, 100 - memory];
+            memoryChart.update();
+        }
+    });
+    window.addEventListener('beforeunload', () => source.close());
+}
+
 // Setup API calls for VM management
 function setupVmApiCalls() {
     // Start VM button
@@ -143,13 +253,20 @@ function startVm(vmId, node, button) {
     })
     .then(response => response.json())
     .then(data => {
-        if (data.success) {
-            showAlert('VM started successfully', 'success');
-            // Update UI to reflect running state
-            updateVmStatus(vmId, 'running');
-        } else {
+        if (!data.success) {
             showAlert('Failed to start VM: ' + (data.error || 'Unknown error'), 'danger');
+            return;
         }
+        updateVmStatus(vmId, 'starting');
+        return waitForTask(data.task_url).then(task => {
+            if (task.status === 'ok') {
+                showAlert('VM started successfully', 'success');
+                // Update UI to reflect running state
+                updateVmStatus(vmId, 'running');
+            } else {
+                showAlert('Failed to start VM: ' + (task.exit_status || 'Unknown error'), 'danger');
+            }
+        });
     })
     .catch(error => {
         showAlert('Error: ' + error.message, 'danger');
@@ -174,13 +291,20 @@ function stopVm(vmId, node, button) {
     })
     .then(response => response.json())
     .then(data => {
-        if (data.success) {
-            showAlert('VM stopped successfully', 'success');
-            // Update UI to reflect stopped state
-            updateVmStatus(vmId, 'stopped');
-        } else {
+        if (!data.success) {
             showAlert('Failed to stop VM: ' + (data.error || 'Unknown error'), 'danger');
+            return;
         }
+        updateVmStatus(vmId, 'stopping');
+        return waitForTask(data.task_url).then(task => {
+            if (task.status === 'ok') {
+                showAlert('VM stopped successfully', 'success');
+                // Update UI to reflect stopped state
+                updateVmStatus(vmId, 'stopped');
+            } else {
+                showAlert('Failed to stop VM: ' + (task.exit_status || 'Unknown error'), 'danger');
+            }
+        });
     })
     .catch(error => {
         showAlert('Error: ' + error.message, 'danger');
@@ -205,16 +329,22 @@ function deleteVm(vmId, node, button) {
     })
     .then(response => response.json())
     .then(data => {
-        if (data.success) {
-            showAlert('VM deleted successfully', 'success');
-            // Remove VM from UI
-            const vmCard = button.closest('.vm-card');
-            if (vmCard) {
-                vmCard.remove();
-            }
-        } else {
+        if (!data.success) {
             showAlert('Failed to delete VM: ' + (data.error || 'Unknown error'), 'danger');
+            return;
         }
+        return waitForTask(data.task_url).then(task => {
+            if (task.status === 'ok') {
+                showAlert('VM deleted successfully', 'success');
+                // Remove VM from UI
+                const vmCard = button.closest('.vm-card');
+                if (vmCard) {
+                    vmCard.remove();
+                }
+            } else {
+                showAlert('Failed to delete VM: ' + (task.exit_status || 'Unknown error'), 'danger');
+            }
+        });
     })
     .catch(error => {
         showAlert('Error: ' + error.message, 'danger');
@@ -225,6 +355,19 @@ function deleteVm(vmId, node, button) {
     });
 }
 
+// Poll a Proxmox task until it finishes, backing off up to 5 seconds between polls
+function waitForTask(taskUrl, interval = 500) {
+    return fetch(taskUrl)
+        .then(response => response.json())
+        .then(data => {
+            if (data.task && !data.task.done) {
+                return new Promise(resolve => setTimeout(resolve, interval))
+                    .then(() => waitForTask(taskUrl, Math.min(interval * 1.5, 5000)));
+            }
+            return data.task || { status: 'error', exit_status: data.error };
+        });
+}
+
 // Update VM status in UI
 function updateVmStatus(vmId, status) {
     const statusIndicator = document.querySelector(`.vm-status[data-vmid="${vmId}"]`);
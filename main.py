@@ -1,5 +1,11 @@
-from flask import Blueprint, render_template
-from flask_login import login_required
+import hmac
+from flask import Blueprint, Response, abort, current_app, render_template, request
+from flask_login import login_required, current_user
+from sqlalchemy import func
+from app.models.models import VM, ScalingEvent
+from app.services.inventory_service import inventory_status
+from app.services import instrumentation
+from app import db
 
 main_bp = Blueprint('main', __name__)
 
@@ -11,10 +17,45 @@ def index():
 @main_bp.route('/dashboard')
 @login_required
 def dashboard():
-    """Dashboard page."""
-    return render_template('dashboard.html')
+    """Dashboard page, served from the reconciled VM table."""
+    vm_count, running_vm_count, total_cpu_cores, total_memory_mb = db.session.query(
+        func.count(VM.id),
+        func.count(VM.id).filter(VM.status == 'running'),
+        func.coalesce(func.sum(VM.cpu_cores), 0),
+        func.coalesce(func.sum(VM.memory_mb), 0)
+    ).filter(VM.user_id == current_user.id, VM.status != 'missing').one()
+    recent_vms = VM.query.filter_by(user_id=current_user.id) \
+        .order_by(VM.created_at.desc()).limit(5).all()
+    recent_scaling_events = ScalingEvent.query.join(VM).filter(VM.user_id == current_user.id) \
+        .order_by(ScalingEvent.timestamp.desc()).limit(5).all()
+    return render_template('dashboard.html',
+                           vm_count=vm_count,
+                           running_vm_count=running_vm_count,
+                           total_cpu_cores=total_cpu_cores,
+                           total_memory_gb=round(total_memory_mb / 1024, 1),
+                           recent_vms=recent_vms,
+                           recent_scaling_events=recent_scaling_events,
+                           inventory=inventory_status())
 
 @main_bp.route('/about')
 def about():
     """About page."""
     return render_template('about.html')
+
+@main_bp.route('/metrics')
+def metrics():
+    """Prometheus metrics, merged across worker processes in multiprocess mode.
+
+    Outside development and testing the endpoint is only served with
+    METRICS_TOKEN set, and scrapers must send it as a bearer token.
+    """
+    if not current_app.config['METRICS_ENABLED']:
+        abort(404)
+    token = current_app.config['METRICS_TOKEN']
+    if not token:
+        if not (current_app.debug or current_app.testing):
+            abort(404)
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    body, content_type = instrumentation.render()
+    return Response(body, content_type=content_type)
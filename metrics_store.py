@@ -0,0 +1,165 @@
+import math
+import threading
+from array import array
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+
+def _parse_aggregation(method):
+    """Parse 'mean' or 'pNN' into (kind, percentile)."""
+    if method == 'mean':
+        return 'mean', None
+    if method.startswith('p') and method[1:].replace('.', '', 1).isdigit():
+        return 'percentile', min(max(float(method[1:]), 0.0), 100.0)
+    raise ValueError(f"Unsupported aggregation '{method}', expected 'mean' or 'pNN'")
+
+
+def _percentile(values, q):
+    """Linear-interpolated percentile of a non-empty list, matching numpy's default."""
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+class CPUSampleStore:
+    """Per-VM ring buffers of the last N CPU samples.
+
+    All buffers live in one flat float32 array (one row of `window` slots per
+    VM), so memory stays at 4 bytes per sample and windowed aggregates for
+    every VM can be computed in a single vectorized pass when numpy is
+    installed.
+    """
+
+    def __init__(self, window=5):
+        """Initialize an empty store keeping `window` samples per VM."""
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self._samples = array('f')
+        self._counts = array('L')
+        self._rows = {}
+        self._free_rows = []
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _row_for(self, key):
+        """Return the row index for key, allocating one if needed."""
+        row = self._rows.get(key)
+        if row is not None:
+            return row
+
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = len(self._counts)
+            self._samples.extend([math.nan] * self.window)
+            self._counts.append(0)
+        self._rows[key] = row
+        return row
+
+    def add(self, key, value):
+        """Append a sample to key's ring buffer, overwriting the oldest one."""
+        with self._lock:
+            row = self._row_for(key)
+            count = self._counts[row]
+            self._samples[row * self.window + count % self.window] = value
+            self._counts[row] = count + 1
+
+    def extend(self, key, values):
+        """Append several samples, oldest first."""
+        for value in values:
+            self.add(key, value)
+
+    def sample_count(self, key):
+        """Return how many samples key currently holds."""
+        row = self._rows.get(key)
+        if row is None:
+            return 0
+        return min(self._counts[row], self.window)
+
+    def reset(self, key):
+        """Clear key's samples but keep its row, e.g. after the VM was resized."""
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return
+            self._clear_row(row)
+
+    def _clear_row(self, row):
+        """Fill a row with NaN and zero its sample count."""
+        start = row * self.window
+        self._samples[start:start + self.window] = array('f', [math.nan] * self.window)
+        self._counts[row] = 0
+
+    def retain(self, keys):
+        """Drop buffers for every key not in keys and recycle their rows."""
+        keys = set(keys)
+        with self._lock:
+            for key in [k for k in self._rows if k not in keys]:
+                row = self._rows.pop(key)
+                self._clear_row(row)
+                self._free_rows.append(row)
+
+    def aggregate(self, keys, method='mean', min_samples=1):
+        """Compute a windowed aggregate ('mean' or 'pNN') for each key.
+
+        Keys with fewer than min_samples samples map to None.
+        """
+        kind, q = _parse_aggregation(method)
+        keys = list(keys)
+        with self._lock:
+            rows = [self._rows.get(key) for key in keys]
+            if numpy is not None:
+                values = self._aggregate_numpy(rows, kind, q, min_samples)
+            else:
+                values = self._aggregate_python(rows, kind, q, min_samples)
+        return dict(zip(keys, values))
+
+    def _aggregate_numpy(self, rows, kind, q, min_samples):
+        """Vectorized aggregate over the selected rows."""
+        known = [i for i, row in enumerate(rows) if row is not None]
+        results = [None] * len(rows)
+        if not known:
+            return results
+
+        index = numpy.fromiter((rows[i] for i in known), dtype=numpy.intp, count=len(known))
+        matrix = numpy.frombuffer(self._samples, dtype=numpy.float32).reshape(-1, self.window)[index]
+        counts = numpy.frombuffer(self._counts, dtype=numpy.uint64 if self._counts.itemsize == 8 else numpy.uint32)[index]
+        enough = numpy.minimum(counts, self.window) >= max(min_samples, 1)
+
+        values = numpy.full(len(known), numpy.nan)
+        if enough.any():
+            selected = matrix[enough]
+            if kind == 'mean':
+                values[enough] = numpy.nanmean(selected, axis=1)
+            else:
+                values[enough] = numpy.nanpercentile(selected, q, axis=1)
+
+        for position, value in zip(known, values.tolist()):
+            results[position] = None if math.isnan(value) else value
+        return results
+
+    def _aggregate_python(self, rows, kind, q, min_samples):
+        """Pure-Python fallback used when numpy is not installed."""
+        results = []
+        for row in rows:
+            if row is None or min(self._counts[row], self.window) < max(min_samples, 1):
+                results.append(None)
+                continue
+            start = row * self.window
+            values = [v for v in self._samples[start:start + self.window] if not math.isnan(v)]
+            if kind == 'mean':
+                results.append(sum(values) / len(values))
+            else:
+                results.append(_percentile(values, q))
+        return results
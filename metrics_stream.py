@@ -0,0 +1,110 @@
+import logging
+import queue
+import threading
+from flask import current_app
+from app.services.proxmox_service import ProxmoxService
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A client's interest in a set of VMs and its queue of pending updates."""
+
+    def __init__(self, vmids, nodes, max_pending):
+        self.vmids = set(vmids)
+        self.nodes = set(nodes)
+        self.queue = queue.Queue(maxsize=max_pending)
+
+    def publish(self, payload):
+        """Queue an update, dropping the oldest one if the client is falling behind."""
+        while True:
+            try:
+                self.queue.put_nowait(payload)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class MetricsBroadcaster:
+    """Service that polls VM metrics once per interval and fans them out to subscribers.
+
+    However many browsers are watching, each process makes one bulk metrics
+    request per interval, covering the union of the subscribed VMs. The
+    poller thread exits when the last subscriber leaves.
+    """
+
+    def __init__(self):
+        """Initialize the broadcaster."""
+        self.proxmox_service = ProxmoxService()
+        self.app = None
+        self.thread = None
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, vmids, nodes=()):
+        """Register interest in vmids and make sure the poller is running."""
+        config = current_app.config
+        subscription = Subscription(vmids, nodes, config['METRICS_STREAM_MAX_PENDING'])
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self.thread is None or not self.thread.is_alive():
+                self.app = current_app._get_current_object()
+                self.thread = threading.Thread(target=self._run_poll_loop, name='metrics-stream')
+                self.thread.daemon = True
+                self.thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop sending updates to a subscription."""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self):
+        """Return the number of connected subscribers."""
+        with self._lock:
+            return len(self._subscriptions)
+
+    def _run_poll_loop(self):
+        """Poll metrics for the watched VMs until nobody is subscribed."""
+        logger.info("Metrics stream poller started")
+        stop = threading.Event()
+        while True:
+            with self._lock:
+                subscriptions = list(self._subscriptions)
+                if not subscriptions:
+                    self.thread = None
+                    break
+
+            try:
+                with self.app.app_context():
+                    self._poll_once(subscriptions)
+            except Exception as e:
+                logger.error(f"Error polling metrics for stream: {str(e)}")
+
+            stop.wait(self.app.config['METRICS_STREAM_INTERVAL'])
+        logger.info("Metrics stream poller stopped")
+
+    def _poll_once(self, subscriptions):
+        """Fetch metrics for the union of watched VMs and publish each subscriber's share."""
+        nodes = set()
+        for subscription in subscriptions:
+            if not subscription.nodes:
+                nodes = None
+                break
+            nodes |= subscription.nodes
+        # Node hints only narrow per-node listings; /cluster/resources is a single call anyway
+        metrics = self.proxmox_service.get_vm_metrics(nodes)
+        if metrics is None:
+            return
+
+        for subscription in subscriptions:
+            payload = {str(vmid): metrics[vmid] for vmid in subscription.vmids if vmid in metrics}
+            if payload:
+                subscription.publish(payload)
+
+
+# Process-wide broadcaster shared by every streaming request
+metrics_broadcaster = MetricsBroadcaster()
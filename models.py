@@ -1,5 +1,7 @@
 from app import db
 from flask_login import UserMixin
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
@@ -48,11 +50,14 @@ class VM(db.Model):
     os_type = db.Column(db.String(32))
     software_installed = db.Column(db.String(256))
     auto_scaling_enabled = db.Column(db.Boolean, default=False)
+    pool_key = db.Column(db.String(300), index=True)  # set while the VM waits unclaimed in a warm pool
+    version = db.Column(db.BigInteger, default=0, index=True)  # inventory version of the last change
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_modified = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    scaling_policy_id = db.Column(db.Integer, db.ForeignKey('scaling_policies.id', ondelete='SET NULL'))
     
     # Relationships
     scaling_events = db.relationship('ScalingEvent', backref='vm', lazy='dynamic')
@@ -61,9 +66,110 @@ class VM(db.Model):
         return f'<VM {self.name} ({self.proxmox_id})>'
 
 
+class InventoryState(db.Model):
+    """Single-row counter of VM row versions and the inventory reconciler's last sync."""
+    __tablename__ = 'inventory_state'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, default=0)
+    synced_at = db.Column(db.DateTime)
+    pruned_version = db.Column(db.BigInteger, default=0)  # newest tombstone version deleted by retention
+    
+    def __repr__(self):
+        return f'<InventoryState version {self.version}>'
+
+
+class VMTombstone(db.Model):
+    """Marker left behind when a VM row is deleted, so listing deltas can report the removal."""
+    __tablename__ = 'vm_tombstones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    proxmox_id = db.Column(db.Integer)
+    proxmox_node = db.Column(db.String(64))
+    version = db.Column(db.BigInteger, index=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<VMTombstone {self.proxmox_id} at version {self.version}>'
+
+
+def next_inventory_version(session):
+    """Bump the inventory version inside the session's transaction and return it.
+    
+    The counter row stays locked until the transaction ends, so versions
+    become visible in the order they were handed out. Call it only right
+    before committing; stamp_vm_versions() does that for you.
+    """
+    table = InventoryState.__table__
+    connection = session.connection()
+    bumped = connection.execute(
+        update(table).where(table.c.id == 1).values(version=table.c.version + 1)).rowcount
+    if not bumped:
+        connection.execute(insert(table).values(id=1, version=1))
+    return connection.execute(select(table.c.version).where(table.c.id == 1)).scalar()
+
+
+def stamp_vm_versions(session, vm_ids):
+    """Give VM rows written with bulk statements a new inventory version when the session commits."""
+    session.info.setdefault('changed_vm_ids', set()).update(vm_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_vm_changes(session, flush_context):
+    """Remember VM rows inserted, changed or deleted through the ORM until the commit."""
+    changed = session.info.setdefault('changed_vm_ids', set())
+    deleted = session.info.setdefault('deleted_vms', [])
+    for obj in session.new:
+        if isinstance(obj, VM):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, VM) and session.is_modified(obj):
+            changed.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, VM):
+            changed.discard(obj.id)
+            deleted.append((obj.proxmox_id, obj.proxmox_node))
+
+
+@event.listens_for(Session, 'before_commit')
+def _stamp_vm_versions(session):
+    """Stamp the transaction's VM changes with one inventory version.
+    
+    The version is taken at commit time so the counter row is only locked
+    for the end of the transaction, not while the caller is still working.
+    Deleted VM rows leave a VMTombstone stamped with the same version.
+    """
+    session.flush()
+    changed = session.info.pop('changed_vm_ids', None)
+    deleted = session.info.pop('deleted_vms', None)
+    if not changed and not deleted:
+        return
+    
+    version = next_inventory_version(session)
+    connection = session.connection()
+    if changed:
+        connection.execute(update(VM.__table__).where(VM.__table__.c.id.in_(changed)).values(version=version))
+    if deleted:
+        connection.execute(insert(VMTombstone.__table__), [
+            {'proxmox_id': proxmox_id, 'proxmox_node': node, 'version': version, 'deleted_at': datetime.utcnow()}
+            for proxmox_id, node in deleted
+        ])
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_vm_changes(session):
+    """Drop VM changes collected for a transaction that was rolled back."""
+    session.info.pop('changed_vm_ids', None)
+    session.info.pop('deleted_vms', None)
+
+
 class ScalingEvent(db.Model):
     """Auto-scaling event model."""
     __tablename__ = 'scaling_events'
+    __table_args__ = (
+        # Serves per-VM history queries ordered by time
+        db.Index('ix_scaling_events_vm_id_timestamp', 'vm_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     event_type = db.Column(db.String(16))  # 'scale_up' or 'scale_down'
@@ -73,9 +179,144 @@ class ScalingEvent(db.Model):
     old_memory_mb = db.Column(db.Integer)
     new_memory_mb = db.Column(db.Integer)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    migrated_from = db.Column(db.String(64))  # set when the VM was moved off a saturated node first
+    migrated_to = db.Column(db.String(64))
     
     # Foreign keys
     vm_id = db.Column(db.Integer, db.ForeignKey('vms.id'))
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='SET NULL'))  # migration task
     
     def __repr__(self):
         return f'<ScalingEvent {self.event_type} for VM {self.vm_id}>'
+
+
+class ScalingEventRollup(db.Model):
+    """Hourly or daily aggregate of a VM's scaling events past raw retention."""
+    __tablename__ = 'scaling_event_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('vm_id', 'period', 'bucket_start', name='uq_scaling_event_rollups_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(8))  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime)
+    scale_up_count = db.Column(db.Integer, default=0)
+    scale_down_count = db.Column(db.Integer, default=0)
+    min_cpu_cores = db.Column(db.Integer)
+    max_cpu_cores = db.Column(db.Integer)
+    min_memory_mb = db.Column(db.Integer)
+    max_memory_mb = db.Column(db.Integer)
+    cpu_usage_sum = db.Column(db.Float, default=0.0)  # kept as sum and count so buckets can be merged
+    cpu_usage_count = db.Column(db.Integer, default=0)
+    
+    # Foreign keys
+    vm_id = db.Column(db.Integer, db.ForeignKey('vms.id', ondelete='CASCADE'), index=True)
+    
+    @property
+    def cpu_usage_mean(self):
+        return self.cpu_usage_sum / self.cpu_usage_count if self.cpu_usage_count else None
+    
+    def __repr__(self):
+        return f'<ScalingEventRollup {self.period} {self.bucket_start} for VM {self.vm_id}>'
+
+
+class ScalingPolicy(db.Model):
+    """Auto-scaling thresholds, bounds and step sizes for one VM or a group of VMs.
+    
+    VMs without a policy use the policy named 'default', or the built-in
+    defaults if there is none. NULL thresholds fall back to the defaults
+    (CPU) or disable that metric (memory, disk I/O and network).
+    """
+    __tablename__ = 'scaling_policies'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, index=True)
+    cpu_high = db.Column(db.Float)  # CPU %
+    cpu_low = db.Column(db.Float)
+    memory_high = db.Column(db.Float)  # % of memory in use
+    memory_low = db.Column(db.Float)
+    disk_io_high = db.Column(db.Float)  # MB/s read + write
+    network_high = db.Column(db.Float)  # MB/s in + out
+    min_cpu_cores = db.Column(db.Integer, default=1)
+    max_cpu_cores = db.Column(db.Integer, default=4)
+    min_memory_mb = db.Column(db.Integer, default=512)
+    max_memory_mb = db.Column(db.Integer, default=8192)
+    cpu_step = db.Column(db.Integer, default=1)  # cores added or removed per resize
+    memory_step_up = db.Column(db.Float, default=1.25)  # memory multiplier on scale-up
+    memory_step_down = db.Column(db.Float, default=0.8)  # memory multiplier on scale-down
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    vms = db.relationship('VM', backref='scaling_policy', lazy='dynamic')
+    
+    def __repr__(self):
+        return f'<ScalingPolicy {self.name}>'
+
+
+class ScalerLease(db.Model):
+    """Time-limited lease naming the worker that currently holds a role."""
+    __tablename__ = 'scaler_leases'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(128))
+    expires_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ScalerLease {self.name} held by {self.holder}>'
+
+
+class ScalerWorker(db.Model):
+    """Auto-scaler worker process and its last heartbeat."""
+    __tablename__ = 'scaler_workers'
+    
+    worker_id = db.Column(db.String(128), primary_key=True)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<ScalerWorker {self.worker_id}>'
+
+
+class VMTemplate(db.Model):
+    """Proxmox template registered for clone-based provisioning."""
+    __tablename__ = 'vm_templates'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64))
+    proxmox_id = db.Column(db.Integer)
+    proxmox_node = db.Column(db.String(64))
+    os_type = db.Column(db.String(32), index=True)
+    software = db.Column(db.String(256), default='')  # sorted, comma-separated SOFTWARE_OPTIONS keys
+    linked_clone = db.Column(db.Boolean, default=True)  # prefer linked clones where storage allows
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<VMTemplate {self.name} ({self.proxmox_id})>'
+
+
+class Task(db.Model):
+    """Proxmox task (UPID) tracked until it finishes."""
+    __tablename__ = 'tasks'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    upid = db.Column(db.String(255), index=True)
+    node = db.Column(db.String(64))
+    vmid = db.Column(db.Integer)
+    action = db.Column(db.String(16))  # 'create', 'clone', 'start', 'stop' or 'delete'
+    status = db.Column(db.String(16), default='running', index=True)  # 'running', 'ok', 'error' or 'unknown'
+    exit_status = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_polled_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    payload = db.Column(db.Text)  # JSON; 'config' is applied to the VM once the task succeeds
+    
+    # Foreign keys
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    vm_id = db.Column(db.Integer, db.ForeignKey('vms.id', ondelete='SET NULL'))
+    
+    @property
+    def done(self):
+        return self.status != 'running'
+    
+    def __repr__(self):
+        return f'<Task {self.action} {self.upid} ({self.status})>'
@@ -0,0 +1,99 @@
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class NodeCapacityIndex:
+    """Free CPU and memory per Proxmox node, used to place scale-ups.
+
+    The index is rebuilt from one bulk node listing at most every
+    `max_age` seconds. Between refreshes, resizes and migrations made by
+    the scaler are applied to it as reservations, so decisions in the same
+    cycle see the capacity already handed out. A node counts as saturated
+    when a change would leave less than `cpu_reserve` / `memory_reserve` of
+    its CPU or memory free.
+    """
+
+    def __init__(self, proxmox_service, cpu_reserve=0.1, memory_reserve=0.1, max_age=30):
+        """Initialize an empty index."""
+        self.proxmox_service = proxmox_service
+        self.cpu_reserve = cpu_reserve
+        self.memory_reserve = memory_reserve
+        self.max_age = max_age
+        self.refreshed_at = None
+        self._nodes = {}  # node -> {'max_cores', 'max_memory_mb', 'free_cores', 'free_memory_mb'}
+
+    def refresh(self, force=False):
+        """Reload node usage if the index is older than max_age; returns False if it could not be loaded."""
+        if not force and self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.max_age:
+            return True
+
+        resources = self.proxmox_service.get_cluster_resources('node')
+        if resources is not None:
+            nodes = [r for r in resources if r.get('type') == 'node']
+        else:
+            nodes = self.proxmox_service.get_nodes()
+        if not nodes:
+            logger.warning("Could not refresh the node capacity index")
+            return False
+
+        self.update(nodes)
+        return True
+
+    def update(self, nodes):
+        """Replace the index with node entries from /cluster/resources or /nodes."""
+        index = {}
+        for entry in nodes:
+            if entry.get('status', 'online') != 'online' or not entry.get('maxcpu') or not entry.get('maxmem'):
+                continue
+            max_cores = float(entry['maxcpu'])
+            max_memory_mb = entry['maxmem'] / MB
+            index[entry['node']] = {
+                'max_cores': max_cores,
+                'max_memory_mb': max_memory_mb,
+                'free_cores': max_cores * (1 - float(entry.get('cpu', 0))),
+                'free_memory_mb': max_memory_mb - entry.get('mem', 0) / MB
+            }
+        self._nodes = index
+        self.refreshed_at = time.monotonic()
+
+    def has_headroom(self, node, cores, memory_mb):
+        """Return True if node can take `cores` more cores and `memory_mb` more memory.
+
+        Nodes missing from the index are given the benefit of the doubt.
+        """
+        entry = self._nodes.get(node)
+        if entry is None:
+            return True
+        return self._fits(entry, cores, memory_mb)
+
+    def _fits(self, entry, cores, memory_mb):
+        return entry['free_cores'] - cores >= entry['max_cores'] * self.cpu_reserve and \
+            entry['free_memory_mb'] - memory_mb >= entry['max_memory_mb'] * self.memory_reserve
+
+    def pick_target(self, exclude, cores, memory_mb):
+        """Pick the least-loaded node other than exclude that fits a VM of the given size."""
+        best, best_score = None, None
+        for node, entry in self._nodes.items():
+            if node == exclude or not self._fits(entry, cores, memory_mb):
+                continue
+            # Rank by the scarcer resource left over after placing the VM
+            score = min((entry['free_cores'] - cores) / entry['max_cores'],
+                        (entry['free_memory_mb'] - memory_mb) / entry['max_memory_mb'])
+            if best_score is None or score > best_score:
+                best, best_score = node, score
+        return best
+
+    def reserve(self, node, cores, memory_mb):
+        """Take capacity from a node (negative values give it back)."""
+        entry = self._nodes.get(node)
+        if entry is not None:
+            entry['free_cores'] -= cores
+            entry['free_memory_mb'] -= memory_mb
+
+    def snapshot(self):
+        """Return a copy of the index for reporting."""
+        return {node: dict(entry) for node, entry in self._nodes.items()}
@@ -0,0 +1,67 @@
+import logging
+from flask import current_app
+from app.models.models import VMTemplate
+from app.services.proxmox_service import ProxmoxService
+
+logger = logging.getLogger(__name__)
+
+# Settings that a clone inherits from its template and are applied afterwards
+CLONE_CONFIG_KEYS = ('cores', 'sockets', 'memory', 'net0', 'description')
+
+
+def software_key(software):
+    """Normalize a list of SOFTWARE_OPTIONS keys to the VMTemplate.software format."""
+    return ','.join(sorted(set(software or [])))
+
+
+class ProvisioningService:
+    """Service that provisions new VMs, cloning registered templates when possible."""
+
+    def __init__(self, proxmox_service=None):
+        """Initialize the provisioning service."""
+        self.proxmox_service = proxmox_service or ProxmoxService()
+
+    def find_template(self, os_type, software):
+        """Find a registered template for an OS type and exact software combination."""
+        return VMTemplate.query.filter_by(os_type=os_type, software=software_key(software)) \
+            .order_by(VMTemplate.created_at.desc()).first()
+
+    def provision(self, node, params, software=None, mode=None):
+        """Provision a VM on node from params (which must include vmid).
+
+        In 'template' mode a matching template is cloned, as a linked clone
+        if its storage supports one on the target node; without a matching
+        template, or in 'scratch' mode, the VM is created from params.
+
+        Returns a dict with the task 'upid', the task 'action' ('clone' or
+        'create'), the 'node' the task runs on, the 'template' used and any
+        'config' to apply once the task finishes, or None on failure.
+        """
+        mode = mode or current_app.config['PROVISIONING_MODE']
+        template = self.find_template(params.get('ostype'), software) if mode == 'template' else None
+
+        if template is None:
+            upid = self.proxmox_service.create_vm(node, params)
+            if not upid:
+                return None
+            return {'upid': upid, 'action': 'create', 'node': node, 'template': None, 'config': None}
+
+        clone_params = {'name': params['name'], 'full': 1}
+        if template.linked_clone and node in self.proxmox_service.get_linked_clone_nodes(
+                template.proxmox_node, template.proxmox_id):
+            clone_params['full'] = 0
+        if node != template.proxmox_node:
+            clone_params['target'] = node
+        if clone_params['full'] and params.get('storage'):
+            clone_params['storage'] = params['storage']
+
+        upid = self.proxmox_service.clone_vm(template.proxmox_node, template.proxmox_id,
+                                             params['vmid'], clone_params)
+        if not upid:
+            return None
+
+        logger.info(f"Cloning template {template.proxmox_id} to VM {params['vmid']} on {node} "
+                    f"({'full' if clone_params['full'] else 'linked'} clone)")
+        config = {key: params[key] for key in CLONE_CONFIG_KEYS if key in params}
+        return {'upid': upid, 'action': 'clone', 'node': template.proxmox_node,
+                'template': template, 'config': config}
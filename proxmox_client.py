@@ -0,0 +1,88 @@
+import os
+import logging
+import threading
+from proxmoxer import ProxmoxAPI
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Process-wide (ProxmoxAPI client, requests.Session) pairs keyed by (host, user, token name)
+_clients = {}
+_clients_lock = threading.Lock()
+_clients_pid = os.getpid()
+
+
+def _reset_after_fork():
+    """Forget clients inherited from the parent so a forked worker opens its own sockets."""
+    global _clients, _clients_lock, _clients_pid
+    _clients = {}
+    _clients_lock = threading.Lock()
+    _clients_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _build_client(config):
+    """Create a ProxmoxAPI client with a sized, keep-alive connection pool.
+
+    Returns (client, session), where session is the requests.Session the
+    client sends every call through.
+    """
+    client = ProxmoxAPI(
+        host=config['PROXMOX_HOST'],
+        user=config['PROXMOX_USER'],
+        token_name=config['PROXMOX_TOKEN_NAME'],
+        token_value=config['PROXMOX_TOKEN_VALUE'],
+        verify_ssl=config.get('PROXMOX_VERIFY_SSL', False),
+        # requests accepts a (connect, read) tuple
+        timeout=(config.get('PROXMOX_CONNECT_TIMEOUT', 5), config.get('PROXMOX_READ_TIMEOUT', 30))
+    )
+
+    # proxmoxer 2.0 has no public accessor for the requests.Session it creates; it is
+    # read from the resource store once here and kept next to the client from then on.
+    # It already sends Connection: keep-alive, but the default adapter only pools 10 connections
+    session = client._store['session']
+    pool_size = config.get('PROXMOX_POOL_SIZE', 32)
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=config.get('PROXMOX_CONNECT_RETRIES', 2), read=0, status=0,
+                          backoff_factor=0.2, allowed_methods=False),
+        # requests cannot bound the wait for a free pooled connection, so a burst
+        # beyond pool_size opens extra connections instead of blocking forever
+        pool_block=False
+    )
+    session.mount('https://', adapter)
+
+    logger.info(f"Created Proxmox client for {config['PROXMOX_HOST']} (pool size {pool_size})")
+    return client, session
+
+
+def get_proxmox_client(config):
+    """Return the shared ProxmoxAPI client for config, creating it on first use."""
+    if os.getpid() != _clients_pid:
+        _reset_after_fork()
+
+    key = (config['PROXMOX_HOST'], config['PROXMOX_USER'], config['PROXMOX_TOKEN_NAME'])
+    entry = _clients.get(key)
+    if entry is None:
+        with _clients_lock:
+            entry = _clients.get(key)
+            if entry is None:
+                entry = _build_client(config)
+                _clients[key] = entry
+    return entry[0]
+
+
+def reset_proxmox_clients():
+    """Close and drop every shared client, e.g. after credentials change."""
+    with _clients_lock:
+        for _, session in _clients.values():
+            try:
+                session.close()
+            except Exception as e:
+                logger.warning(f"Failed to close Proxmox session: {str(e)}")
+        _clients.clear()
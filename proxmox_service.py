@@ -1,41 +1,189 @@
-from proxmoxer import ProxmoxAPI
 from flask import current_app
+from app.services.proxmox_client import get_proxmox_client
+from app.services.ttl_cache import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+import contextvars
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Read cache shared by every ProxmoxService instance in this process
+_read_cache = None
+_read_cache_lock = threading.Lock()
+
+
+def get_read_cache():
+    """Return the process-wide Proxmox read cache, creating it on first use."""
+    global _read_cache
+    if _read_cache is None:
+        with _read_cache_lock:
+            if _read_cache is None:
+                _read_cache = TTLCache(current_app.config.get('PROXMOX_CACHE_MAX_SIZE', 4096))
+    return _read_cache
+
+def _resources_from_status(status):
+    """Convert a Proxmox VM status entry to the resource usage dict."""
+    return {
+        'cpu_usage': status.get('cpu', 0) * 100,  # Convert to percentage
+        'memory_usage': status.get('mem', 0) / (1024 * 1024),  # Convert to MB
+        'memory_total': status.get('maxmem', 0) / (1024 * 1024),  # Convert to MB
+        'disk_usage': status.get('disk', 0) / (1024 * 1024 * 1024),  # Convert to GB
+        'disk_io_bytes': status.get('diskread', 0) + status.get('diskwrite', 0),  # cumulative counters
+        'network_bytes': status.get('netin', 0) + status.get('netout', 0),
+        'uptime': status.get('uptime', 0)
+    }
+
+# Keys that only exist on /cluster/resources VM entries
+_CLUSTER_ONLY_VM_KEYS = ('id', 'type', 'maxcpu')
+
+
+def _normalize_vm_resource(resource):
+    """Convert a /cluster/resources qemu entry to the /nodes/{node}/qemu shape."""
+    vm = {k: v for k, v in resource.items() if k not in _CLUSTER_ONLY_VM_KEYS}
+    vm['cpus'] = resource.get('maxcpu', 0)
+    return vm
+
+
+def _normalize_node_resource(resource):
+    """Convert a /cluster/resources node entry to the /nodes shape."""
+    # /nodes already returns id, type, cpu, maxcpu, mem, maxmem, disk and uptime
+    return dict(resource)
+
 class ProxmoxService:
     """Service for interacting with Proxmox API."""
     
     def __init__(self):
         """Initialize the Proxmox API connection."""
         self.proxmox = None
-        self.connected = False
+        self._pid = None
+    
+    @property
+    def connected(self):
+        """Whether this instance holds a client created in the current process."""
+        # A client inherited across fork() shares sockets with the parent
+        return self.proxmox is not None and self._pid == os.getpid()
     
     def connect(self):
-        """Connect to Proxmox API using token authentication."""
+        """Connect to Proxmox API using the process-wide shared client."""
         try:
             config = current_app.config
-            self.proxmox = ProxmoxAPI(
-                host=config['PROXMOX_HOST'],
-                user=config['PROXMOX_USER'],
-                token_name=config['PROXMOX_TOKEN_NAME'],
-                token_value=config['PROXMOX_TOKEN_VALUE'],
-                verify_ssl=False
-            )
-            self.connected = True
+            self.proxmox = get_proxmox_client(config)
+            self._pid = os.getpid()
             logger.info(f"Connected to Proxmox host: {config['PROXMOX_HOST']}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to Proxmox API: {str(e)}")
-            self.connected = False
+            self.proxmox = None
             return False
     
+    def _cached(self, key, ttl_setting, loader):
+        """Serve a read from the shared cache, loading it from Proxmox on a miss."""
+        ttl = current_app.config.get(ttl_setting, 0)
+        if ttl <= 0:
+            return loader()
+        return get_read_cache().get_or_load(key, ttl, loader)
+    
+    def _invalidate_vm(self, node, vmid):
+        """Drop cached reads affected by a write to a VM."""
+        cache = get_read_cache()
+        cache.invalidate(f'status:{node}:{vmid}', f'config:{node}:{vmid}')
+        cache.invalidate_prefix('vms:')
+    
+    def cache_stats(self):
+        """Get hit/miss statistics for the shared read cache."""
+        return get_read_cache().stats()
+    
+    def _fan_out(self, nodes, fn):
+        """Call fn(node) for each node on a bounded worker pool.
+        
+        Returns (results, errors): results is a list of (node, value) pairs in
+        the order of nodes, errors maps each failed node to its error message.
+        """
+        if not nodes:
+            return [], {}
+        
+        max_workers = min(current_app.config.get('PROXMOX_MAX_WORKERS', 8), len(nodes))
+        outcomes = {}
+        if max_workers <= 1:
+            for node in nodes:
+                try:
+                    outcomes[node] = (fn(node), None)
+                except Exception as e:
+                    outcomes[node] = (None, e)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='proxmox') as executor:
+                # Each task runs in a copy of the caller's context, so errors it logs
+                # are attributed to the calling ProxmoxService method
+                futures = {node: executor.submit(contextvars.copy_context().run, fn, node) for node in nodes}
+                for node, future in futures.items():
+                    try:
+                        outcomes[node] = (future.result(), None)
+                    except Exception as e:
+                        outcomes[node] = (None, e)
+        
+        results = []
+        errors = {}
+        for node in nodes:
+            value, error = outcomes[node]
+            if error is not None:
+                logger.error(f"Request to node {node} failed: {str(error)}")
+                errors[node] = str(error)
+            else:
+                results.append((node, value))
+        return results, errors
+    
+    def _use_cluster_inventory(self):
+        """Check whether listings should come from /cluster/resources."""
+        return current_app.config.get('PROXMOX_INVENTORY_MODE', 'cluster') == 'cluster'
+    
+    def get_cluster_resources(self, resource_type=None):
+        """Get VMs, nodes and storage for the whole cluster in one request."""
+        if not self.connected and not self.connect():
+            return None
+        
+        try:
+            if resource_type:
+                return self.proxmox.cluster.resources.get(type=resource_type)
+            return self.proxmox.cluster.resources.get()
+        except Exception as e:
+            logger.error(f"Failed to get cluster resources: {str(e)}")
+            return None
+    
+    def get_inventory(self):
+        """Get normalized VMs, nodes and storage from a single cluster request."""
+        resources = self.get_cluster_resources()
+        if resources is None:
+            return None
+        
+        inventory = {'vms': [], 'nodes': [], 'storage': []}
+        for resource in resources:
+            resource_type = resource.get('type')
+            if resource_type == 'qemu':
+                inventory['vms'].append(_normalize_vm_resource(resource))
+            elif resource_type == 'node':
+                inventory['nodes'].append(_normalize_node_resource(resource))
+            elif resource_type == 'storage':
+                inventory['storage'].append(dict(resource))
+        return inventory
+    
     def get_nodes(self):
         """Get list of Proxmox nodes."""
         if not self.connected and not self.connect():
             return []
         
+        return self._cached('nodes', 'PROXMOX_CACHE_TTL_NODES', self._load_nodes)
+    
+    def _load_nodes(self):
+        """Load the node list from Proxmox."""
+        if self._use_cluster_inventory():
+            resources = self.get_cluster_resources('node')
+            if resources is not None:
+                return [_normalize_node_resource(r) for r in resources if r.get('type') == 'node']
+            logger.warning("Falling back to /nodes for node listing")
+        
         try:
             nodes = self.proxmox.nodes.get()
             return nodes
@@ -45,91 +193,245 @@ class ProxmoxService:
     
     def get_vms(self, node=None):
         """Get list of VMs, optionally filtered by node."""
+        vms, _ = self.fetch_vms(node)
+        return vms
+    
+    def fetch_vms(self, node=None):
+        """Get list of VMs together with a dict of per-node errors."""
         if not self.connected and not self.connect():
-            return []
+            return [], {'cluster': 'Not connected to Proxmox'}
         
-        try:
-            vms = []
-            nodes = [node] if node else [n['node'] for n in self.get_nodes()]
-            
-            for node_name in nodes:
-                node_vms = self.proxmox.nodes(node_name).qemu.get()
-                for vm in node_vms:
-                    vm['node'] = node_name
-                vms.extend(node_vms)
-            
-            return vms
-        except Exception as e:
-            logger.error(f"Failed to get VMs: {str(e)}")
+        key = f'vms:{node or "*"}'
+        ttl = current_app.config.get('PROXMOX_CACHE_TTL_STATUS', 0)
+        if ttl > 0:
+            vms = get_read_cache().get(key)
+            if vms is not None:
+                return vms, {}
+        
+        vms, errors = self._load_vms(node)
+        # Only complete listings are cached so failed nodes are retried next time
+        if ttl > 0 and vms and not errors:
+            get_read_cache().set(key, vms, ttl)
+        return vms, errors
+    
+    def _load_vms(self, node=None):
+        """Load the VM list from Proxmox."""
+        if not node and self._use_cluster_inventory():
+            resources = self.get_cluster_resources('vm')
+            if resources is not None:
+                return [_normalize_vm_resource(r) for r in resources if r.get('type') == 'qemu'], {}
+            logger.warning("Falling back to per-node VM listing")
+        
+        nodes = [node] if node else sorted(n['node'] for n in self.get_nodes())
+        if not nodes:
+            return [], {'cluster': 'No nodes available'}
+        
+        results, errors = self._fan_out(nodes, lambda n: self.proxmox.nodes(n).qemu.get())
+        vms = []
+        for node_name, node_vms in results:
+            for vm in node_vms:
+                vm['node'] = node_name
+            vms.extend(sorted(node_vms, key=lambda vm: int(vm.get('vmid', 0))))
+        return vms, errors
+    
+    def get_node_statuses(self, nodes=None):
+        """Get /nodes/{node}/status for each node concurrently.
+        
+        Returns (statuses, errors) keyed by node name.
+        """
+        if not self.connected and not self.connect():
+            return {}, {'cluster': 'Not connected to Proxmox'}
+        
+        if nodes is None:
+            nodes = sorted(n['node'] for n in self.get_nodes())
+        results, errors = self._fan_out(nodes, lambda n: self.proxmox.nodes(n).status.get())
+        return dict(results), errors
+    
+    def get_storage(self, node=None):
+        """Get list of storage, optionally filtered by node."""
+        if not self.connected and not self.connect():
             return []
+        
+        if self._use_cluster_inventory():
+            resources = self.get_cluster_resources('storage')
+            if resources is not None:
+                return [dict(r) for r in resources
+                        if r.get('type') == 'storage' and (not node or r.get('node') == node)]
+            logger.warning("Falling back to per-node storage listing")
+        
+        nodes = [node] if node else sorted(n['node'] for n in self.get_nodes())
+        results, _ = self._fan_out(nodes, lambda n: self.proxmox.nodes(n).storage.get())
+        storage = []
+        for node_name, node_storage in results:
+            for entry in node_storage:
+                entry['node'] = node_name
+            storage.extend(node_storage)
+        return storage
     
     def get_vm(self, node, vmid):
         """Get VM details by node and ID."""
         if not self.connected and not self.connect():
             return None
         
-        try:
-            vm = self.proxmox.nodes(node).qemu(vmid).status.current.get()
-            vm['node'] = node
-            vm['vmid'] = vmid
-            return vm
-        except Exception as e:
-            logger.error(f"Failed to get VM {vmid} on node {node}: {str(e)}")
+        status = self.get_vm_status(node, vmid)
+        if not status:
             return None
+        
+        vm = dict(status)
+        vm['node'] = node
+        vm['vmid'] = vmid
+        return vm
     
     def create_vm(self, node, params):
-        """Create a new VM on the specified node."""
+        """Create a new VM on the specified node and return the task UPID."""
         if not self.connected and not self.connect():
             return None
         
         try:
-            result = self.proxmox.nodes(node).qemu.create(**params)
-            return result
+            upid = self.proxmox.nodes(node).qemu.create(**params)
+            get_read_cache().invalidate_prefix('vms:')
+            return upid
         except Exception as e:
             logger.error(f"Failed to create VM on node {node}: {str(e)}")
             return None
     
+    def get_next_vmid(self):
+        """Get the next free VM ID in the cluster."""
+        if not self.connected and not self.connect():
+            return None
+        
+        try:
+            return int(self.proxmox.cluster.nextid.get())
+        except Exception as e:
+            logger.error(f"Failed to get next VM ID: {str(e)}")
+            return None
+    
+    def get_task_status(self, node, upid):
+        """Get the status of a Proxmox task by UPID."""
+        if not self.connected and not self.connect():
+            return None
+        
+        try:
+            return self.proxmox.nodes(node).tasks(upid).status.get()
+        except Exception as e:
+            logger.error(f"Failed to get task {upid} status on node {node}: {str(e)}")
+            return None
+    
     def start_vm(self, node, vmid):
-        """Start a VM."""
+        """Start a VM.
+        
+        Returns the task UPID (or True if Proxmox did not return one), False on failure.
+        """
         if not self.connected and not self.connect():
             return False
         
         try:
-            self.proxmox.nodes(node).qemu(vmid).status.start.post()
-            return True
+            upid = self.proxmox.nodes(node).qemu(vmid).status.start.post()
+            self._invalidate_vm(node, vmid)
+            return upid or True
         except Exception as e:
             logger.error(f"Failed to start VM {vmid} on node {node}: {str(e)}")
             return False
     
     def stop_vm(self, node, vmid):
-        """Stop a VM."""
+        """Stop a VM.
+        
+        Returns the task UPID (or True if Proxmox did not return one), False on failure.
+        """
         if not self.connected and not self.connect():
             return False
         
         try:
-            self.proxmox.nodes(node).qemu(vmid).status.stop.post()
-            return True
+            upid = self.proxmox.nodes(node).qemu(vmid).status.stop.post()
+            self._invalidate_vm(node, vmid)
+            return upid or True
         except Exception as e:
             logger.error(f"Failed to stop VM {vmid} on node {node}: {str(e)}")
             return False
     
+    def clone_vm(self, node, template_vmid, newid, params):
+        """Clone a template VM and return the task UPID.
+        
+        params are passed to the clone endpoint (name, full, target, storage...).
+        """
+        if not self.connected and not self.connect():
+            return None
+        
+        try:
+            upid = self.proxmox.nodes(node).qemu(template_vmid).clone.post(newid=newid, **params)
+            get_read_cache().invalidate_prefix('vms:')
+            return upid or True
+        except Exception as e:
+            logger.error(f"Failed to clone VM {template_vmid} on node {node}: {str(e)}")
+            return None
+    
+    def get_linked_clone_nodes(self, node, template_vmid):
+        """Get the nodes a template can be linked-cloned to (empty if unsupported)."""
+        if not self.connected and not self.connect():
+            return []
+        
+        return self._cached(f'feature:{node}:{template_vmid}', 'PROXMOX_CACHE_TTL_CONFIG',
+                            lambda: self._load_linked_clone_nodes(node, template_vmid))
+    
+    def _load_linked_clone_nodes(self, node, template_vmid):
+        """Ask Proxmox whether the template's storage supports linked clones."""
+        try:
+            # For templates the 'clone' feature means a linked clone
+            feature = self.proxmox.nodes(node).qemu(template_vmid).feature.get(feature='clone')
+            if not feature.get('hasFeature'):
+                return []
+            return feature.get('nodes') or [node]
+        except Exception as e:
+            logger.error(f"Failed to check clone support for VM {template_vmid} on node {node}: {str(e)}")
+            return []
+    
     def delete_vm(self, node, vmid):
-        """Delete a VM."""
+        """Delete a VM.
+        
+        Returns the task UPID (or True if Proxmox did not return one), False on failure.
+        """
         if not self.connected and not self.connect():
             return False
         
         try:
-            self.proxmox.nodes(node).qemu(vmid).delete()
-            return True
+            upid = self.proxmox.nodes(node).qemu(vmid).delete()
+            self._invalidate_vm(node, vmid)
+            return upid or True
         except Exception as e:
             logger.error(f"Failed to delete VM {vmid} on node {node}: {str(e)}")
             return False
     
+    def migrate_vm(self, node, vmid, target, online=True, with_local_disks=False):
+        """Migrate a VM to another node, live if online is True.
+        
+        Returns the task UPID (or True if Proxmox did not return one), False on failure.
+        """
+        if not self.connected and not self.connect():
+            return False
+        
+        params = {'target': target, 'online': int(online)}
+        if with_local_disks:
+            params['with-local-disks'] = 1
+        
+        try:
+            upid = self.proxmox.nodes(node).qemu(vmid).migrate.post(**params)
+            self._invalidate_vm(node, vmid)
+            self._invalidate_vm(target, vmid)
+            return upid or True
+        except Exception as e:
+            logger.error(f"Failed to migrate VM {vmid} from node {node} to {target}: {str(e)}")
+            return False
+    
     def get_vm_config(self, node, vmid):
         """Get VM configuration."""
         if not self.connected and not self.connect():
             return None
         
+        return self._cached(f'config:{node}:{vmid}', 'PROXMOX_CACHE_TTL_CONFIG',
+                            lambda: self._load_vm_config(node, vmid))
+    
+    def _load_vm_config(self, node, vmid):
+        """Load VM configuration from Proxmox."""
         try:
             config = self.proxmox.nodes(node).qemu(vmid).config.get()
             return config
@@ -144,16 +446,75 @@ class ProxmoxService:
         
         try:
             self.proxmox.nodes(node).qemu(vmid).config.put(**params)
+            self._invalidate_vm(node, vmid)
             return True
         except Exception as e:
             logger.error(f"Failed to update VM {vmid} config on node {node}: {str(e)}")
             return False
     
+    def run_bulk_actions(self, items):
+        """Run start/stop/delete/config actions for many VMs concurrently.
+        
+        Each item is a dict with node, vmid, action and optional params. At
+        most BULK_MAX_PER_NODE actions run against the same node at a time
+        and BULK_MAX_WORKERS overall. Returns each action's result (a UPID,
+        True or False) in item order.
+        """
+        if not items:
+            return []
+        if not self.connected and not self.connect():
+            return [False] * len(items)
+        
+        app = current_app._get_current_object()
+        per_node = app.config.get('BULK_MAX_PER_NODE', 4)
+        limits = {item['node']: threading.BoundedSemaphore(per_node) for item in items}
+        
+        def run(index):
+            item = items[index]
+            with limits[item['node']]:
+                with app.app_context():
+                    return self._run_action(item)
+        
+        # Interleave nodes so workers are not all queued behind one busy node
+        by_node = {}
+        for index, item in enumerate(items):
+            by_node.setdefault(item['node'], []).append(index)
+        order = [i for batch in zip_longest(*by_node.values()) for i in batch if i is not None]
+        
+        results = [False] * len(items)
+        max_workers = min(app.config.get('BULK_MAX_WORKERS', 16), len(items))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='proxmox-bulk') as executor:
+            futures = {index: executor.submit(run, index) for index in order}
+            for index, future in futures.items():
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"Bulk {items[index]['action']} of VM {items[index]['vmid']} failed: {str(e)}")
+        return results
+    
+    def _run_action(self, item):
+        """Dispatch a single bulk action."""
+        node, vmid, action = item['node'], item['vmid'], item['action']
+        if action == 'start':
+            return self.start_vm(node, vmid)
+        if action == 'stop':
+            return self.stop_vm(node, vmid)
+        if action == 'delete':
+            return self.delete_vm(node, vmid)
+        if action == 'config':
+            return self.update_vm_config(node, vmid, item.get('params') or {})
+        raise ValueError(f"Unknown action '{action}'")
+    
     def get_vm_status(self, node, vmid):
         """Get VM status."""
         if not self.connected and not self.connect():
             return None
         
+        return self._cached(f'status:{node}:{vmid}', 'PROXMOX_CACHE_TTL_STATUS',
+                            lambda: self._load_vm_status(node, vmid))
+    
+    def _load_vm_status(self, node, vmid):
+        """Load VM status from Proxmox."""
         try:
             status = self.proxmox.nodes(node).qemu(vmid).status.current.get()
             return status
@@ -171,13 +532,67 @@ class ProxmoxService:
             if not status:
                 return None
             
-            resources = {
-                'cpu_usage': status.get('cpu', 0) * 100,  # Convert to percentage
-                'memory_usage': status.get('mem', 0) / (1024 * 1024),  # Convert to MB
-                'disk_usage': status.get('disk', 0) / (1024 * 1024 * 1024),  # Convert to GB
-                'uptime': status.get('uptime', 0)
-            }
-            return resources
+            return _resources_from_status(status)
         except Exception as e:
             logger.error(f"Failed to get VM {vmid} resources on node {node}: {str(e)}")
             return None
+    
+    def get_vm_rrddata(self, node, vmid, timeframe='hour', cf='AVERAGE'):
+        """Get RRD time-series data for a VM (one point per minute for 'hour')."""
+        if not self.connected and not self.connect():
+            return []
+        
+        try:
+            return self.proxmox.nodes(node).qemu(vmid).rrddata.get(timeframe=timeframe, cf=cf)
+        except Exception as e:
+            logger.error(f"Failed to get VM {vmid} RRD data on node {node}: {str(e)}")
+            return []
+    
+    def get_vms_rrddata(self, vms, timeframe='hour', cf='AVERAGE'):
+        """Get RRD data for many (node, vmid) pairs concurrently.
+        
+        Returns a dict keyed by (node, vmid); VMs whose data could not be
+        fetched map to an empty list.
+        """
+        if not self.connected and not self.connect():
+            return {}
+        
+        results, _ = self._fan_out(list(vms), lambda vm: self.get_vm_rrddata(vm[0], vm[1], timeframe, cf))
+        return dict(results)
+    
+    def get_vm_metrics(self, nodes=None):
+        """Get resource usage for every VM in one bulk pull.
+        
+        Uses a single /cluster/resources request, or one request per node
+        (restricted to nodes if given) when the cluster endpoint is not
+        available. Returns a dict keyed by vmid, or None if nothing could be
+        fetched.
+        """
+        if not self.connected and not self.connect():
+            return None
+        
+        entries = None
+        if self._use_cluster_inventory():
+            resources = self.get_cluster_resources('vm')
+            if resources is not None:
+                entries = [r for r in resources if r.get('type') == 'qemu']
+        
+        if entries is None:
+            if nodes is None:
+                nodes = [n['node'] for n in self.get_nodes()]
+            results, errors = self._fan_out(sorted(nodes), lambda n: self.proxmox.nodes(n).qemu.get())
+            if not results and errors:
+                return None
+            entries = []
+            for node_name, node_vms in results:
+                for vm in node_vms:
+                    vm['node'] = node_name
+                entries.extend(node_vms)
+        
+        metrics = {}
+        for entry in entries:
+            resources = _resources_from_status(entry)
+            resources['node'] = entry.get('node')
+            resources['status'] = entry.get('status')
+            metrics[int(entry['vmid'])] = resources
+        return metrics
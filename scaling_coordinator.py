@@ -0,0 +1,205 @@
+import os
+import socket
+import hashlib
+import logging
+import uuid
+from bisect import bisect
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.models import ScalerLease, ScalerWorker
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LEADER_LEASE = 'auto-scaler'
+
+
+def _hash(key):
+    """Map a key to a stable position on the hash ring."""
+    return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent-hash ring; adding or removing a member only moves that member's keys."""
+
+    def __init__(self, members, replicas=64):
+        """Place `replicas` points on the ring for each member."""
+        points = sorted((_hash(f'{member}#{i}'), member) for member in members for i in range(replicas))
+        self._hashes = [h for h, _ in points]
+        self._members = [m for _, m in points]
+
+    def owner(self, key):
+        """Return the member that owns key, or None for an empty ring."""
+        if not self._hashes:
+            return None
+        return self._members[bisect(self._hashes, _hash(key)) % len(self._hashes)]
+
+
+class NullCoordinator:
+    """Coordinator that lets every worker scale every VM."""
+
+    def __init__(self, config):
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    def assign(self, vms):
+        """Return the VMs this worker should scale this cycle."""
+        return vms
+
+    def release(self):
+        """Give up any role held by this worker."""
+
+    def status(self):
+        """Describe this worker's role."""
+        return {'mode': 'none', 'worker_id': self.worker_id}
+
+
+class DatabaseCoordinator(NullCoordinator):
+    """Coordinator backed by lease and heartbeat rows in the application database.
+
+    In 'lease' mode the worker holding the auto-scaler lease scales every VM
+    and the others stand by until it stops renewing. In 'shard' mode every
+    worker heartbeats and VMs are split across the live workers with a
+    consistent-hash ring. Leases are taken with a conditional UPDATE, so
+    this works the same on SQLite and on a shared server database; worker
+    clocks must agree to well within SCALING_LEASE_TTL.
+
+    While a worker joins or leaves, workers can briefly disagree on the
+    ring, so a VM may be handled twice or skipped for one cycle.
+    """
+
+    def __init__(self, config, sharded=False, lease=LEADER_LEASE):
+        super().__init__(config)
+        self.sharded = sharded
+        self.lease = lease
+        self.ttl = timedelta(seconds=config['SCALING_LEASE_TTL'])
+        self.is_leader = False
+        self.workers = []
+
+    def assign(self, vms):
+        """Renew this worker's lease or heartbeat and return the VMs it owns."""
+        if not self.sharded:
+            return vms if self.acquire() else []
+
+        self.workers = self._heartbeat()
+        ring = HashRing(self.workers)
+        return [vm for vm in vms if ring.owner(vm.id) == self.worker_id]
+
+    def acquire(self):
+        """Take or renew this coordinator's lease; returns True if this worker holds it."""
+        self.is_leader = self._acquire(self.lease)
+        return self.is_leader
+
+    def _acquire(self, name):
+        """Take or renew a lease; returns True if this worker holds it."""
+        now = datetime.utcnow()
+        values = {'holder': self.worker_id, 'expires_at': now + self.ttl}
+        renewed = ScalerLease.query.filter(
+            ScalerLease.name == name,
+            or_(ScalerLease.holder == self.worker_id, ScalerLease.expires_at < now)
+        ).update(values, synchronize_session=False)
+        if renewed:
+            db.session.commit()
+            return True
+
+        if db.session.get(ScalerLease, name) is not None:
+            db.session.commit()
+            return False
+
+        try:
+            db.session.add(ScalerLease(name=name, **values))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Another worker created the lease first
+            db.session.rollback()
+            return False
+
+    def _heartbeat(self):
+        """Record this worker as alive and return the sorted ids of all live workers."""
+        now = datetime.utcnow()
+        if not ScalerWorker.query.filter_by(worker_id=self.worker_id) \
+                .update({'heartbeat_at': now}, synchronize_session=False):
+            db.session.add(ScalerWorker(worker_id=self.worker_id, started_at=now, heartbeat_at=now))
+
+        # Forget workers that stopped without releasing
+        ScalerWorker.query.filter(ScalerWorker.heartbeat_at < now - 10 * self.ttl) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+
+        return sorted(worker_id for (worker_id,) in db.session.query(ScalerWorker.worker_id)
+                      .filter(ScalerWorker.heartbeat_at >= now - self.ttl))
+
+    def release(self):
+        """Expire this worker's lease and heartbeat so others take over at once."""
+        try:
+            ScalerLease.query.filter_by(holder=self.worker_id) \
+                .update({'expires_at': datetime.utcnow()}, synchronize_session=False)
+            ScalerWorker.query.filter_by(worker_id=self.worker_id).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Failed to release scaler lease: {str(e)}")
+        self.is_leader = False
+
+    def status(self):
+        """Describe this worker's role."""
+        if self.sharded:
+            return {'mode': 'shard', 'worker_id': self.worker_id, 'workers': self.workers}
+        return {'mode': 'lease', 'worker_id': self.worker_id, 'leader': self.is_leader}
+
+
+class FileLockCoordinator(NullCoordinator):
+    """Coordinator for a single host: the worker holding an exclusive file lock scales every VM."""
+
+    def __init__(self, config):
+        super().__init__(config)
+        if fcntl is None:
+            raise RuntimeError("SCALING_COORDINATION 'filelock' requires fcntl")
+        self.path = config['SCALING_LOCK_FILE']
+        self._file = None
+
+    @property
+    def is_leader(self):
+        return self._file is not None
+
+    def assign(self, vms):
+        """Try to take the lock and return every VM if this worker holds it."""
+        if self._file is None:
+            lock_file = open(self.path, 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._file = lock_file
+            except OSError:
+                lock_file.close()
+        return vms if self._file is not None else []
+
+    def release(self):
+        """Drop the lock so another worker can take over."""
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def status(self):
+        """Describe this worker's role."""
+        return {'mode': 'filelock', 'worker_id': self.worker_id, 'leader': self.is_leader}
+
+
+def create_coordinator(config):
+    """Build the coordinator selected by SCALING_COORDINATION."""
+    mode = config.get('SCALING_COORDINATION', 'lease')
+    if mode == 'lease':
+        return DatabaseCoordinator(config)
+    if mode == 'shard':
+        return DatabaseCoordinator(config, sharded=True)
+    if mode == 'filelock':
+        return FileLockCoordinator(config)
+    if mode == 'none':
+        return NullCoordinator(config)
+    raise ValueError(f"Unknown SCALING_COORDINATION mode: {mode}")
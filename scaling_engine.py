@@ -0,0 +1,200 @@
+import time
+import logging
+from datetime import timezone
+from sqlalchemy import func
+from werkzeug.utils import import_string
+from app import db
+from app.models.models import ScalingEvent
+
+logger = logging.getLogger(__name__)
+
+
+class ThresholdEngine:
+    """Decision engine that compares windowed CPU usage against the thresholds.
+
+    On top of the plain threshold rule, every engine applies per-VM
+    cooldowns (no resize within SCALING_COOLDOWN_UP/DOWN seconds of the
+    VM's last one) and a hysteresis band (reversing the last resize needs
+    the threshold crossed by SCALING_HYSTERESIS extra points), and counts
+    the resizes those rules avoided. Subclasses change the value compared
+    against the thresholds by overriding signal().
+    """
+
+    def __init__(self, config):
+        """Initialize the engine from the app config."""
+        self.cooldown_up = config['SCALING_COOLDOWN_UP']
+        self.cooldown_down = config['SCALING_COOLDOWN_DOWN']
+        self.hysteresis = config['SCALING_HYSTERESIS']
+        self.avoided = {'cooldown': 0, 'hysteresis': 0}
+        self.predicted = 0
+        self._last_resize = {}  # vm_id -> (action, epoch seconds)
+        self._loaded = set()
+
+    def load_history(self, vm_ids):
+        """Pick up the last resize of VMs seen for the first time, e.g. after a restart or handoff."""
+        new_ids = [vm_id for vm_id in vm_ids if vm_id not in self._loaded]
+        if not new_ids:
+            return
+
+        latest = db.session.query(ScalingEvent.vm_id, func.max(ScalingEvent.timestamp).label('timestamp')) \
+            .filter(ScalingEvent.vm_id.in_(new_ids)).group_by(ScalingEvent.vm_id).subquery()
+        rows = db.session.query(ScalingEvent.vm_id, ScalingEvent.event_type, ScalingEvent.timestamp).join(
+            latest, (ScalingEvent.vm_id == latest.c.vm_id) & (ScalingEvent.timestamp == latest.c.timestamp))
+        for vm_id, event_type, timestamp in rows:
+            at = timestamp.replace(tzinfo=timezone.utc).timestamp()
+            self._last_resize.setdefault(vm_id, (event_type, at))
+        self._loaded.update(new_ids)
+
+    def retain(self, vm_ids):
+        """Forget state for VMs that are no longer scaled by this worker."""
+        vm_ids = set(vm_ids)
+        self._loaded &= vm_ids
+        for vm_id in [v for v in self._last_resize if v not in vm_ids]:
+            del self._last_resize[vm_id]
+
+    def observe(self, vm_id, cpu_usage, now=None):
+        """Record a live CPU sample."""
+
+    def signal(self, vm_id, cpu_usage, now):
+        """Value compared against the thresholds."""
+        return cpu_usage
+
+    def decide(self, vm_id, cpu_usage, high, low, now=None):
+        """Decide whether a VM needs scaling from its windowed CPU usage.
+
+        Returns an (action, cpu_usage) tuple, or None if no change is needed.
+        """
+        if cpu_usage is None:
+            return None
+
+        now = now or time.time()
+        value = self.signal(vm_id, cpu_usage, now)
+        if value > high:
+            action = 'scale_up'
+        elif value < low:
+            action = 'scale_down'
+        else:
+            return None
+
+        if not self.allow(vm_id, action, value, high, low, cpu_usage, now):
+            return None
+        return (action, cpu_usage)
+
+    def allow(self, vm_id, action, value, high, low, cpu_usage, now=None):
+        """Apply cooldown and hysteresis to a proposed resize; returns True if it may go ahead.
+
+        value is the CPU signal and cpu_usage the windowed CPU usage. A
+        scale-up triggered by another metric (value not above high) is not
+        subject to hysteresis.
+        """
+        now = now or time.time()
+        last = self._last_resize.get(vm_id)
+        if last is not None:
+            last_action, at = last
+            cpu_triggered = action == 'scale_down' or value > high
+            if action != last_action and cpu_triggered and low - self.hysteresis <= value <= high + self.hysteresis:
+                self.avoided['hysteresis'] += 1
+                return False
+            cooldown = self.cooldown_up if action == 'scale_up' else self.cooldown_down
+            if now - at < cooldown:
+                self.avoided['cooldown'] += 1
+                return False
+
+        if action == 'scale_up' and cpu_usage <= high < value:
+            # Only the forecast crossed the threshold
+            self.predicted += 1
+        return True
+
+    def record_resize(self, vm_id, action, now=None):
+        """Start the cooldown after a VM was resized."""
+        self._last_resize[vm_id] = (action, now or time.time())
+
+    def stats(self):
+        """Return counters of avoided and forecast-driven resizes."""
+        return {
+            'engine': type(self).__name__,
+            'avoided': dict(self.avoided, total=sum(self.avoided.values())),
+            'predicted': self.predicted
+        }
+
+
+class HoltEngine(ThresholdEngine):
+    """Decision engine that scales on a Holt (level and trend) forecast of CPU usage.
+
+    Each live sample updates a smoothed level and a per-second trend, with
+    the elapsed time between samples taken into account since checks are
+    not evenly spaced. The value compared against the thresholds is the
+    larger of the windowed usage and the usage forecast
+    SCALING_FORECAST_HORIZON seconds ahead, so capacity is added before a
+    rising VM crosses the high threshold while scale-downs still wait for
+    the measured usage.
+    """
+
+    trend = True
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.alpha = config['SCALING_FORECAST_ALPHA']
+        self.beta = config['SCALING_FORECAST_BETA']
+        self.horizon = config['SCALING_FORECAST_HORIZON']
+        self._state = {}  # vm_id -> [level, trend per second, epoch seconds]
+
+    def retain(self, vm_ids):
+        super().retain(vm_ids)
+        vm_ids = set(vm_ids)
+        for vm_id in [v for v in self._state if v not in vm_ids]:
+            del self._state[vm_id]
+
+    def observe(self, vm_id, cpu_usage, now=None):
+        now = now or time.time()
+        state = self._state.get(vm_id)
+        if state is None:
+            self._state[vm_id] = [cpu_usage, 0.0, now]
+            return
+
+        level, trend, at = state
+        elapsed = max(now - at, 1e-3)
+        new_level = self.alpha * cpu_usage + (1 - self.alpha) * (level + trend * elapsed)
+        if self.trend:
+            trend = self.beta * (new_level - level) / elapsed + (1 - self.beta) * trend
+        state[:] = [new_level, trend, now]
+
+    def signal(self, vm_id, cpu_usage, now):
+        state = self._state.get(vm_id)
+        if state is None:
+            return cpu_usage
+        level, trend, at = state
+        return max(cpu_usage, level + trend * (now - at + self.horizon))
+
+    def record_resize(self, vm_id, action, now=None):
+        super().record_resize(vm_id, action, now)
+        # Usage measured at the old size says little about the new one
+        self._state.pop(vm_id, None)
+
+
+class EWMAEngine(HoltEngine):
+    """Decision engine that scales on an exponentially weighted moving average (no trend)."""
+
+    trend = False
+
+
+ENGINES = {
+    'threshold': ThresholdEngine,
+    'ewma': EWMAEngine,
+    'holt': HoltEngine
+}
+
+
+def register_engine(name, engine_class):
+    """Make a custom engine selectable through SCALING_ENGINE."""
+    ENGINES[name] = engine_class
+
+
+def create_engine(config):
+    """Build the engine named by SCALING_ENGINE, a registered name or a dotted import path."""
+    name = config.get('SCALING_ENGINE', 'holt')
+    if name in ENGINES:
+        return ENGINES[name](config)
+    if '.' in name:
+        return import_string(name)(config)
+    raise ValueError(f"Unknown SCALING_ENGINE: {name}")
@@ -0,0 +1,149 @@
+import base64
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_
+from app.models.models import ScalingEvent, ScalingEventRollup
+
+ROLLUP_PERIODS = ('hour', 'day')
+BUCKET_FIELDS = ('scale_up_count', 'scale_down_count', 'min_cpu_cores', 'max_cpu_cores',
+                 'min_memory_mb', 'max_memory_mb', 'cpu_usage_sum', 'cpu_usage_count')
+
+
+def encode_cursor(event):
+    """Encode an event's (timestamp, id) position as an opaque cursor."""
+    raw = f'{event.timestamp.isoformat()}|{event.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into (timestamp, id); raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, _, event_id = raw.rpartition('|')
+        return datetime.fromisoformat(timestamp), int(event_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def bucket_start(timestamp, period):
+    """Truncate a timestamp to the start of its hour or day."""
+    if period == 'day':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def event_bucket(event):
+    """Aggregate fields for a single ScalingEvent."""
+    cores = [c for c in (event.old_cpu_cores, event.new_cpu_cores) if c is not None]
+    memory = [m for m in (event.old_memory_mb, event.new_memory_mb) if m is not None]
+    return {
+        'scale_up_count': int(event.event_type == 'scale_up'),
+        'scale_down_count': int(event.event_type == 'scale_down'),
+        'min_cpu_cores': min(cores, default=None),
+        'max_cpu_cores': max(cores, default=None),
+        'min_memory_mb': min(memory, default=None),
+        'max_memory_mb': max(memory, default=None),
+        'cpu_usage_sum': event.cpu_usage or 0.0,
+        'cpu_usage_count': int(event.cpu_usage is not None)
+    }
+
+
+def rollup_bucket(rollup):
+    """Aggregate fields of a ScalingEventRollup row."""
+    return {field: getattr(rollup, field) for field in BUCKET_FIELDS}
+
+
+def merge_buckets(target, source):
+    """Merge source aggregate fields into target in place and return it."""
+    for field in BUCKET_FIELDS:
+        a, b = target.get(field), source.get(field)
+        if a is None or b is None:
+            target[field] = b if a is None else a
+        elif field.startswith('min_'):
+            target[field] = min(a, b)
+        elif field.startswith('max_'):
+            target[field] = max(a, b)
+        else:
+            target[field] = a + b
+    return target
+
+
+class ScalingHistoryService:
+    """Service for reading a VM's scaling history newest-first with keyset pagination.
+
+    Pages are selected with a (timestamp, id) seek on the (vm_id, timestamp)
+    index instead of OFFSET, so every page costs the same however deep the
+    client has paged.
+    """
+
+    def _query(self, vm_id, since=None, until=None, after=None):
+        """Build the ordered query for a VM, optionally starting after a (timestamp, id) position."""
+        query = ScalingEvent.query.filter(ScalingEvent.vm_id == vm_id)
+        if since:
+            query = query.filter(ScalingEvent.timestamp >= since)
+        if until:
+            query = query.filter(ScalingEvent.timestamp < until)
+        if after:
+            timestamp, event_id = after
+            query = query.filter(or_(
+                ScalingEvent.timestamp < timestamp,
+                and_(ScalingEvent.timestamp == timestamp, ScalingEvent.id < event_id)
+            ))
+        return query.order_by(ScalingEvent.timestamp.desc(), ScalingEvent.id.desc())
+
+    def get_page(self, vm_id, limit, cursor=None, since=None, until=None):
+        """Get one page of events and the cursor for the next page (None on the last page)."""
+        after = decode_cursor(cursor) if cursor else None
+        events = self._query(vm_id, since, until, after).limit(limit + 1).all()
+        if len(events) > limit:
+            events = events[:limit]
+            return events, encode_cursor(events[-1])
+        return events, None
+
+    def iter_events(self, vm_id, since=None, until=None, batch_size=1000):
+        """Yield every matching event, fetching one keyset page at a time."""
+        after = None
+        while True:
+            events = self._query(vm_id, since, until, after).limit(batch_size).all()
+            yield from events
+            if len(events) < batch_size:
+                return
+            after = (events[-1].timestamp, events[-1].id)
+
+    def get_summary(self, vm_id, since=None, until=None, period=None):
+        """Get per-hour or per-day scaling aggregates for a VM.
+
+        Events past raw retention only exist in the rollup tables and newer
+        ones only as raw rows, so both are read and merged per bucket. Without
+        an explicit period, hours are used when since is within hourly rollup
+        retention and days otherwise. Rollups are selected by bucket start,
+        so the range is aligned to whole buckets.
+        """
+        if period is None:
+            hourly_days = current_app.config['SCALING_ROLLUP_HOURLY_RETENTION_DAYS']
+            recent = since is not None and since >= datetime.utcnow() - timedelta(days=hourly_days)
+            period = 'hour' if recent else 'day'
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f'Invalid period: {period}')
+
+        buckets = {}
+        query = ScalingEventRollup.query.filter(ScalingEventRollup.vm_id == vm_id,
+                                                ScalingEventRollup.period == period)
+        if since:
+            query = query.filter(ScalingEventRollup.bucket_start >= bucket_start(since, period))
+        if until:
+            query = query.filter(ScalingEventRollup.bucket_start < until)
+        for rollup in query:
+            merge_buckets(buckets.setdefault(rollup.bucket_start, {}), rollup_bucket(rollup))
+
+        for event in self.iter_events(vm_id, since, until):
+            merge_buckets(buckets.setdefault(bucket_start(event.timestamp, period), {}), event_bucket(event))
+
+        summary = []
+        for start in sorted(buckets):
+            bucket = buckets[start]
+            count = bucket.pop('cpu_usage_count')
+            total = bucket.pop('cpu_usage_sum')
+            bucket.update(bucket_start=start, period=period, cpu_usage_mean=total / count if count else None)
+            summary.append(bucket)
+        return summary
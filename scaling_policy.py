@@ -0,0 +1,150 @@
+import math
+from app.models.models import ScalingPolicy
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+# Columns of the metrics matrix, in order
+METRICS = ('cpu', 'memory', 'disk_io', 'network')
+
+# Built-in policy, matching the original fixed scaling rule
+DEFAULT_POLICY = {
+    'cpu_high': None,  # CPU_THRESHOLD_HIGH
+    'cpu_low': None,  # CPU_THRESHOLD_LOW
+    'memory_high': None,
+    'memory_low': None,
+    'disk_io_high': None,
+    'network_high': None,
+    'min_cpu_cores': 1,
+    'max_cpu_cores': 4,
+    'min_memory_mb': 512,
+    'max_memory_mb': 8192,
+    'cpu_step': 1,
+    'memory_step_up': 1.25,
+    'memory_step_down': 0.8
+}
+POLICY_FIELDS = tuple(DEFAULT_POLICY)
+
+# Policy fields stored in Integer columns
+INTEGER_POLICY_FIELDS = ('min_cpu_cores', 'max_cpu_cores', 'min_memory_mb', 'max_memory_mb', 'cpu_step')
+
+
+def policy_settings(policy, config):
+    """Resolve a ScalingPolicy row (or None) into a complete settings dict."""
+    settings = dict(DEFAULT_POLICY)
+    if policy is not None:
+        for field in POLICY_FIELDS:
+            value = getattr(policy, field)
+            if value is not None:
+                settings[field] = value
+    if settings['cpu_high'] is None:
+        settings['cpu_high'] = config['CPU_THRESHOLD_HIGH']
+    if settings['cpu_low'] is None:
+        settings['cpu_low'] = config['CPU_THRESHOLD_LOW']
+    return settings
+
+
+def policy_settings_error(settings):
+    """Return why resolved policy settings can never scale sensibly, or None."""
+    if settings['min_cpu_cores'] > settings['max_cpu_cores']:
+        return 'min_cpu_cores must not be above max_cpu_cores'
+    if settings['min_memory_mb'] > settings['max_memory_mb']:
+        return 'min_memory_mb must not be above max_memory_mb'
+    if settings['cpu_step'] <= 0:
+        return 'cpu_step must be positive'
+    if settings['memory_step_up'] < 1:
+        return 'memory_step_up must be at least 1'
+    if settings['memory_step_down'] > 1:
+        return 'memory_step_down must be at most 1'
+    if settings['cpu_low'] >= settings['cpu_high']:
+        return 'cpu_low must be below cpu_high'
+    return None
+
+
+def _nan(value):
+    return math.nan if value is None else float(value)
+
+
+class PolicyTable:
+    """Resolved scaling policies with their thresholds laid out as columns.
+
+    Row 0 is the default policy. evaluate() takes one row of METRICS
+    values per VM and compares the whole matrix against each VM's
+    thresholds at once: a VM scales up if any metric is above its high
+    threshold, and down if no metric is high and every metric with a low
+    threshold is below it. NaN marks a missing value or a disabled
+    threshold.
+    """
+
+    def __init__(self, settings, rows_by_policy_id=None):
+        """Build the table from resolved settings dicts (default first)."""
+        self.settings = settings
+        self._rows = rows_by_policy_id or {}
+        highs = [[_nan(s['cpu_high']), _nan(s['memory_high']), _nan(s['disk_io_high']), _nan(s['network_high'])]
+                 for s in settings]
+        lows = [[_nan(s['cpu_low']), _nan(s['memory_low']), math.nan, math.nan] for s in settings]
+        if numpy is not None:
+            self._highs = numpy.array(highs, dtype=numpy.float64)
+            self._lows = numpy.array(lows, dtype=numpy.float64)
+        else:
+            self._highs = highs
+            self._lows = lows
+
+    @classmethod
+    def load(cls, config):
+        """Load every ScalingPolicy row; the one named 'default' replaces the built-in defaults."""
+        policies = ScalingPolicy.query.order_by(ScalingPolicy.id).all()
+        default = next((p for p in policies if p.name == 'default'), None)
+        settings = [policy_settings(default, config)]
+        rows = {}
+        for policy in policies:
+            if policy is default:
+                rows[policy.id] = 0
+                continue
+            rows[policy.id] = len(settings)
+            settings.append(policy_settings(policy, config))
+        return cls(settings, rows)
+
+    def row_for(self, vm):
+        """Return the policy row index for a VM."""
+        return self._rows.get(vm.scaling_policy_id, 0)
+
+    def evaluate(self, rows, values):
+        """Evaluate VMs given their policy rows and METRICS values.
+
+        Returns a list with 'scale_up', 'scale_down' or None per VM.
+        """
+        if not rows:
+            return []
+        if numpy is not None:
+            return self._evaluate_numpy(rows, values)
+        return self._evaluate_python(rows, values)
+
+    def _evaluate_numpy(self, rows, values):
+        """Vectorized evaluation over the whole metrics matrix."""
+        index = numpy.asarray(rows, dtype=numpy.intp)
+        matrix = numpy.array(values, dtype=numpy.float64).reshape(len(rows), len(METRICS))
+        highs = self._highs[index]
+        lows = self._lows[index]
+        with numpy.errstate(invalid='ignore'):
+            up = (matrix > highs).any(axis=1)
+            below = (matrix < lows) | numpy.isnan(lows)
+        down = below.all(axis=1) & ~numpy.isnan(matrix[:, 0]) & ~up
+        actions = numpy.where(up, 1, numpy.where(down, -1, 0))
+        return [('scale_up' if a > 0 else 'scale_down' if a < 0 else None) for a in actions.tolist()]
+
+    def _evaluate_python(self, rows, values):
+        """Pure-Python fallback used when numpy is not installed."""
+        actions = []
+        for row, metrics in zip(rows, values):
+            highs, lows = self._highs[row], self._lows[row]
+            metrics = [_nan(v) for v in metrics]
+            if any(v > h for v, h in zip(metrics, highs)):
+                actions.append('scale_up')
+            elif not math.isnan(metrics[0]) and all(math.isnan(low) or v < low for v, low in zip(metrics, lows)):
+                actions.append('scale_down')
+            else:
+                actions.append(None)
+        return actions
@@ -0,0 +1,153 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.models import ScalingEvent, ScalingEventRollup
+from app.services.scaling_history_service import (
+    ROLLUP_PERIODS,
+    bucket_start,
+    event_bucket,
+    merge_buckets,
+    rollup_bucket
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ScalingRetentionService:
+    """Service that rolls old scaling events into hourly and daily aggregates.
+
+    Raw events older than SCALING_EVENTS_RAW_RETENTION_HOURS are folded
+    into both rollup periods and deleted in the same transaction, one
+    bounded batch at a time, so an event is counted either as a raw row or
+    in the rollups but never both. Hourly rollups are dropped after
+    SCALING_ROLLUP_HOURLY_RETENTION_DAYS; daily rollups are kept.
+    """
+
+    def __init__(self):
+        """Initialize the retention job."""
+        self.app = None
+        self.thread = None
+        self.running = False
+        self.last_run = None
+        self._wake = threading.Event()
+
+    def start(self, app=None):
+        """Start the retention job in a background thread."""
+        if self.running:
+            logger.info("Scaling retention job is already running")
+            return False
+
+        self.app = app or current_app._get_current_object()
+        self.running = True
+        self.thread = threading.Thread(target=self._run_retention_loop, name='scaling-retention')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info("Scaling retention job started")
+        return True
+
+    def stop(self):
+        """Stop the retention job."""
+        if not self.running:
+            return False
+
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Scaling retention job stopped")
+        return True
+
+    def _run_retention_loop(self):
+        """Run the retention job every SCALING_RETENTION_INTERVAL seconds."""
+        while self.running:
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"Error in scaling retention job: {str(e)}")
+
+            self._wake.wait(self.app.config['SCALING_RETENTION_INTERVAL'])
+            self._wake.clear()
+
+    def run_once(self):
+        """Roll up expired raw events and prune expired hourly rollups."""
+        config = current_app.config
+        now = datetime.utcnow()
+        batch_size = config['SCALING_RETENTION_BATCH_SIZE']
+        raw_cutoff = now - timedelta(hours=config['SCALING_EVENTS_RAW_RETENTION_HOURS'])
+        hourly_cutoff = now - timedelta(days=config['SCALING_ROLLUP_HOURLY_RETENTION_DAYS'])
+
+        rolled_up = 0
+        while True:
+            events = ScalingEvent.query.filter(ScalingEvent.timestamp < raw_cutoff) \
+                .order_by(ScalingEvent.id).limit(batch_size).all()
+            if not events or not self._roll_up(events):
+                break
+            rolled_up += len(events)
+            if len(events) < batch_size:
+                break
+
+        pruned = 0
+        while True:
+            ids = [rollup_id for (rollup_id,) in db.session.query(ScalingEventRollup.id).filter(
+                ScalingEventRollup.period == 'hour', ScalingEventRollup.bucket_start < hourly_cutoff
+            ).limit(batch_size)]
+            if not ids:
+                break
+            ScalingEventRollup.query.filter(ScalingEventRollup.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            pruned += len(ids)
+            if len(ids) < batch_size:
+                break
+
+        self.last_run = {
+            'timestamp': now.isoformat(),
+            'rolled_up': rolled_up,
+            'pruned_hourly_rollups': pruned
+        }
+        if rolled_up or pruned:
+            logger.info(f"Scaling retention: rolled up {rolled_up} events, pruned {pruned} hourly rollups")
+        return self.last_run
+
+    def _roll_up(self, events):
+        """Fold one batch of events into the rollups and delete them; returns False if the batch was lost."""
+        buckets = {}
+        for event in events:
+            for period in ROLLUP_PERIODS:
+                key = (event.vm_id, period, bucket_start(event.timestamp, period))
+                merge_buckets(buckets.setdefault(key, {}), event_bucket(event))
+
+        starts = {start for _, _, start in buckets}
+        vm_ids = {vm_id for vm_id, _, _ in buckets}
+        existing = {
+            (rollup.vm_id, rollup.period, rollup.bucket_start): rollup
+            for rollup in ScalingEventRollup.query.filter(
+                ScalingEventRollup.bucket_start.in_(starts),
+                ScalingEventRollup.vm_id.in_(vm_ids)
+            )
+        }
+
+        for (vm_id, period, start), bucket in buckets.items():
+            rollup = existing.get((vm_id, period, start))
+            if rollup is None:
+                rollup = ScalingEventRollup(vm_id=vm_id, period=period, bucket_start=start)
+                db.session.add(rollup)
+            for field, value in merge_buckets(rollup_bucket(rollup), bucket).items():
+                setattr(rollup, field, value)
+
+        # Another process rolling up the same rows would count them twice
+        ids = [event.id for event in events]
+        deleted = ScalingEvent.query.filter(ScalingEvent.id.in_(ids)).delete(synchronize_session=False)
+        if deleted != len(ids):
+            db.session.rollback()
+            logger.warning("Scaling events were rolled up concurrently; skipping this run")
+            return False
+
+        db.session.commit()
+        return True
+
+
+# Process-wide retention job started by the application runner
+scaling_retention = ScalingRetentionService()
@@ -0,0 +1,84 @@
+import heapq
+import random
+
+
+class CheckScheduler:
+    """Heap of per-VM next-check times for the auto-scaler.
+
+    Each VM has its own check interval. It starts at the base interval,
+    drops to the minimum while the VM is close to a threshold or was just
+    resized, and grows by `backoff` towards the maximum while the VM stays
+    stable. Every interval is jittered so checks stay spread out instead of
+    lining up into bursts. Times are time.monotonic() values.
+    """
+
+    def __init__(self, base_interval, min_interval, max_interval, backoff=1.5, jitter=0.1):
+        """Initialize an empty schedule."""
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.backoff = backoff
+        self.jitter = jitter
+        self._heap = []  # (due, vm_id); entries whose due no longer matches _due are stale
+        self._due = {}
+        self._intervals = {}
+
+    def __len__(self):
+        return len(self._due)
+
+    def sync(self, vm_ids, now):
+        """Schedule newly seen VMs and forget VMs that are no longer in vm_ids.
+
+        New VMs are spread evenly across one base interval.
+        """
+        vm_ids = set(vm_ids)
+        for vm_id in set(self._due) - vm_ids:
+            del self._due[vm_id]
+            del self._intervals[vm_id]
+
+        new_ids = sorted(vm_ids - set(self._due))
+        for i, vm_id in enumerate(new_ids):
+            offset = self.base_interval * (i + random.random()) / len(new_ids)
+            self._intervals[vm_id] = self.base_interval
+            self._push(vm_id, now + offset)
+
+    def pop_due(self, now, limit=None):
+        """Remove and return the ids of up to `limit` VMs whose check is due, most overdue first."""
+        due = []
+        while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+            when, vm_id = heapq.heappop(self._heap)
+            if self._due.get(vm_id) == when:
+                del self._due[vm_id]
+                due.append(vm_id)
+        return due
+
+    def next_due(self):
+        """Return the time of the earliest scheduled check, or None if nothing is scheduled."""
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def reschedule(self, vm_id, now, urgent=None):
+        """Schedule a checked VM's next check.
+
+        urgent is True for VMs near a threshold, False for stable VMs and
+        None when the check produced no signal (e.g. the VM is stopped).
+        """
+        if vm_id not in self._intervals:
+            return
+
+        interval = self._intervals[vm_id]
+        if urgent:
+            interval = self.min_interval
+        elif urgent is None:
+            interval = self.base_interval
+        else:
+            interval = min(max(interval, self.base_interval) * self.backoff, self.max_interval)
+        self._intervals[vm_id] = interval
+
+        jittered = interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._push(vm_id, now + jittered)
+
+    def _push(self, vm_id, when):
+        self._due[vm_id] = when
+        heapq.heappush(self._heap, (when, vm_id))
@@ -4,5 +4,5 @@
 echo "Starting Proxmox VM Automation Web App..."
 cd /home/ubuntu/devops_project
 source venv/bin/activate
-export FLASK_APP=app.app
-flask run --host=0.0.0.0 --port=5000
+# Threaded workers, so open metrics streams do not tie up a whole worker each
+gunicorn -c gunicorn.conf.py app.app:app
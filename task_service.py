@@ -0,0 +1,249 @@
+import heapq
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from app import db
+from app.models.models import VM, ScalingEvent, ScalingEventRollup, Task
+from app.services.proxmox_service import ProxmoxService
+
+logger = logging.getLogger(__name__)
+
+# VM status shown while a lifecycle task is in flight, and once it succeeds
+PENDING_VM_STATUS = {
+    'create': 'creating',
+    'clone': 'creating',
+    'start': 'starting',
+    'stop': 'stopping',
+    'delete': 'deleting',
+    'migrate': 'migrating'
+}
+FINAL_VM_STATUS = {
+    'create': 'stopped',
+    'clone': 'stopped',
+    'start': 'running',
+    'stop': 'stopped',
+    'migrate': 'running'
+}
+
+class TaskTracker:
+    """Service that follows Proxmox tasks (UPIDs) until they finish.
+
+    Lifecycle routes record a Task row and return immediately; a background
+    thread polls each task with a growing interval and, once Proxmox reports
+    it finished, stores the outcome and brings the VM row up to date.
+    """
+
+    def __init__(self):
+        """Initialize the task tracker."""
+        self.proxmox_service = ProxmoxService()
+        self.app = None
+        self.thread = None
+        self.running = False
+        self._queue = []  # heap of (next_poll, task_id, interval)
+        self._condition = threading.Condition()
+
+    def create_task(self, node, upid, action, vm=None, vmid=None, user_id=None, payload=None):
+        """Record a task for a lifecycle call and mark the VM as pending.
+
+        payload may hold a 'config' dict that is applied to the VM once the
+        task succeeds (e.g. cores and memory after a clone), a 'target'
+        node the VM lives on afterwards (for migrations), and a 'scaling'
+        dict of ScalingEvent fields recorded once that config is applied
+        (for auto-scaler resizes that wait on a migration). The task is
+        added to the current session but not committed, so the caller can
+        commit it together with its own changes and then pass it to watch().
+        If Proxmox did not return a UPID the task is treated as already
+        finished.
+        """
+        task = Task(
+            upid=upid if isinstance(upid, str) else None,
+            node=node,
+            vmid=vmid if vmid is not None else (vm.proxmox_id if vm else None),
+            action=action,
+            user_id=user_id,
+            vm_id=vm.id if vm else None,
+            payload=json.dumps(payload) if payload else None
+        )
+        db.session.add(task)
+
+        if task.upid is None:
+            self._finish(task, 'ok', 'OK')
+        elif vm is not None and action in PENDING_VM_STATUS:
+            vm.status = PENDING_VM_STATUS[action]
+        return task
+
+    def watch(self, *tasks):
+        """Start polling committed tasks in the background."""
+        config = current_app.config
+        interval = config.get('TASK_POLL_INITIAL_INTERVAL', 0.5)
+        with self._condition:
+            for task in tasks:
+                if task is not None and not task.done:
+                    heapq.heappush(self._queue, (time.monotonic() + interval, task.id, interval))
+            self._condition.notify()
+
+        if not self.running:
+            self.start(current_app._get_current_object())
+
+    def start(self, app):
+        """Start the polling thread."""
+        with self._condition:
+            if self.running:
+                return False
+            self.app = app
+            self.running = True
+
+        self.thread = threading.Thread(target=self._run_poll_loop, name='task-tracker')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info("Task tracker started")
+        return True
+
+    def stop(self):
+        """Stop the polling thread."""
+        with self._condition:
+            if not self.running:
+                return False
+            self.running = False
+            self._condition.notify()
+
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info("Task tracker stopped")
+        return True
+
+    def refresh(self, task):
+        """Poll a single task now, e.g. when it is read but no worker is watching it.
+
+        Commits the outcome and returns True if the task finished.
+        """
+        if task.done:
+            return True
+
+        finished = self._poll(task)
+        db.session.commit()
+        return finished
+
+    def _run_poll_loop(self):
+        """Poll due tasks, growing each task's interval while it keeps running."""
+        while True:
+            with self._condition:
+                while self.running and (not self._queue or self._queue[0][0] > time.monotonic()):
+                    timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+                    self._condition.wait(timeout)
+                if not self.running:
+                    return
+
+                now = time.monotonic()
+                due = []
+                while self._queue and self._queue[0][0] <= now:
+                    due.append(heapq.heappop(self._queue))
+
+            try:
+                with self.app.app_context():
+                    pending = self._poll_due(due)
+            except Exception as e:
+                logger.error(f"Error polling Proxmox tasks: {str(e)}")
+                pending = [(task_id, interval) for _, task_id, interval in due]
+
+            max_interval = self.app.config.get('TASK_POLL_MAX_INTERVAL', 10)
+            backoff = self.app.config.get('TASK_POLL_BACKOFF', 1.5)
+            with self._condition:
+                now = time.monotonic()
+                for task_id, interval in pending:
+                    interval = min(interval * backoff, max_interval)
+                    heapq.heappush(self._queue, (now + interval, task_id, interval))
+
+    def _poll_due(self, due):
+        """Poll a batch of due tasks and commit their outcomes in one transaction.
+
+        Returns (task_id, interval) pairs for tasks that are still running.
+        """
+        tasks = {task.id: task for task in Task.query.filter(Task.id.in_([task_id for _, task_id, _ in due]))}
+        pending = []
+        for _, task_id, interval in due:
+            task = tasks.get(task_id)
+            if task is None or task.done:
+                continue
+            try:
+                if not self._poll(task):
+                    pending.append((task_id, interval))
+            except Exception as e:
+                logger.error(f"Error polling task {task.upid}: {str(e)}")
+                pending.append((task_id, interval))
+
+        db.session.commit()
+        return pending
+
+    def _poll(self, task):
+        """Poll one task; returns True once it has finished."""
+        task.last_polled_at = datetime.utcnow()
+        status = self.proxmox_service.get_task_status(task.node, task.upid)
+
+        if status is None or status.get('status') == 'running':
+            timeout = current_app.config.get('TASK_TIMEOUT', 3600)
+            if (task.last_polled_at - task.created_at).total_seconds() > timeout:
+                logger.warning(f"Giving up on task {task.upid} after {timeout}s")
+                self._finish(task, 'unknown', 'timed out waiting for task')
+                return True
+            return False
+
+        exit_status = status.get('exitstatus', '')
+        self._finish(task, 'ok' if exit_status == 'OK' else 'error', exit_status)
+        return True
+
+    def _finish(self, task, status, exit_status):
+        """Store a task's outcome and update the VM it acted on."""
+        task.status = status
+        task.exit_status = exit_status
+        task.finished_at = datetime.utcnow()
+
+        vm = VM.query.get(task.vm_id) if task.vm_id else None
+        if vm is None:
+            return
+
+        if status == 'ok' and task.action == 'delete':
+            task.vm_id = None
+            # Tables created before the rollups' FK cascaded still hold the constraint
+            ScalingEventRollup.query.filter_by(vm_id=vm.id).delete(synchronize_session=False)
+            db.session.delete(vm)
+        elif status == 'ok' and task.action in FINAL_VM_STATUS:
+            vm.status = FINAL_VM_STATUS[task.action]
+            self._apply_follow_up(task, vm)
+        elif task.action in ('create', 'clone'):
+            vm.status = 'error'
+        else:
+            # The action failed or timed out; trust whatever Proxmox reports now
+            current = self.proxmox_service.get_vm_status(vm.proxmox_node, vm.proxmox_id)
+            vm.status = current.get('status', 'unknown') if current else 'unknown'
+
+        logger.info(f"Task {task.upid or task.id} ({task.action}) finished: {status} {exit_status}")
+
+    def _apply_follow_up(self, task, vm):
+        """Apply the config change a task was waiting on, e.g. cores and memory after a clone."""
+        payload = json.loads(task.payload) if task.payload else {}
+        if payload.get('target'):
+            vm.proxmox_node = payload['target']
+        
+        params = payload.get('config')
+        if not params:
+            return
+
+        if self.proxmox_service.update_vm_config(vm.proxmox_node, vm.proxmox_id, params):
+            if 'cores' in params:
+                vm.cpu_cores = params['cores']
+            if 'memory' in params:
+                vm.memory_mb = params['memory']
+            if payload.get('scaling'):
+                db.session.add(ScalingEvent(vm_id=vm.id, task_id=task.id, migrated_from=task.node,
+                                            migrated_to=payload.get('target'), **payload['scaling']))
+        else:
+            task.exit_status = f'{task.exit_status} (config update failed)'
+            logger.error(f"Failed to apply config {params} to VM {vm.id} after {task.action}")
+
+
+# Process-wide tracker shared by the API and VM blueprints
+task_tracker = TaskTracker()
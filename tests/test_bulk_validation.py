@@ -0,0 +1,37 @@
+import pytest
+from app.controllers.api import BULK_CONFIG_PARAMS, _validate_bulk_item
+
+
+def item(**overrides):
+    base = {'node': 'pve1', 'vmid': 100, 'action': 'start'}
+    base.update(overrides)
+    return base
+
+
+@pytest.mark.parametrize('action', ['start', 'stop', 'delete'])
+def test_lifecycle_items_are_valid(action):
+    assert _validate_bulk_item(item(action=action)) is None
+
+
+def test_config_item_with_supported_params_is_valid():
+    params = {key: 2 for key in BULK_CONFIG_PARAMS}
+
+    assert _validate_bulk_item(item(action='config', params=params)) is None
+
+
+@pytest.mark.parametrize('bad, message', [
+    ('start', 'must be an object'),
+    (item(node=''), 'node and integer vmid are required'),
+    (item(node=5), 'node and integer vmid are required'),
+    (item(vmid='100'), 'node and integer vmid are required'),
+    (item(vmid=True), 'node and integer vmid are required'),
+    (item(action='reboot'), 'action must be start, stop, delete or config'),
+    (item(action='config'), 'params are required for config'),
+    (item(action='config', params=[2]), 'params are required for config'),
+    (item(action='config', params={'cores': 2, 'net0': 'virtio'}), 'unsupported params: net0'),
+    (item(action='config', params={'cores': 0}), 'cores must be a positive integer'),
+    (item(action='config', params={'cores': True}), 'cores must be a positive integer'),
+    (item(action='config', params={'cores': 2.5}), 'cores must be a positive integer'),
+])
+def test_invalid_items_are_rejected(bad, message):
+    assert _validate_bulk_item(bad) == message
@@ -0,0 +1,87 @@
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from app.controllers.api import _parse_timestamp
+from app.services.scaling_history_service import (BUCKET_FIELDS, bucket_start, decode_cursor, encode_cursor,
+                                                  event_bucket, merge_buckets)
+
+
+def scaling_event(event_type='scale_up', cpu_usage=90.0, cores=(2, 4), memory=(2048, 4096)):
+    return SimpleNamespace(event_type=event_type, cpu_usage=cpu_usage,
+                           old_cpu_cores=cores[0], new_cpu_cores=cores[1],
+                           old_memory_mb=memory[0], new_memory_mb=memory[1])
+
+
+def test_parse_timestamp_keeps_naive_values():
+    assert _parse_timestamp('2024-05-01T12:30:00') == datetime(2024, 5, 1, 12, 30)
+
+
+def test_parse_timestamp_treats_missing_values_as_unbounded():
+    assert _parse_timestamp(None) is None
+    assert _parse_timestamp('') is None
+
+
+@pytest.mark.parametrize('value', ['2024-05-01T12:30:00Z', '2024-05-01T12:30:00z', '2024-05-01T14:30:00+02:00',
+                                   '2024-05-01T07:30:00-05:00'])
+def test_parse_timestamp_converts_offsets_to_naive_utc(value):
+    parsed = _parse_timestamp(value)
+
+    assert parsed == datetime(2024, 5, 1, 12, 30)
+    assert parsed.tzinfo is None
+
+
+@pytest.mark.parametrize('value', ['yesterday', '2024-13-01', '12:30'])
+def test_parse_timestamp_rejects_malformed_values(value):
+    with pytest.raises(ValueError):
+        _parse_timestamp(value)
+
+
+def test_cursor_round_trips_an_event_position():
+    event = SimpleNamespace(timestamp=datetime(2024, 5, 1, 12, 30, 15, 250), id=42)
+
+    assert decode_cursor(encode_cursor(event)) == (event.timestamp, 42)
+
+
+def test_malformed_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_bucket_start_truncates_to_hour_or_day():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 250)
+
+    assert bucket_start(timestamp, 'hour') == datetime(2024, 5, 1, 12)
+    assert bucket_start(timestamp, 'day') == datetime(2024, 5, 1)
+
+
+def test_event_bucket_counts_the_event_and_spans_old_and_new_values():
+    bucket = event_bucket(scaling_event())
+
+    assert bucket == {'scale_up_count': 1, 'scale_down_count': 0, 'min_cpu_cores': 2, 'max_cpu_cores': 4,
+                      'min_memory_mb': 2048, 'max_memory_mb': 4096, 'cpu_usage_sum': 90.0, 'cpu_usage_count': 1}
+
+
+def test_event_bucket_skips_missing_values():
+    bucket = event_bucket(scaling_event('scale_down', cpu_usage=None, cores=(None, 2), memory=(None, None)))
+
+    assert bucket['scale_down_count'] == 1
+    assert bucket['min_cpu_cores'] == bucket['max_cpu_cores'] == 2
+    assert bucket['min_memory_mb'] is None and bucket['max_memory_mb'] is None
+    assert bucket['cpu_usage_sum'] == 0.0 and bucket['cpu_usage_count'] == 0
+
+
+def test_merge_buckets_sums_counts_and_widens_ranges():
+    target = event_bucket(scaling_event())
+    merged = merge_buckets(target, event_bucket(scaling_event('scale_down', 10.0, (4, 1), (4096, 8192))))
+
+    assert merged is target
+    assert merged == {'scale_up_count': 1, 'scale_down_count': 1, 'min_cpu_cores': 1, 'max_cpu_cores': 4,
+                      'min_memory_mb': 2048, 'max_memory_mb': 8192, 'cpu_usage_sum': 100.0, 'cpu_usage_count': 2}
+
+
+def test_merge_buckets_keeps_the_known_side_of_a_missing_value():
+    empty = {field: None for field in BUCKET_FIELDS}
+    bucket = event_bucket(scaling_event())
+
+    assert merge_buckets(dict(empty), bucket) == bucket
+    assert merge_buckets(dict(bucket), empty) == bucket
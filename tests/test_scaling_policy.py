@@ -0,0 +1,63 @@
+import math
+import pytest
+from app.services.scaling_policy import DEFAULT_POLICY, PolicyTable, policy_settings, policy_settings_error
+
+CONFIG = {'CPU_THRESHOLD_HIGH': 80.0, 'CPU_THRESHOLD_LOW': 20.0}
+NAN = math.nan
+
+
+def settings(**overrides):
+    resolved = policy_settings(None, CONFIG)
+    resolved.update(overrides)
+    return resolved
+
+
+def test_policy_settings_fall_back_to_defaults_and_config_thresholds():
+    resolved = policy_settings(None, CONFIG)
+
+    assert resolved['cpu_high'] == 80.0
+    assert resolved['cpu_low'] == 20.0
+    assert resolved['max_cpu_cores'] == DEFAULT_POLICY['max_cpu_cores']
+
+
+def test_default_settings_are_valid():
+    assert policy_settings_error(settings()) is None
+
+
+@pytest.mark.parametrize('overrides', [
+    {'min_cpu_cores': 8, 'max_cpu_cores': 4},
+    {'min_memory_mb': 4096, 'max_memory_mb': 2048},
+    {'cpu_step': 0},
+    {'cpu_step': -1},
+    {'memory_step_up': 0.9},
+    {'memory_step_down': 1.1},
+    {'cpu_low': 80.0},
+    {'cpu_low': 90.0, 'cpu_high': 50.0},
+])
+def test_inconsistent_settings_are_rejected(overrides):
+    assert policy_settings_error(settings(**overrides)) is not None
+
+
+def test_equal_bounds_and_unit_steps_are_allowed():
+    assert policy_settings_error(settings(min_cpu_cores=2, max_cpu_cores=2, memory_step_up=1,
+                                          memory_step_down=1)) is None
+
+
+@pytest.mark.parametrize('evaluate', ['_evaluate_numpy', '_evaluate_python'])
+def test_evaluate_applies_each_vms_policy(evaluate):
+    if evaluate == '_evaluate_numpy':
+        pytest.importorskip('numpy')
+    table = PolicyTable([settings(), settings(cpu_high=50.0, cpu_low=10.0, memory_high=90.0)])
+    rows = [0, 1, 0, 1, 1, 0]
+    values = [
+        [85.0, NAN, NAN, NAN],  # above the default CPU threshold
+        [60.0, 40.0, NAN, NAN],  # above policy 1's CPU threshold only
+        [50.0, NAN, NAN, NAN],  # between the default thresholds
+        [5.0, 95.0, NAN, NAN],  # low CPU but memory above policy 1's threshold
+        [5.0, 40.0, NAN, NAN],  # low CPU; policy 1 has no low memory threshold
+        [NAN, NAN, NAN, NAN],  # no reading
+    ]
+
+    actions = getattr(table, evaluate)(rows, values)
+
+    assert actions == ['scale_up', 'scale_up', None, 'scale_up', 'scale_down', None]
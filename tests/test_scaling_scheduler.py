@@ -0,0 +1,91 @@
+from app.services.scaling_scheduler import CheckScheduler
+
+
+def make_scheduler(**kwargs):
+    settings = dict(base_interval=60, min_interval=10, max_interval=300, backoff=2, jitter=0)
+    settings.update(kwargs)
+    return CheckScheduler(**settings)
+
+
+def test_sync_spreads_new_vms_across_one_base_interval():
+    scheduler = make_scheduler()
+    scheduler.sync(range(1, 7), now=0)
+
+    assert len(scheduler) == 6
+    assert scheduler.pop_due(now=0) == []
+    assert sorted(scheduler.pop_due(now=60)) == [1, 2, 3, 4, 5, 6]
+
+
+def test_sync_forgets_vms_that_are_gone():
+    scheduler = make_scheduler()
+    scheduler.sync([1, 2], now=0)
+    scheduler.sync([2], now=0)
+
+    assert len(scheduler) == 1
+    assert scheduler.pop_due(now=60) == [2]
+
+
+def test_pop_due_returns_most_overdue_first_and_respects_limit():
+    scheduler = make_scheduler()
+    scheduler.sync([1, 2, 3], now=0)
+    scheduler.reschedule(1, now=0, urgent=None)  # due at 60
+    scheduler.reschedule(2, now=0, urgent=False)  # due at 120
+    scheduler.reschedule(3, now=0, urgent=True)  # due at 10
+
+    assert scheduler.pop_due(now=200, limit=2) == [3, 1]
+    assert scheduler.pop_due(now=200) == [2]
+    assert scheduler.next_due() is None
+
+
+def test_urgent_vms_use_the_minimum_interval():
+    scheduler = make_scheduler()
+    scheduler.sync([1], now=0)
+    scheduler.pop_due(now=60)
+
+    scheduler.reschedule(1, now=100, urgent=True)
+
+    assert scheduler.next_due() == 110
+
+
+def test_stable_vms_back_off_up_to_the_maximum():
+    scheduler = make_scheduler()
+    scheduler.sync([1], now=0)
+    now = 60
+    intervals = []
+    for _ in range(4):
+        scheduler.pop_due(now=now)
+        scheduler.reschedule(1, now=now, urgent=False)
+        intervals.append(scheduler.next_due() - now)
+        now = scheduler.next_due()
+
+    assert intervals == [120, 240, 300, 300]
+
+
+def test_vms_without_a_signal_return_to_the_base_interval():
+    scheduler = make_scheduler()
+    scheduler.sync([1], now=0)
+    scheduler.pop_due(now=60)
+    scheduler.reschedule(1, now=60, urgent=False)
+    scheduler.pop_due(now=180)
+
+    scheduler.reschedule(1, now=180, urgent=None)
+
+    assert scheduler.next_due() == 240
+
+
+def test_rescheduling_replaces_the_previous_due_time():
+    scheduler = make_scheduler()
+    scheduler.sync([1], now=0)
+    scheduler.reschedule(1, now=0, urgent=True)
+
+    assert scheduler.next_due() == 10
+    assert scheduler.pop_due(now=100) == [1]
+    assert scheduler.pop_due(now=100) == []
+
+
+def test_jitter_stays_within_bounds():
+    scheduler = make_scheduler(jitter=0.1)
+    scheduler.sync([1], now=0)
+    for _ in range(50):
+        scheduler.reschedule(1, now=0, urgent=None)
+        assert 54 <= scheduler.next_due() <= 66
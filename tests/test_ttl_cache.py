@@ -0,0 +1,83 @@
+from app.services import ttl_cache
+from app.services.ttl_cache import TTLCache
+
+
+def test_get_returns_a_copy_of_the_cached_value():
+    cache = TTLCache()
+    cache.set('vms:*', [{'vmid': 100, 'tags': ['web']}], ttl=30)
+
+    first = cache.get('vms:*')
+    first[0]['node'] = 'pve1'
+    first[0]['tags'].append('db')
+    first.append({'vmid': 101})
+
+    assert cache.get('vms:*') == [{'vmid': 100, 'tags': ['web']}]
+
+
+def test_set_stores_a_copy_of_the_value():
+    cache = TTLCache()
+    value = {'node': 'pve1', 'storage': [{'name': 'local'}]}
+    cache.set('storage', value, ttl=30)
+
+    value['storage'][0]['name'] = 'changed'
+
+    assert cache.get('storage') == {'node': 'pve1', 'storage': [{'name': 'local'}]}
+
+
+def test_get_or_load_result_does_not_alias_the_cache():
+    cache = TTLCache()
+    loaded = cache.get_or_load('nodes', 30, lambda: [{'node': 'pve1'}])
+    loaded[0]['node'] = 'changed'
+
+    assert cache.get('nodes') == [{'node': 'pve1'}]
+
+
+def test_empty_results_are_not_cached():
+    cache = TTLCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return []
+
+    cache.get_or_load('nodes', 30, loader)
+    cache.get_or_load('nodes', 30, loader)
+
+    assert len(calls) == 2
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, 'monotonic', lambda: now[0])
+    cache = TTLCache()
+    cache.set('status:pve1:100', {'status': 'running'}, ttl=5)
+
+    now[0] += 4.9
+    assert cache.get('status:pve1:100') == {'status': 'running'}
+    now[0] += 0.2
+    assert cache.get('status:pve1:100') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2)
+    cache.set('a', [1], ttl=30)
+    cache.set('b', [2], ttl=30)
+    cache.get('a')
+    cache.set('c', [3], ttl=30)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == [1]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidate_prefix_only_drops_matching_keys():
+    cache = TTLCache()
+    cache.set('vms:*', [1], ttl=30)
+    cache.set('vms:pve1', [2], ttl=30)
+    cache.set('nodes', [3], ttl=30)
+
+    cache.invalidate_prefix('vms:')
+
+    assert cache.get('vms:*') is None
+    assert cache.get('vms:pve1') is None
+    assert cache.get('nodes') == [3]
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def _copy(value):
+    """Copy the dicts and lists of a decoded API response; other values are shared."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+class TTLCache:
+    """Bounded in-memory cache with per-entry TTL and LRU eviction.
+
+    Values are copied on the way in and out, so callers may modify what
+    they get without changing what other callers see.
+    """
+
+    def __init__(self, max_size=1024):
+        """Initialize an empty cache holding at most max_size entries."""
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _copy(value)
+
+    def set(self, key, value, ttl):
+        """Store value under key for ttl seconds."""
+        if ttl <= 0:
+            return
+
+        value = _copy(value)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, ttl, loader):
+        """Return the cached value for key, calling loader on a miss.
+
+        Empty results (None, [] or {}) are returned but not cached so that
+        transient Proxmox failures are retried on the next call.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = loader()
+        if value:
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, *keys):
+        """Remove the given keys from the cache."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix):
+        """Remove every key starting with prefix."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0
+            }
@@ -1,11 +1,14 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from app.services.proxmox_service import ProxmoxService
+from app.services.task_service import task_tracker
+from app.services.scaling_history_service import ScalingHistoryService
 from app.models.models import VM
 from app import db
 
 vm_bp = Blueprint('vm', __name__)
 proxmox_service = ProxmoxService()
+scaling_history_service = ScalingHistoryService()
 
 @vm_bp.route('/')
 @login_required
@@ -58,11 +61,12 @@ def start(vm_id):
         flash('You do not have permission to start this VM.', 'danger')
         return redirect(url_for('vm.index'))
     
-    success = proxmox_service.start_vm(vm.proxmox_node, vm.proxmox_id)
-    if success:
-        vm.status = 'running'
+    upid = proxmox_service.start_vm(vm.proxmox_node, vm.proxmox_id)
+    if upid:
+        task = task_tracker.create_task(vm.proxmox_node, upid, 'start', vm=vm, user_id=current_user.id)
         db.session.commit()
-        flash('VM started successfully.', 'success')
+        task_tracker.watch(task)
+        flash('VM start requested.', 'success')
     else:
         flash('Failed to start VM.', 'danger')
     
@@ -79,11 +83,12 @@ def stop(vm_id):
         flash('You do not have permission to stop this VM.', 'danger')
         return redirect(url_for('vm.index'))
     
-    success = proxmox_service.stop_vm(vm.proxmox_node, vm.proxmox_id)
-    if success:
-        vm.status = 'stopped'
+    upid = proxmox_service.stop_vm(vm.proxmox_node, vm.proxmox_id)
+    if upid:
+        task = task_tracker.create_task(vm.proxmox_node, upid, 'stop', vm=vm, user_id=current_user.id)
         db.session.commit()
-        flash('VM stopped successfully.', 'success')
+        task_tracker.watch(task)
+        flash('VM stop requested.', 'success')
     else:
         flash('Failed to stop VM.', 'danger')
     
@@ -100,11 +105,13 @@ def delete(vm_id):
         flash('You do not have permission to delete this VM.', 'danger')
         return redirect(url_for('vm.index'))
     
-    success = proxmox_service.delete_vm(vm.proxmox_node, vm.proxmox_id)
-    if success:
-        db.session.delete(vm)
+    upid = proxmox_service.delete_vm(vm.proxmox_node, vm.proxmox_id)
+    if upid:
+        # The VM row is removed once the delete task finishes
+        task = task_tracker.create_task(vm.proxmox_node, upid, 'delete', vm=vm, user_id=current_user.id)
         db.session.commit()
-        flash('VM deleted successfully.', 'success')
+        task_tracker.watch(task)
+        flash('VM deletion requested.', 'success')
     else:
         flash('Failed to delete VM.', 'danger')
     
@@ -128,8 +135,11 @@ def scaling(vm_id):
         flash('Auto-scaling settings updated.', 'success')
         return redirect(url_for('vm.detail', vm_id=vm_id))
     
-    # Get scaling events for this VM
-    from app.models.models import ScalingEvent
-    events = ScalingEvent.query.filter_by(vm_id=vm.id).order_by(ScalingEvent.timestamp.desc()).all()
+    # Get one page of scaling events for this VM
+    try:
+        events, next_cursor = scaling_history_service.get_page(
+            vm.id, current_app.config['SCALING_EVENTS_PAGE_SIZE'], request.args.get('cursor'))
+    except ValueError:
+        return redirect(url_for('vm.scaling', vm_id=vm_id))
     
-    return render_template('vm/scaling.html', vm=vm, events=events)
+    return render_template('vm/scaling.html', vm=vm, events=events, next_cursor=next_cursor)
@@ -0,0 +1,269 @@
+import time
+import logging
+import threading
+from itertools import cycle
+from sqlalchemy import case, func
+from flask import current_app
+from app import db
+from app.models.models import VM, stamp_vm_versions
+from app.services.proxmox_service import ProxmoxService
+from app.services.provisioning_service import ProvisioningService, software_key
+from app.services.scaling_coordinator import DatabaseCoordinator
+from app.services.task_service import task_tracker
+
+logger = logging.getLogger(__name__)
+
+# Pooled VMs in these states count towards a pool's size
+POOL_STATUSES = ('creating', 'stopped')
+
+
+def pool_key(os_type, software):
+    """Build the pool key for an OS type and software combination, e.g. 'win10:arr_suite'."""
+    return f'{os_type}:{software_key(software)}'
+
+
+def parse_pool_sizes(value):
+    """Parse WARM_POOL_SIZES ('win10:arr_suite=2;win10:=1') into {pool_key: size}."""
+    sizes = {}
+    for entry in filter(None, (part.strip() for part in (value or '').split(';'))):
+        key, _, size = entry.rpartition('=')
+        os_type, _, software = key.partition(':')
+        sizes[pool_key(os_type, software.split(',') if software else [])] = int(size)
+    return sizes
+
+
+class WarmPoolService:
+    """Service that keeps stopped, pre-built VMs ready for each OS and software combination.
+
+    Pooled VMs are ordinary VM rows without an owner and with pool_key set.
+    A create request claims one with a conditional UPDATE, so two requests
+    can never get the same VM, and a background thread in the worker
+    holding the 'warm-pool' lease provisions replacements.
+    """
+
+    def __init__(self):
+        """Initialize the warm pool."""
+        self.proxmox_service = ProxmoxService()
+        self.provisioning_service = ProvisioningService(self.proxmox_service)
+        self.app = None
+        self.thread = None
+        self.running = False
+        self.coordinator = None
+        self.hits = 0
+        self.misses = 0
+        self._refill = threading.Event()
+        self._lock = threading.Lock()
+        self._nodes = None
+        self._nodes_expire_at = 0
+
+    def start(self, app=None):
+        """Start refilling pools in a background thread."""
+        if self.running:
+            logger.info("Warm pool is already running")
+            return False
+
+        self.app = app or current_app._get_current_object()
+        if not parse_pool_sizes(self.app.config['WARM_POOL_SIZES']):
+            logger.info("No warm pools configured")
+            return False
+
+        self.coordinator = DatabaseCoordinator(self.app.config, lease='warm-pool')
+        self.running = True
+        self.thread = threading.Thread(target=self._run_refill_loop, name='warm-pool')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info("Warm pool started")
+        return True
+
+    def stop(self):
+        """Stop the refill thread."""
+        if not self.running:
+            return False
+
+        self.running = False
+        self._refill.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        with self.app.app_context():
+            self.coordinator.release()
+        logger.info("Warm pool stopped")
+        return True
+
+    def claim(self, os_type, software, user_id, name, node=None, cores=None, memory=None, description=None):
+        """Hand a pooled VM to a user, renaming and resizing it.
+
+        VMs on node are preferred. Returns the claimed VM, or None if the
+        pool for this combination is empty.
+        """
+        key = pool_key(os_type, software)
+        if key not in parse_pool_sizes(current_app.config['WARM_POOL_SIZES']):
+            return None
+
+        candidates = db.session.query(VM.id).filter(
+            VM.pool_key == key, VM.user_id.is_(None), VM.status == 'stopped'
+        ).order_by(case((VM.proxmox_node == node, 0), else_=1), VM.id).limit(5).all()
+
+        vm = None
+        for (vm_id,) in candidates:
+            # Only one request can move the row out of the pool
+            claimed = VM.query.filter(VM.id == vm_id, VM.pool_key == key, VM.user_id.is_(None)) \
+                .update({'user_id': user_id, 'pool_key': None, 'name': name}, synchronize_session=False)
+            if claimed:
+                stamp_vm_versions(db.session, [vm_id])
+            db.session.commit()
+            if claimed:
+                vm = VM.query.get(vm_id)
+                break
+
+        with self._lock:
+            if vm is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._refill.set()
+
+        if vm is None:
+            logger.info(f"Warm pool miss for {key}")
+            return None
+
+        params = {'name': name}
+        if description:
+            params['description'] = description
+        if cores and cores != vm.cpu_cores:
+            params['cores'] = cores
+        if memory and memory != vm.memory_mb:
+            params['memory'] = memory
+
+        if self.proxmox_service.update_vm_config(vm.proxmox_node, vm.proxmox_id, params):
+            vm.cpu_cores = params.get('cores', vm.cpu_cores)
+            vm.memory_mb = params.get('memory', vm.memory_mb)
+        else:
+            logger.error(f"Failed to rename/resize pooled VM {vm.proxmox_id} for {name}")
+        db.session.commit()
+
+        logger.info(f"Warm pool hit for {key}: VM {vm.proxmox_id} claimed as {name}")
+        return vm
+
+    def stats(self):
+        """Return hit/miss counters and the number of ready and building VMs per pool."""
+        sizes = parse_pool_sizes(current_app.config['WARM_POOL_SIZES'])
+        counts = db.session.query(VM.pool_key, VM.status, func.count(VM.id)).filter(
+            VM.pool_key.in_(sizes), VM.user_id.is_(None)
+        ).group_by(VM.pool_key, VM.status).all()
+
+        pools = {key: {'target': size, 'ready': 0, 'building': 0} for key, size in sizes.items()}
+        for key, status, count in counts:
+            if status == 'stopped':
+                pools[key]['ready'] += count
+            elif status == 'creating':
+                pools[key]['building'] += count
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'pools': pools
+            }
+
+    def _run_refill_loop(self):
+        """Top pools up periodically and whenever a VM is claimed, while holding the lease."""
+        while self.running:
+            try:
+                with self.app.app_context():
+                    if self.coordinator.acquire():
+                        self.refill()
+            except Exception as e:
+                logger.error(f"Error refilling warm pools: {str(e)}")
+
+            self._refill.wait(self.app.config['WARM_POOL_REFILL_INTERVAL'])
+            self._refill.clear()
+
+    def refill(self):
+        """Provision VMs for every pool below its target size."""
+        config = current_app.config
+        sizes = parse_pool_sizes(config['WARM_POOL_SIZES'])
+        counts = dict(db.session.query(VM.pool_key, func.count(VM.id)).filter(
+            VM.pool_key.in_(sizes), VM.user_id.is_(None), VM.status.in_(POOL_STATUSES)
+        ).group_by(VM.pool_key).all())
+
+        budget = config['WARM_POOL_MAX_BUILDS']
+        for key, size in sizes.items():
+            deficit = size - counts.get(key, 0)
+            while deficit > 0 and budget > 0:
+                if not self._build(key):
+                    break
+                deficit -= 1
+                budget -= 1
+
+    def _build(self, key):
+        """Provision one pooled VM for key; returns True if a build was started."""
+        node = self._next_node()
+        vmid = self.proxmox_service.get_next_vmid()
+        if not node or not vmid:
+            return False
+
+        os_type, _, software = key.partition(':')
+        software = software.split(',') if software else []
+        config = current_app.config
+        params = {
+            'vmid': vmid,
+            'name': f'pool-{vmid}',
+            'memory': config['WARM_POOL_MEMORY'],
+            'cores': config['WARM_POOL_CORES'],
+            'sockets': 1,
+            'net0': 'virtio,bridge=vmbr0',
+            'ostype': os_type,
+            'storage': 'local-lvm',
+            'disk': 'scsi0:local-lvm:10G',
+        }
+
+        result = self.provisioning_service.provision(node, params, software)
+        if not result:
+            logger.error(f"Failed to provision pooled VM for {key}")
+            return False
+
+        vm = VM(
+            name=params['name'],
+            proxmox_id=vmid,
+            proxmox_node=node,
+            status='creating',
+            cpu_cores=params['cores'],
+            memory_mb=params['memory'],
+            disk_gb=10,
+            os_type=os_type,
+            software_installed=','.join(software) or None,
+            pool_key=key
+        )
+        db.session.add(vm)
+        db.session.flush()
+        task = task_tracker.create_task(result['node'], result['upid'], result['action'], vm=vm,
+                                        payload={'config': result['config']})
+        db.session.commit()
+        task_tracker.watch(task)
+
+        logger.info(f"Provisioning pooled VM {vmid} for {key} on {node}")
+        return True
+
+    def _next_node(self):
+        """Pick the node for the next pooled VM, rotating through WARM_POOL_NODES or all nodes.
+
+        The node list is re-read every WARM_POOL_NODE_REFRESH seconds, so
+        nodes that go offline or join the cluster are picked up.
+        """
+        config = current_app.config
+        now = time.monotonic()
+        if self._nodes is None or now >= self._nodes_expire_at:
+            nodes = config['WARM_POOL_NODES'] or \
+                [n['node'] for n in self.proxmox_service.get_nodes() if n.get('status', 'online') == 'online']
+            if not nodes:
+                self._nodes = None
+                return None
+            self._nodes = cycle(sorted(nodes))
+            self._nodes_expire_at = now + config['WARM_POOL_NODE_REFRESH']
+        return next(self._nodes)
+
+
+# Process-wide warm pool shared by the API and the application runner
+warm_pool = WarmPoolService()